@@ -8,20 +8,18 @@ from pyaml_env import parse_config
 from simple_logger.logger import get_logger
 
 from ocp_addons_operators_cli.click_dict_type import DictParamType
-from ocp_addons_operators_cli.constants import INSTALL_STR, SUPPORTED_ACTIONS
-from ocp_addons_operators_cli.utils.addons_utils import (
-    get_addons_from_user_input,
-    prepare_addons,
-)
-from ocp_addons_operators_cli.utils.cli_utils import (
-    run_install_or_uninstall_products,
-    set_parallel,
-    verify_user_input,
-)
-from ocp_addons_operators_cli.utils.operators_utils import (
-    get_operators_from_user_input,
-    prepare_operators,
-)
+from ocp_addons_operators_cli.constants import DEFAULT_CACHE_DIR, DEFAULT_SSO_ENDPOINT, SUPPORTED_ACTIONS
+from ocp_addons_operators_cli.session import ProductsSession
+from ocp_addons_operators_cli.utils.cluster_lock import CLUSTER_LOCK_TYPES
+from ocp_addons_operators_cli.utils.history import RUN_HISTORY
+from ocp_addons_operators_cli.utils.http_recording import HTTP_RECORDING
+from ocp_addons_operators_cli.utils.metrics import enable_metrics, write_metrics_file
+from ocp_addons_operators_cli.utils.preflight import CLUSTER_PREFLIGHT_MODES
+from ocp_addons_operators_cli.utils.profiling import RUN_PROFILER
+from ocp_addons_operators_cli.utils.report import enable_report, write_report_file
+from ocp_addons_operators_cli.utils.rosa_utils import DEFAULT_ROSA_MAX_CONCURRENCY
+from ocp_addons_operators_cli.utils.streaming import DEFAULT_STREAMING_MAX_CLUSTERS
+from ocp_addons_operators_cli.utils.tracing import enable_tracing, write_trace_file
 
 LOGGER = get_logger(name=os.path.split(__file__)[-1])
 
@@ -49,6 +47,10 @@ Optional parameters:
     target-namespaces - A list of target namespaces for the operator
     source-image - To install operator from specific CatalogSource Image
     iib - To install an operator using custom iib
+    kubeconfig - Path to kubeconfig
+    context - kubeconfig context(s) to install on, names or glob patterns, e.g. 'prod-*' or 'ctx1,ctx2'
+    On uninstall, name can be a glob pattern, e.g. 'name=*', to uninstall the matching installed operators
+    label-selector - With a name pattern, uninstall only the operators whose Subscription has the label
     """,
     multiple=True,
 )
@@ -65,6 +67,7 @@ Optional parameters:
     addon parameters - needed parameters for addon installation.
     timeout - addon install / uninstall timeout in seconds, default: 30 minutes.
     rosa - if true, then it will be installed using ROSA cli.
+    On uninstall, name can be a glob pattern, e.g. 'name=*', to uninstall the matching installed addons
     """,
     multiple=True,
 )
@@ -72,7 +75,7 @@ Optional parameters:
     "-e",
     "--endpoint",
     help="SSO endpoint url",
-    default="https://sso.redhat.com/auth/realms/redhat-external/protocol/openid-connect/token",
+    default=DEFAULT_SSO_ENDPOINT,
     show_default=True,
 )
 @click.option(
@@ -123,6 +126,274 @@ must-gather will try to collect data when addon/operator installation fails and
 """,
     type=click.Path(exists=True),
 )
+@click.option(
+    "--cache-dir",
+    help="Path to local cache directory, used by the cache options.",
+    default=DEFAULT_CACHE_DIR,
+    show_default=True,
+)
+@click.option(
+    "--ocm-token-cache",
+    help="""
+\b
+Cache OCM access tokens in `--cache-dir` and reuse them between runs until they are about to expire.
+Cache files are locked to allow concurrent runs on the same host and are readable only by the current user.
+""",
+    is_flag=True,
+    show_default=True,
+)
+@click.option(
+    "--products-history",
+    help="""
+\b
+Record products install/uninstall durations per product, cluster type (OCP version) and action in a SQLite database
+in `--cache-dir`. With `--parallel`, products expected to take longest are started first, and tighter timeouts
+are suggested for products whose timeout is much longer than their recorded durations.
+""",
+    is_flag=True,
+)
+@click.option(
+    "--ocm-cluster-cache-ttl",
+    help="""
+\b
+Cache addons clusters data (cluster id, api url and OCP version) in `--cache-dir` for the given time.
+The cluster kubeconfig is not cached, it is fetched from OCM on every run.
+Cached clusters are validated with a single OCM request by cluster id and invalidated if not found.
+Format examples: `1h`, `30m`, `3600s`. If not passed, clusters data is not cached.
+""",
+)
+@click.option(
+    "--ocm-addon-cache-ttl",
+    help="""
+\b
+Cache addons definitions (version and parameters definitions) in `--cache-dir` for the given time.
+Addons parameters are validated against their definitions before any addon is installed.
+Format examples: `1h`, `30m`, `3600s`. If not passed, addons definitions are fetched from OCM on every run.
+""",
+)
+@click.option(
+    "--retries",
+    help="""
+\b
+Number of retries of a product install/uninstall step after a transient error (OCM/OCP API 5xx, connection errors,
+API server timeouts); products `retries` arg overrides it. Fatal errors are not retried.
+""",
+    type=int,
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--retry-backoff",
+    help="""
+\b
+Initial backoff before retrying a product step, doubled on each retry; products `retry-backoff` arg overrides it.
+Format examples: `30s`, `1m`.
+""",
+    default="30s",
+    show_default=True,
+)
+@click.option(
+    "--stall-timeout",
+    help="""
+\b
+Fail a product installation early if its status (addon state, operator InstallPlan/CSV phases and conditions)
+did not change for the given time, instead of waiting for the full timeout; products `stall-timeout` arg
+overrides it. Format examples: `10m`, `600s`. If not passed, products wait for their full timeout.
+""",
+)
+@click.option(
+    "--operators-group-wait",
+    help="""
+\b
+Install all operators of a cluster together and wait for them as a group: one CSVs list call per namespace per
+poll interval for all pending operators, instead of a separate wait per operator.
+""",
+    is_flag=True,
+)
+@click.option(
+    "--fast-uninstall",
+    help="""
+\b
+Uninstall: issue all products deletions first, then verify all deletions in a single shared phase,
+instead of waiting for each product deletion in its own thread.
+""",
+    is_flag=True,
+)
+@click.option(
+    "--skip-namespace-wait",
+    help="""
+\b
+With `--fast-uninstall`, do not wait for operators namespaces termination;
+namespaces which are still terminating are reported at the end of the run.
+""",
+    is_flag=True,
+)
+@click.option(
+    "--cluster-lock",
+    help="""
+\b
+Lock each products cluster for the duration of the run, so concurrent runs targeting the same cluster do not race.
+`lease`: a Kubernetes Lease in the cluster, in `--cluster-lock-namespace`, for runs on any host.
+`file`: a lock file in `--cache-dir`, for runs on the same host.
+""",
+    type=click.Choice(CLUSTER_LOCK_TYPES),
+)
+@click.option(
+    "--cluster-lock-namespace",
+    help="Namespace of the clusters locks Leases, used with `--cluster-lock lease`.",
+    default="default",
+    show_default=True,
+)
+@click.option(
+    "--cluster-lock-timeout",
+    help="Time to wait for each cluster lock, format examples: `1h`, `30m`, `3600s`.",
+    default="1h",
+    show_default=True,
+)
+@click.option(
+    "--cluster-preflight",
+    help="""
+\b
+Check all products clusters concurrently before anything is installed/uninstalled: API server reachability,
+authentication, nodes readiness and OLM health, each request failing after `--cluster-preflight-timeout`.
+`fail`: fail the run if any cluster is unhealthy.
+`exclude`: skip the products of unhealthy clusters, they are reported as failed in `--report-file`.
+""",
+    type=click.Choice(CLUSTER_PREFLIGHT_MODES),
+)
+@click.option(
+    "--cluster-preflight-timeout",
+    help="Time to wait for each cluster preflight API request, format examples: `10s`, `1m`.",
+    default="10s",
+    show_default=True,
+)
+@click.option(
+    "--rosa-max-concurrency",
+    help="""
+\b
+Maximum number of `rosa` cli processes running at the same time, for addons installed with `rosa=true`.
+The `rosa` cli is logged in once per OCM environment and token, all the run commands reuse that login.
+""",
+    type=int,
+    default=DEFAULT_ROSA_MAX_CONCURRENCY,
+    show_default=True,
+)
+@click.option(
+    "--streaming",
+    help="""
+\b
+Run products cluster by cluster: each cluster's clients are created just before its first product runs and
+released after its last product, so memory is bounded by `--streaming-max-clusters` instead of the products number.
+""",
+    is_flag=True,
+    show_default=True,
+)
+@click.option(
+    "--streaming-max-clusters",
+    help="Maximum number of clusters whose products run at the same time with `--streaming`.",
+    type=int,
+    default=DEFAULT_STREAMING_MAX_CLUSTERS,
+    show_default=True,
+)
+@click.option(
+    "--shard-index",
+    help="""
+\b
+Index of this run shard, from 0 to `--shard-count` - 1; requires `--shard-count`.
+Products are split between shards by a stable hash of their cluster name, a shard owns all products of a cluster.
+""",
+    type=int,
+)
+@click.option(
+    "--shard-count",
+    help="Number of shards the products are split between, see `--shard-index`.",
+    type=int,
+)
+@click.option(
+    "--http-record",
+    help="""
+\b
+Path to a JSON file to record all the run HTTP exchanges (OCM, SSO, OCP and AWS APIs) to, for `--http-replay`.
+The recording contains credentials (OCM access tokens, clusters kubeconfigs), it is readable only by the current user.
+""",
+    type=click.Path(),
+)
+@click.option(
+    "--http-replay",
+    help="""
+\b
+Path to a recording of `--http-record` to replay: API requests are served from the recording by a local server,
+no request reaches the network. Use the same products and arguments as the recorded run.
+""",
+    type=click.Path(),
+)
+@click.option(
+    "--http-replay-speed",
+    help="""
+\b
+`--http-replay` time compression: recorded responses durations and the run sleeps (polling intervals, retries
+backoff) are divided by this factor. `1` replays the recorded timing, `0` disables all delays.
+""",
+    type=float,
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--report-file",
+    help="""
+\b
+Path to a JSON file to write the run report to: outcome, duration and error of each processed product.
+With sharding, `-shard-<index>-of-<count>` is added to the file name; shards reports are merged by concatenating
+their `products` lists.
+""",
+    type=click.Path(),
+)
+@click.option(
+    "--plan-out",
+    help="""
+\b
+Install only: path to a JSON file to write the run plan to: the products resolved data (clusters ids and API URLs,
+namespaces, channels, IIBs) with their outcome and duration, to uninstall them later with `--plan-in`.
+With sharding, `-shard-<index>-of-<count>` is added to the file name.
+""",
+    type=click.Path(),
+)
+@click.option(
+    "--plan-in",
+    help="""
+\b
+Uninstall only: path to a plan file written by an install `--plan-out`; the planned products are uninstalled,
+reusing their resolved data instead of looking up clusters again. Products passed to the run must be in the plan.
+""",
+    type=click.Path(),
+)
+@click.option(
+    "--metrics-file",
+    help="""
+\b
+Path to a file to write run metrics to when the run ends, in Prometheus text format.
+The file can be collected by node-exporter textfile collector (file name should end with `.prom`).
+""",
+    type=click.Path(),
+)
+@click.option(
+    "--profile",
+    help="""
+\b
+Profile the run and write profiles to the given directory: cProfile stats (`.pstats`) and collapsed stacks
+(`.folded`, for flamegraphs) of the main thread and each product worker thread, and merged ones (`merged.*`).
+""",
+    type=click.Path(file_okay=False),
+)
+@click.option(
+    "--trace-file",
+    help="""
+\b
+Path to a file to write the run timeline to, in Chrome trace event format (open with https://ui.perfetto.dev).
+Products phases are shown per worker thread, with product and cluster names as args.
+""",
+    type=click.Path(),
+)
 @click.option("--debug", help="Enable debug logs", is_flag=True)
 @click.option(
     "--pdb",
@@ -158,46 +429,54 @@ def main(**kwargs):
         user_kwargs.update(parse_config(path=yaml_config_file, default_value=""))
 
     action = user_kwargs.get("action")
-    operators = get_operators_from_user_input(**user_kwargs)
-    addons = get_addons_from_user_input(**user_kwargs)
-    endpoint = user_kwargs.get("endpoint")
-    brew_token = user_kwargs.get("brew_token")
-    debug = user_kwargs.get("debug")
-    ocm_token = user_kwargs.get("ocm_token")
-    parallel = set_parallel(
-        user_input_parallel=user_kwargs.get("parallel"),
-        operators=operators,
-        addons=addons,
-    )
-    user_kwargs["operators"] = operators
-    user_kwargs["addons"] = addons
-    install = action == INSTALL_STR
-    user_kwargs["install"] = install
-    must_gather_output_dir = user_kwargs.get("must_gather_output_dir")
-
-    verify_user_input(**user_kwargs)
-
-    operators = prepare_operators(
-        operators=operators,
-        install=install,
-        user_kwargs_dict=user_kwargs,
-    )
-    addons = prepare_addons(
-        addons=addons,
-        ocm_token=ocm_token,
-        endpoint=endpoint,
-        brew_token=brew_token,
-        install=install,
-        must_gather_output_dir=must_gather_output_dir,
-    )
-
-    run_install_or_uninstall_products(
-        operators=operators,
-        addons=addons,
-        parallel=parallel,
-        debug=debug,
-        install=install,
-    )
+    # From CLI, we get `addon`/`operator` tuples, from YAML file we get `addons`/`operators` lists
+    addons = [*user_kwargs.pop("addon")] or user_kwargs.pop("addons", [])
+    operators = [*user_kwargs.pop("operator")] or user_kwargs.pop("operators", [])
+    metrics_file = user_kwargs.get("metrics_file")
+    run_start_time = time.time()
+    profile_dir = user_kwargs.get("profile")
+    trace_file = user_kwargs.get("trace_file")
+    report_file = user_kwargs.get("report_file")
+    shard_index = user_kwargs.get("shard_index")
+    shard_count = user_kwargs.get("shard_count")
+    http_record = user_kwargs.get("http_record")
+    http_replay = user_kwargs.get("http_replay")
+    if metrics_file:
+        enable_metrics()
+
+    if trace_file:
+        enable_tracing()
+
+    if report_file:
+        enable_report()
+
+    if profile_dir:
+        RUN_PROFILER.start(profile_dir=profile_dir)
+
+    try:
+        if http_record:
+            HTTP_RECORDING.start_recording()
+
+        if http_replay:
+            HTTP_RECORDING.start_replay(recording_file=http_replay, speed=user_kwargs.get("http_replay_speed"))
+
+        with ProductsSession(**user_kwargs) as session:
+            session.run(action=action, addons=addons, operators=operators, fail_fast=True)
+    finally:
+        if metrics_file:
+            write_metrics_file(metrics_file=metrics_file, run_duration=time.time() - run_start_time)
+
+        if trace_file:
+            write_trace_file(trace_file=trace_file)
+
+        if report_file:
+            write_report_file(report_file=report_file, shard_index=shard_index, shard_count=shard_count)
+
+        RUN_HISTORY.write()
+        RUN_PROFILER.stop()
+        HTTP_RECORDING.stop()
+        if http_record:
+            HTTP_RECORDING.write(recording_file=http_record)
 
 
 if __name__ == "__main__":
@@ -2,6 +2,8 @@
 INSTALL_STR = "install"
 UNINSTALL_STR = "uninstall"
 SUPPORTED_ACTIONS = (INSTALL_STR, UNINSTALL_STR)
+DEFAULT_CACHE_DIR = "~/.cache/ocp-addons-operators-cli"
+DEFAULT_SSO_ENDPOINT = "https://sso.redhat.com/auth/realms/redhat-external/protocol/openid-connect/token"
 
 # OCM environments
 PRODUCTION_STR = "production"
@@ -11,6 +13,9 @@ STAGE_STR = "stage"
 ADDON_STR = "addon"
 OPERATOR_STR = "operator"
 
+# Products phases
+PREPARE_PHASE = "prepare"
+
 # Timeouts
 TIMEOUT_30MIN = "30m"
 TIMEOUT_60MIN = "60m"
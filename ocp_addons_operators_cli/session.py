@@ -0,0 +1,513 @@
+import asyncio
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import click
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.constants import DEFAULT_CACHE_DIR, DEFAULT_SSO_ENDPOINT, INSTALL_STR, UNINSTALL_STR
+from ocp_addons_operators_cli.utils.addons_utils import get_addons_from_user_input, prepare_addons
+from ocp_addons_operators_cli.utils.cli_utils import run_install_or_uninstall_products, set_parallel, verify_user_input
+from ocp_addons_operators_cli.utils.cluster_lock import clusters_locks
+from ocp_addons_operators_cli.utils.discovery import (
+    discover_addons_specs,
+    discover_operators_specs,
+    get_uninstall_waves,
+)
+from ocp_addons_operators_cli.utils.general import format_memory_bytes, get_peak_memory_bytes, tts
+from ocp_addons_operators_cli.utils.history import RUN_HISTORY, disable_history, enable_history
+from ocp_addons_operators_cli.utils.kubeconfig_utils import remove_context_kubeconfigs
+from ocp_addons_operators_cli.utils.operators_utils import (
+    close_ocp_clients,
+    get_operators_from_user_input,
+    load_operators_iibs,
+    prepare_operators,
+)
+from ocp_addons_operators_cli.utils.plan import (
+    RunPlan,
+    get_plan_products,
+    get_planned_products,
+    read_plan_file,
+    write_plan_file,
+)
+from ocp_addons_operators_cli.utils.preflight import run_clusters_preflight
+from ocp_addons_operators_cli.utils.products_specs import DEFAULT_RETRY_BACKOFF, get_products_specs
+from ocp_addons_operators_cli.utils.report import RunReport, get_shard_report_file
+from ocp_addons_operators_cli.utils.rosa_utils import DEFAULT_ROSA_MAX_CONCURRENCY, ROSA_CLI_DISPATCHER, RosaCli
+from ocp_addons_operators_cli.utils.sharding import get_shard_products_specs
+from ocp_addons_operators_cli.utils.streaming import (
+    DEFAULT_STREAMING_MAX_CLUSTERS,
+    get_clusters_products_specs,
+    record_cluster_products_failure,
+)
+
+LOGGER = get_logger(name=__name__)
+
+# Session options defaults, same as the CLI options defaults
+SESSION_DEFAULT_OPTIONS = {
+    "endpoint": DEFAULT_SSO_ENDPOINT,
+    "cache_dir": DEFAULT_CACHE_DIR,
+    "retries": 0,
+    "retry_backoff": DEFAULT_RETRY_BACKOFF,
+    "cluster_lock_namespace": "default",
+    "cluster_lock_timeout": "1h",
+    "cluster_preflight_timeout": "10s",
+    "rosa_max_concurrency": DEFAULT_ROSA_MAX_CONCURRENCY,
+    "streaming_max_clusters": DEFAULT_STREAMING_MAX_CLUSTERS,
+}
+
+
+class ProductsSession:
+    """
+    Install and uninstall addons and operators from Python, several times in the same process.
+
+    The session keeps the OCM clients (one per OCM environment), the OCP clients (one per kubeconfig), the addons
+    definitions, the products executor and the `rosa` cli logins between runs, so repeated runs do not
+    re-authenticate nor rebuild clients. The executor, the `rosa` cli and the products history (`products_history`)
+    are started by the first run with valid user input and released on close.
+    With the `plan_out` option, an install writes the products it resolved to a plan file; with `plan_in`, an
+    uninstall removes the planned products, reusing their resolved data.
+    With the `streaming` option, OCP clients are not kept: each cluster's clients and products handles are created
+    just before its first product and released after its last product.
+    The CLI is a thin wrapper over a single session run.
+
+    Session options are the CLI options, with underscores (e.g. `ocm_token`, `parallel`, `cluster_name`,
+    `kubeconfig`, `retries`, `stall_timeout`); products are the YAML file `addons` and `operators` dicts.
+
+    Invalid user input raises `click.Abort`, with the errors in the log.
+
+    Example:
+        >>> with ProductsSession(ocm_token=ocm_token, parallel=True) as session:
+        ...     results = session.install(addons=[{"name": "ocm-addon-test-operator", "cluster-name": "my-cluster"}])
+        ...     failed = [result for result in results if result["outcome"] == "failure"]
+    """
+
+    def __init__(self, **options):
+        self.options = {**SESSION_DEFAULT_OPTIONS, **options}
+        self.ocm_clients = {}
+        self.ocp_clients = {}
+        self.addons_definitions = {}
+        # Operators `context` kubeconfig files, holding credentials, removed on close
+        self.context_kubeconfigs = {}
+        self._lock = threading.Lock()
+        self.rosa_cli = RosaCli(max_concurrency=self.options["rosa_max_concurrency"] or DEFAULT_ROSA_MAX_CONCURRENCY)
+        # Started by the first run, once its user input is valid, see `_start`
+        self.executor = None
+        self._history_enabled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        self.rosa_cli.stop()
+        if self._history_enabled:
+            disable_history()
+            self._history_enabled = False
+
+        remove_context_kubeconfigs(context_kubeconfigs=self.context_kubeconfigs)
+
+    def _start(self):
+        """
+        Start the session products executor, `rosa` cli and products history, once.
+        """
+        with self._lock:
+            if self.executor:
+                return
+
+            self.rosa_cli.start()
+            self.executor = self._get_executor(thread_name_prefix="products")
+            if self.options.get("products_history"):
+                enable_history(cache_dir=self.options["cache_dir"])
+                self._history_enabled = True
+
+    def _get_executor(self, **kwargs):
+        """
+        Get an executor whose threads run the OCM wrapper `rosa` commands with the session `rosa` cli.
+        """
+        return ThreadPoolExecutor(
+            initializer=ROSA_CLI_DISPATCHER.set_thread_rosa_cli,
+            initargs=(self.rosa_cli,),
+            **kwargs,
+        )
+
+    def run(self, action, addons=None, operators=None, fail_fast=False):
+        """
+        Install or uninstall products.
+
+        Args:
+            action (str): `install` or `uninstall`
+            addons (list, optional): addons dicts, e.g. `{"name": "addon", "cluster-name": "cluster", "timeout": "30m"}`
+            operators (list, optional): operators dicts, e.g. `{"name": "operator", "kubeconfig": "/path/kubeconfig"}`
+            fail_fast (bool): raise `click.Abort` on the first failed product instead of processing all products
+
+        Returns:
+            list: products results dicts, with `product-type`, `name`, `cluster-name`, `action`, `outcome`
+                (`success` or `failure`), `duration-seconds` and `error`
+        """
+        with ROSA_CLI_DISPATCHER.route(rosa_cli=self.rosa_cli):
+            return self._run_products(action=action, addons=addons, operators=operators, fail_fast=fail_fast)
+
+    def _run_products(self, action, addons, operators, fail_fast):
+        user_kwargs = {
+            **self.options,
+            "action": action,
+            "addon": (),
+            "operator": (),
+            "addons": copy.deepcopy(addons or []),
+            "operators": copy.deepcopy(operators or []),
+        }
+        user_kwargs["addons"] = addons = get_addons_from_user_input(**user_kwargs)
+        user_kwargs["operators"] = operators = get_operators_from_user_input(**user_kwargs)
+        user_kwargs["install"] = install = action == INSTALL_STR
+        verify_user_input(**user_kwargs)
+        shard_index = user_kwargs.get("shard_index")
+        shard_count = user_kwargs.get("shard_count")
+        planned_products = None
+        if plan_in := user_kwargs.get("plan_in"):
+            # Planned products replace the user products, which must be in the plan
+            planned = read_plan_file(
+                plan_file=get_shard_report_file(report_file=plan_in, shard_index=shard_index, shard_count=shard_count)
+            )
+            addons, operators = get_plan_products(plan=planned, addons=addons, operators=operators)
+            planned_products = get_planned_products(plan=planned)
+
+        addons_specs, operators_specs = get_products_specs(
+            addons=addons,
+            operators=operators,
+            brew_token=user_kwargs.get("brew_token"),
+            retries=user_kwargs.get("retries"),
+            retry_backoff=user_kwargs.get("retry_backoff"),
+            stall_timeout=user_kwargs.get("stall_timeout"),
+            context_kubeconfigs=self.context_kubeconfigs,
+        )
+        if shard_count:
+            addons_specs, operators_specs = get_shard_products_specs(
+                addons_specs=addons_specs,
+                operators_specs=operators_specs,
+                shard_index=shard_index,
+                shard_count=shard_count,
+            )
+
+        self._start()
+        report = RunReport()
+        plan = RunPlan() if user_kwargs.get("plan_out") else None
+        streaming = user_kwargs.get("streaming")
+        cache_dir = user_kwargs.get("cache_dir")
+        ocm_cluster_cache_ttl = user_kwargs.get("ocm_cluster_cache_ttl")
+        with self._lock:
+            if not (install or plan_in):
+                # Streaming runs do not keep discovery clients, clusters clients are created by their products
+                discovery_ocp_clients = {} if streaming else self.ocp_clients
+                # Addons/operators names patterns are replaced by the matching products installed on their clusters
+                addons_specs = discover_addons_specs(
+                    addons_specs=addons_specs,
+                    ocm_token=user_kwargs.get("ocm_token"),
+                    endpoint=user_kwargs.get("endpoint"),
+                    token_cache_dir=cache_dir if user_kwargs.get("ocm_token_cache") else None,
+                    cluster_cache_dir=cache_dir,
+                    cluster_cache_ttl=tts(ts=ocm_cluster_cache_ttl) if ocm_cluster_cache_ttl else None,
+                    ocm_clients=self.ocm_clients,
+                )
+                operators_specs = discover_operators_specs(
+                    operators_specs=operators_specs,
+                    ocp_clients=discovery_ocp_clients,
+                )
+                if streaming:
+                    close_ocp_clients(ocp_clients=discovery_ocp_clients)
+
+            if not streaming:
+                prepared_addons, prepared_operators = self._prepare_products(
+                    addons_specs=addons_specs,
+                    operators_specs=operators_specs,
+                    user_kwargs=user_kwargs,
+                    report=report,
+                    ocp_clients=self.ocp_clients,
+                    planned_products=planned_products,
+                )
+
+        try:
+            if streaming:
+                self._run_streaming(
+                    addons_specs=addons_specs,
+                    operators_specs=operators_specs,
+                    user_kwargs=user_kwargs,
+                    fail_fast=fail_fast,
+                    report=report,
+                    plan=plan,
+                    planned_products=planned_products,
+                )
+            else:
+                self._run_prepared_products(
+                    addons=prepared_addons,
+                    operators=prepared_operators,
+                    user_kwargs=user_kwargs,
+                    fail_fast=fail_fast,
+                    report=report,
+                    plan=plan,
+                )
+        finally:
+            RUN_HISTORY.write()
+            if plan and (plan.addons or plan.operators):
+                write_plan_file(
+                    plan_file=get_shard_report_file(
+                        report_file=user_kwargs["plan_out"],
+                        shard_index=shard_index,
+                        shard_count=shard_count,
+                    ),
+                    plan=plan,
+                    products=report.products,
+                )
+
+            LOGGER.info(f"Run peak memory: {format_memory_bytes(memory_bytes=get_peak_memory_bytes())}")
+
+        return report.products
+
+    def _prepare_products(
+        self,
+        addons_specs,
+        operators_specs,
+        user_kwargs,
+        report,
+        ocp_clients,
+        iib_dict=None,
+        planned_products=None,
+        lock=None,
+    ):
+        """
+        Prepare products; the session OCM clients and addons definitions are shared by the session runs.
+
+        Args:
+            ocp_clients (dict): OCP clients to use and update, by kubeconfig
+            planned_products (tuple, optional): addons and operators plan entries, see `get_planned_products`
+            lock (threading.Lock, optional): lock held around the session OCM clients and addons definitions
+                lookups; without it, the caller must hold the session lock
+
+        Returns:
+            tuple: addons dicts, operators dicts
+        """
+        install = user_kwargs["install"]
+        cache_dir = user_kwargs.get("cache_dir")
+        ocm_cluster_cache_ttl = user_kwargs.get("ocm_cluster_cache_ttl")
+        ocm_addon_cache_ttl = user_kwargs.get("ocm_addon_cache_ttl")
+        planned_addons, planned_operators = planned_products or (None, None)
+        prepared_addons = prepare_addons(
+            addons=addons_specs,
+            ocm_token=user_kwargs.get("ocm_token"),
+            endpoint=user_kwargs.get("endpoint"),
+            must_gather_output_dir=user_kwargs.get("must_gather_output_dir"),
+            token_cache_dir=cache_dir if user_kwargs.get("ocm_token_cache") else None,
+            cluster_cache_dir=cache_dir,
+            cluster_cache_ttl=tts(ts=ocm_cluster_cache_ttl) if ocm_cluster_cache_ttl else None,
+            addon_cache_ttl=tts(ts=ocm_addon_cache_ttl) if ocm_addon_cache_ttl else None,
+            install=install,
+            addons_definitions=self.addons_definitions,
+            ocm_clients=self.ocm_clients,
+            planned_addons=planned_addons,
+            lock=lock,
+        )
+        if cluster_preflight := user_kwargs.get("cluster_preflight"):
+            prepared_addons, operators_specs = run_clusters_preflight(
+                addons=prepared_addons,
+                operators_specs=operators_specs,
+                mode=cluster_preflight,
+                request_timeout=tts(ts=user_kwargs.get("cluster_preflight_timeout")),
+                install=install,
+                report=report,
+            )
+
+        prepared_operators = prepare_operators(
+            operators=operators_specs,
+            install=install,
+            user_kwargs_dict=user_kwargs,
+            ocp_clients=ocp_clients,
+            iib_dict=iib_dict,
+            planned_operators=planned_operators,
+        )
+        return prepared_addons, prepared_operators
+
+    def _run_prepared_products(self, addons, operators, user_kwargs, fail_fast, report, plan=None):
+        install = user_kwargs["install"]
+        cluster_lock_timeout = user_kwargs.get("cluster_lock_timeout")
+        try:
+            with clusters_locks(
+                operators=operators,
+                addons=addons,
+                lock_type=user_kwargs.get("cluster_lock"),
+                namespace=user_kwargs.get("cluster_lock_namespace"),
+                wait_timeout=tts(ts=cluster_lock_timeout) if cluster_lock_timeout else None,
+                cache_dir=user_kwargs.get("cache_dir"),
+            ):
+                # Operators are uninstalled after the operators which depend on them
+                products_waves = (
+                    [(addons, operators)] if install else get_uninstall_waves(addons=addons, operators=operators)
+                )
+                for wave_addons, wave_operators in products_waves:
+                    run_install_or_uninstall_products(
+                        operators=wave_operators,
+                        addons=wave_addons,
+                        parallel=set_parallel(
+                            user_input_parallel=user_kwargs.get("parallel"),
+                            operators=wave_operators,
+                            addons=wave_addons,
+                        ),
+                        debug=user_kwargs.get("debug"),
+                        install=install,
+                        operators_group_wait=user_kwargs.get("operators_group_wait"),
+                        fast_uninstall=user_kwargs.get("fast_uninstall"),
+                        skip_namespace_wait=user_kwargs.get("skip_namespace_wait"),
+                        fail_fast=fail_fast,
+                        executor=self.executor,
+                        report=report,
+                    )
+        finally:
+            # Products are planned once they ran, with their resolved catalog sources
+            if plan:
+                plan.add_products(addons=addons, operators=operators)
+
+    def _run_cluster_products(
+        self,
+        cluster_name,
+        addons_specs,
+        operators_specs,
+        user_kwargs,
+        fail_fast,
+        report,
+        iib_dict,
+        plan=None,
+        planned_products=None,
+    ):
+        """
+        Run the products of a single cluster with clients created for it, and release them after its last product.
+
+        If the cluster fails, its products which were not processed are recorded as failures in `report`.
+        """
+        # Cluster OCP clients are not shared with the session, they are closed with the cluster products
+        ocp_clients = {}
+        start_time = time.perf_counter()
+        try:
+            # Clusters are prepared concurrently, the session lock is only held around the shared lookups
+            addons, operators = self._prepare_products(
+                addons_specs=addons_specs,
+                operators_specs=operators_specs,
+                user_kwargs=user_kwargs,
+                report=report,
+                ocp_clients=ocp_clients,
+                iib_dict=iib_dict,
+                planned_products=planned_products,
+                lock=self._lock,
+            )
+
+            self._run_prepared_products(
+                addons=addons,
+                operators=operators,
+                user_kwargs=user_kwargs,
+                fail_fast=fail_fast,
+                report=report,
+                plan=plan,
+            )
+        except Exception as exc:
+            record_cluster_products_failure(
+                cluster_name=cluster_name,
+                addons_specs=addons_specs,
+                operators_specs=operators_specs,
+                action=user_kwargs["action"],
+                error=exc,
+                duration=time.perf_counter() - start_time,
+                report=report,
+            )
+            raise
+        finally:
+            close_ocp_clients(ocp_clients=ocp_clients)
+            LOGGER.info(
+                f"Cluster {cluster_name} products done, clients released, "
+                f"peak memory: {format_memory_bytes(memory_bytes=get_peak_memory_bytes())}"
+            )
+
+    def _run_streaming(
+        self,
+        addons_specs,
+        operators_specs,
+        user_kwargs,
+        fail_fast,
+        report,
+        plan=None,
+        planned_products=None,
+    ):
+        """
+        Run products cluster by cluster, at most `streaming_max_clusters` clusters at the same time; each cluster's
+        clients, `Cluster`s and `ClusterAddOn`s are created just before its first product and released after its last
+        product, so memory is bounded by the clusters concurrency instead of the number of products.
+
+        Failed clusters products are recorded as failures; with `fail_fast`, the first failed cluster aborts the run.
+        """
+        clusters_products_specs = get_clusters_products_specs(
+            addons_specs=addons_specs,
+            operators_specs=operators_specs,
+        )
+        # Operators IIBs are downloaded once for all clusters
+        iib_dict = load_operators_iibs(user_kwargs_dict=user_kwargs) if user_kwargs["install"] else None
+        failed_clusters = []
+        with self._get_executor(
+            max_workers=user_kwargs["streaming_max_clusters"] or DEFAULT_STREAMING_MAX_CLUSTERS,
+            thread_name_prefix="clusters",
+        ) as clusters_executor:
+            futures = {
+                clusters_executor.submit(
+                    self._run_cluster_products,
+                    cluster_name=cluster_name,
+                    addons_specs=cluster_addons_specs,
+                    operators_specs=cluster_operators_specs,
+                    user_kwargs=user_kwargs,
+                    fail_fast=fail_fast,
+                    report=report,
+                    iib_dict=iib_dict,
+                    plan=plan,
+                    planned_products=planned_products,
+                ): cluster_name
+                for cluster_name, (cluster_addons_specs, cluster_operators_specs) in clusters_products_specs.items()
+            }
+            for future in as_completed(futures):
+                if exc := future.exception():
+                    LOGGER.error(f"Failed to run cluster {futures[future]} products: {exc!r}")
+                    failed_clusters.append(futures[future])
+                    if fail_fast:
+                        clusters_executor.shutdown(wait=True, cancel_futures=True)
+                        break
+
+        if failed_clusters:
+            LOGGER.error(f"Failed to run products of clusters: {failed_clusters}")
+            if fail_fast:
+                raise click.Abort()
+
+    def install(self, addons=None, operators=None, fail_fast=False):
+        """
+        Install products, see `run`.
+        """
+        return self.run(action=INSTALL_STR, addons=addons, operators=operators, fail_fast=fail_fast)
+
+    def uninstall(self, addons=None, operators=None, fail_fast=False):
+        """
+        Uninstall products, see `run`.
+        """
+        return self.run(action=UNINSTALL_STR, addons=addons, operators=operators, fail_fast=fail_fast)
+
+    async def install_async(self, addons=None, operators=None, fail_fast=False):
+        """
+        Install products without blocking the event loop, see `run`.
+        """
+        return await asyncio.to_thread(self.install, addons=addons, operators=operators, fail_fast=fail_fast)
+
+    async def uninstall_async(self, addons=None, operators=None, fail_fast=False):
+        """
+        Uninstall products without blocking the event loop, see `run`.
+        """
+        return await asyncio.to_thread(self.uninstall, addons=addons, operators=operators, fail_fast=fail_fast)
@@ -0,0 +1,96 @@
+import pytest
+
+from ocp_addons_operators_cli.utils.addons_utils import get_addon_parameters_errors
+from ocp_addons_operators_cli.utils.products_specs import AddonSpec
+
+ADDON_DEFINITION = {
+    "id": "addon",
+    "version": {"id": "1.0.0"},
+    "parameters": {
+        "items": [
+            {"id": "cidr-range", "value_type": "cidr", "required": True, "default_value": "10.1.0.0/26"},
+            {"id": "notification-email", "value_type": "string", "required": True},
+            {"id": "size", "value_type": "number", "required": False},
+            {"id": "has-external-resources", "value_type": "boolean", "required": False},
+            {
+                "id": "tier",
+                "value_type": "string",
+                "required": False,
+                "options": [{"name": "Small", "value": "small"}, {"name": "Large", "value": "large"}],
+            },
+            {
+                "id": "aws-param",
+                "value_type": "string",
+                "required": True,
+                "conditions": [{"resource": "cluster", "data": {"cloud_provider.id": "aws"}}],
+            },
+        ]
+    },
+}
+
+
+def get_addon_spec(parameters):
+    return AddonSpec(
+        name="addon",
+        cluster_name="cluster",
+        ocm_env="stage",
+        timeout=60,
+        rosa=False,
+        brew_token=None,
+        parameters=[{"id": key, "value": value} for key, value in parameters.items()],
+    )
+
+
+def test_addon_parameters_valid():
+    addon_spec = get_addon_spec(
+        parameters={
+            "notification-email": "me@example.com",
+            "size": "4",
+            "has-external-resources": False,
+            "tier": "large",
+        }
+    )
+    assert not get_addon_parameters_errors(addon_spec=addon_spec, addon_definition=ADDON_DEFINITION)
+
+
+@pytest.mark.parametrize(
+    "parameters, expected_error",
+    [
+        pytest.param(
+            {"notification-email": "me@example.com", "notification-emial": "me@example.com"},
+            "unknown parameters ['notification-emial']",
+            id="unknown_parameter",
+        ),
+        pytest.param({}, "missing required parameter `notification-email`", id="missing_required_parameter"),
+        pytest.param(
+            {"notification-email": "me@example.com", "size": "large"},
+            "parameter `size` must be a number",
+            id="not_a_number",
+        ),
+        pytest.param(
+            {"notification-email": "me@example.com", "has-external-resources": "no"},
+            "parameter `has-external-resources` must be `true` or `false`",
+            id="not_a_boolean",
+        ),
+        pytest.param(
+            {"notification-email": "me@example.com", "tier": "medium"},
+            "parameter `tier` value `medium` is not allowed",
+            id="not_allowed_value",
+        ),
+    ],
+)
+def test_addon_parameters_invalid(parameters, expected_error):
+    errors = get_addon_parameters_errors(
+        addon_spec=get_addon_spec(parameters=parameters),
+        addon_definition=ADDON_DEFINITION,
+    )
+    assert len(errors) == 1
+    assert expected_error in errors[0]
+
+
+def test_addon_without_parameters_definition():
+    errors = get_addon_parameters_errors(
+        addon_spec=get_addon_spec(parameters={"param": "value"}),
+        addon_definition={"id": "addon", "version": {"id": "1.0.0"}},
+    )
+    assert errors == ["Addon addon on cluster cluster: unknown parameters ['param'], supported parameters: []"]
@@ -0,0 +1,72 @@
+import click
+import pytest
+
+from ocp_addons_operators_cli.utils.cli_utils import (
+    assert_plan_action,
+    assert_positive_time,
+    assert_products_names_patterns,
+    verify_products_deletion,
+    wait_for_products_deletion,
+)
+
+
+@pytest.fixture
+def pending_deletions(mocker):
+    return [
+        {
+            "resource": "Subscription operator",
+            "exists": mocker.MagicMock(side_effect=[True, False]),
+            "namespace": False,
+        },
+        {"resource": "Namespace operator", "exists": mocker.MagicMock(return_value=True), "namespace": True},
+    ]
+
+
+@pytest.fixture
+def mocked_sleep(mocker):
+    return mocker.patch("ocp_addons_operators_cli.utils.cli_utils.time.sleep")
+
+
+@pytest.mark.parametrize("time_name", ["ocm_cluster_cache_ttl", "ocm_addon_cache_ttl", "cluster_preflight_timeout"])
+@pytest.mark.parametrize("time_value", ["abc", "1x", "0"])
+def test_assert_positive_time_invalid(time_value, time_name):
+    with pytest.raises(click.Abort):
+        assert_positive_time(time_value=time_value, time_name=time_name)
+
+
+@pytest.mark.parametrize("time_name", ["ocm_cluster_cache_ttl", "ocm_addon_cache_ttl", "cluster_preflight_timeout"])
+@pytest.mark.parametrize("time_value", [None, "1h", "3600"])
+def test_assert_positive_time_valid(time_value, time_name):
+    assert_positive_time(time_value=time_value, time_name=time_name)
+
+
+def test_wait_for_products_deletion_skip_namespace_wait(mocked_sleep, pending_deletions):
+    leftovers = wait_for_products_deletion(pending_deletions=pending_deletions, timeout=60, skip_namespace_wait=True)
+
+    assert [leftover["resource"] for leftover in leftovers] == ["Namespace operator"]
+    assert mocked_sleep.call_count == 1
+
+
+def test_verify_products_deletion_timeout(mocker, mocked_sleep, pending_deletions):
+    mocker.patch("ocp_addons_operators_cli.utils.cli_utils.time.monotonic", side_effect=[0, 10, 100])
+    pending_deletions[0]["exists"] = mocker.MagicMock(return_value=True)
+
+    with pytest.raises(click.Abort):
+        verify_products_deletion(pending_deletions=pending_deletions, timeout=60)
+
+
+def test_assert_products_names_patterns():
+    products = [{"name": "*", "kubeconfig": "kubeconfig"}, {"name": "managed-odh"}]
+    assert_products_names_patterns(action="uninstall", products=products)
+    with pytest.raises(click.Abort):
+        assert_products_names_patterns(action="install", products=products)
+
+
+def test_assert_plan_action():
+    assert_plan_action(action="install", plan_in=None, plan_out="plan.json")
+    assert_plan_action(action="uninstall", plan_in="plan.json", plan_out=None)
+    with pytest.raises(click.Abort):
+        assert_plan_action(action="uninstall", plan_in=None, plan_out="plan.json")
+
+    with pytest.raises(click.Abort):
+        assert_plan_action(action="install", plan_in="plan.json", plan_out=None)
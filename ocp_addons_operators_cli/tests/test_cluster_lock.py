@@ -0,0 +1,173 @@
+import copy
+import datetime
+
+import click
+import pytest
+from kubernetes.client.exceptions import ApiException
+from kubernetes.dynamic.exceptions import ConflictError, NotFoundError
+
+from ocp_addons_operators_cli.utils.cluster_lock import (
+    CLUSTER_LOCK_NAME,
+    LEASE_TIME_FORMAT,
+    FileClusterLock,
+    LeaseClusterLock,
+    clusters_locks,
+)
+
+NAMESPACE = "default"
+
+
+class FakeResource:
+    def __init__(self, resource_dict):
+        self.resource_dict = resource_dict
+
+    def to_dict(self):
+        return copy.deepcopy(self.resource_dict)
+
+
+class FakeLeaseApi:
+    """
+    In-memory Lease API with the API server create and resourceVersion conflicts semantics.
+    """
+
+    def __init__(self):
+        self.leases = {}
+        self.resource_version = 0
+
+    def _store(self, body):
+        self.resource_version += 1
+        lease = copy.deepcopy(body)
+        lease["metadata"]["resourceVersion"] = str(self.resource_version)
+        self.leases[lease["metadata"]["name"]] = lease
+
+    def get(self, name, namespace):
+        if name not in self.leases:
+            raise NotFoundError(ApiException(status=404))
+
+        return FakeResource(resource_dict=self.leases[name])
+
+    def create(self, body, namespace):
+        if body["metadata"]["name"] in self.leases:
+            raise ConflictError(ApiException(status=409))
+
+        self._store(body=body)
+
+    def replace(self, body, namespace):
+        lease = self.leases.get(body["metadata"]["name"])
+        if not lease or lease["metadata"]["resourceVersion"] != body["metadata"]["resourceVersion"]:
+            raise ConflictError(ApiException(status=409))
+
+        self._store(body=body)
+
+    def delete(self, name, namespace):
+        if self.leases.pop(name, None) is None:
+            raise NotFoundError(ApiException(status=404))
+
+
+@pytest.fixture
+def lease_api():
+    return FakeLeaseApi()
+
+
+@pytest.fixture
+def no_wait(mocker):
+    mocker.patch("ocp_addons_operators_cli.utils.cluster_lock.time.sleep")
+    mocker.patch("ocp_addons_operators_cli.utils.cluster_lock.time.monotonic", side_effect=range(0, 1000, 10))
+
+
+def get_lease_lock(lease_api, holder_identity):
+    return LeaseClusterLock(
+        lease_api=lease_api,
+        cluster_name="cluster-1",
+        namespace=NAMESPACE,
+        holder_identity=holder_identity,
+    )
+
+
+def test_lease_lock_acquire_and_release(lease_api):
+    lock = get_lease_lock(lease_api=lease_api, holder_identity="run-1")
+    assert lock.acquire(wait_timeout=30)
+    assert lease_api.leases[CLUSTER_LOCK_NAME]["spec"]["holderIdentity"] == "run-1"
+
+    lock.release()
+    assert CLUSTER_LOCK_NAME not in lease_api.leases
+
+
+def test_lease_lock_held_by_another_run_times_out(lease_api, no_wait):
+    assert get_lease_lock(lease_api=lease_api, holder_identity="run-1")._try_acquire()
+    assert not get_lease_lock(lease_api=lease_api, holder_identity="run-2").acquire(wait_timeout=30)
+    assert lease_api.leases[CLUSTER_LOCK_NAME]["spec"]["holderIdentity"] == "run-1"
+
+
+def test_lease_lock_takes_over_expired_lease(lease_api):
+    assert get_lease_lock(lease_api=lease_api, holder_identity="run-1")._try_acquire()
+    expired_renew_time = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(minutes=5)
+    lease_api.leases[CLUSTER_LOCK_NAME]["spec"]["renewTime"] = expired_renew_time.strftime(LEASE_TIME_FORMAT)
+
+    assert get_lease_lock(lease_api=lease_api, holder_identity="run-2")._try_acquire()
+    lease_spec = lease_api.leases[CLUSTER_LOCK_NAME]["spec"]
+    assert lease_spec["holderIdentity"] == "run-2"
+    assert lease_spec["leaseTransitions"] == 1
+
+
+def test_lease_lock_concurrent_takeover_conflict(lease_api, mocker):
+    assert get_lease_lock(lease_api=lease_api, holder_identity="run-1")._try_acquire()
+    stale_lease = lease_api.get(name=CLUSTER_LOCK_NAME, namespace=NAMESPACE)
+    # Another run renewed the lease between our get and replace
+    assert get_lease_lock(lease_api=lease_api, holder_identity="run-1")._try_acquire()
+    mocker.patch.object(lease_api, "get", return_value=stale_lease)
+
+    assert not get_lease_lock(lease_api=lease_api, holder_identity="run-1")._try_acquire()
+
+
+def test_lease_lock_release_keeps_another_run_lease(lease_api):
+    assert get_lease_lock(lease_api=lease_api, holder_identity="run-1")._try_acquire()
+
+    get_lease_lock(lease_api=lease_api, holder_identity="run-2").release()
+    assert lease_api.leases[CLUSTER_LOCK_NAME]["spec"]["holderIdentity"] == "run-1"
+
+
+def test_file_lock_held_by_another_run_times_out(tmp_path, no_wait):
+    lock_file = str(tmp_path / "cluster-1.lock")
+    lock = FileClusterLock(lock_file=lock_file, cluster_name="cluster-1")
+    assert lock.acquire(wait_timeout=30)
+
+    assert not FileClusterLock(lock_file=lock_file, cluster_name="cluster-1").acquire(wait_timeout=30)
+
+    lock.release()
+    assert FileClusterLock(lock_file=lock_file, cluster_name="cluster-1").acquire(wait_timeout=30)
+
+
+def test_clusters_locks_acquired_in_cluster_name_order(mocker, tmp_path):
+    acquired_clusters = []
+    mocker.patch(
+        "ocp_addons_operators_cli.utils.cluster_lock.FileClusterLock.acquire",
+        side_effect=lambda self, wait_timeout: acquired_clusters.append(self.cluster_name) or True,
+        autospec=True,
+    )
+    operators = [{"cluster-name": "cluster-b", "ocp-client": None}, {"cluster-name": "cluster-a", "ocp-client": None}]
+
+    with clusters_locks(
+        operators=operators,
+        addons=[],
+        lock_type="file",
+        namespace=NAMESPACE,
+        wait_timeout=30,
+        cache_dir=str(tmp_path),
+    ):
+        assert acquired_clusters == ["cluster-a", "cluster-b"]
+
+
+def test_clusters_locks_timeout_aborts(mocker, tmp_path):
+    mocker.patch("ocp_addons_operators_cli.utils.cluster_lock.FileClusterLock.acquire", return_value=False)
+
+    with pytest.raises(click.Abort):
+        with clusters_locks(
+            operators=[{"cluster-name": "cluster-a", "ocp-client": None}],
+            addons=[],
+            lock_type="file",
+            namespace=NAMESPACE,
+            wait_timeout=30,
+            cache_dir=str(tmp_path),
+        ):
+            pass
@@ -0,0 +1,184 @@
+import pytest
+
+from ocp_addons_operators_cli.utils.discovery import (
+    discover_addons_specs,
+    discover_cluster_operators,
+    discover_operators_specs,
+    get_uninstall_waves,
+)
+from ocp_addons_operators_cli.utils.products_specs import AddonSpec, OperatorSpec
+
+DISCOVERY_PATH = "ocp_addons_operators_cli.utils.discovery"
+
+
+def get_resource(mocker, resource_dict):
+    resource = mocker.MagicMock()
+    resource.to_dict.return_value = resource_dict
+    return resource
+
+
+def get_subscription(name, namespace, installed_csv=None, owned=False):
+    metadata = {"name": name, "namespace": namespace}
+    if owned:
+        metadata["ownerReferences"] = [{"kind": "Addon", "name": "addon-1"}]
+
+    return {"metadata": metadata, "status": {"installedCSV": installed_csv}}
+
+
+def get_csv(name, namespace, owned_crds=(), required_crds=(), copied=False):
+    return {
+        "metadata": {"name": name, "namespace": namespace, "labels": {"olm.copiedFrom": "ns"} if copied else {}},
+        "spec": {
+            "customresourcedefinitions": {
+                "owned": [{"name": crd} for crd in owned_crds],
+                "required": [{"name": crd} for crd in required_crds],
+            }
+        },
+    }
+
+
+@pytest.fixture
+def cluster_resources(mocker):
+    subscriptions = [
+        get_subscription(name="servicemeshoperator", namespace="openshift-operators", installed_csv="mesh.v1"),
+        get_subscription(name="kiali-ossm", namespace="openshift-operators", installed_csv="kiali.v1"),
+        get_subscription(name="rhods-operator", namespace="redhat-ods-operator", installed_csv="rhods.v1"),
+        get_subscription(name="addon-1", namespace="redhat-addon-1", installed_csv="addon.v1", owned=True),
+    ]
+    csvs = [
+        get_csv(name="mesh.v1", namespace="openshift-operators", owned_crds=("smcp",), required_crds=("kiali",)),
+        get_csv(name="kiali.v1", namespace="openshift-operators", owned_crds=("kiali",)),
+        get_csv(name="kiali.v1", namespace="redhat-ods-operator", owned_crds=("kiali",), copied=True),
+        get_csv(name="rhods.v1", namespace="redhat-ods-operator", required_crds=("smcp",)),
+    ]
+    subscription_get = mocker.patch(
+        f"{DISCOVERY_PATH}.Subscription.get",
+        return_value=[get_resource(mocker=mocker, resource_dict=subscription) for subscription in subscriptions],
+    )
+    mocker.patch(
+        f"{DISCOVERY_PATH}.ClusterServiceVersion.get",
+        return_value=[get_resource(mocker=mocker, resource_dict=csv) for csv in csvs],
+    )
+    return subscription_get
+
+
+def test_discover_cluster_operators(mocker, cluster_resources):
+    operators = discover_cluster_operators(ocp_client=mocker.MagicMock(), name_pattern="*")
+
+    assert cluster_resources.call_count == 1
+    assert {operator["name"]: operator for operator in operators} == {
+        "servicemeshoperator": {
+            "name": "servicemeshoperator",
+            "namespace": "openshift-operators",
+            "clean-up-namespace": False,
+            "uninstall-after": ("rhods-operator",),
+        },
+        "kiali-ossm": {
+            "name": "kiali-ossm",
+            "namespace": "openshift-operators",
+            "clean-up-namespace": False,
+            "uninstall-after": ("servicemeshoperator",),
+        },
+        "rhods-operator": {
+            "name": "rhods-operator",
+            "namespace": "redhat-ods-operator",
+            "clean-up-namespace": True,
+            "uninstall-after": (),
+        },
+    }
+
+
+def test_discover_cluster_operators_filters(mocker, cluster_resources):
+    operators = discover_cluster_operators(
+        ocp_client=mocker.MagicMock(),
+        name_pattern="rhods-*",
+        label_selector="team=ai",
+    )
+
+    assert cluster_resources.call_args.kwargs["label_selector"] == "team=ai"
+    # Namespaces are not deleted when Subscriptions are filtered by labels
+    assert [(operator["name"], operator["clean-up-namespace"]) for operator in operators] == [
+        ("rhods-operator", False)
+    ]
+
+
+def test_discover_operators_specs(mocker, cluster_resources):
+    mocker.patch(f"{DISCOVERY_PATH}.get_ocp_client")
+    mocker.patch(f"{DISCOVERY_PATH}.get_cluster_name_from_kubeconfig", return_value="cluster-1")
+    operators_specs = discover_operators_specs(
+        operators_specs=[
+            OperatorSpec(name="rhods-operator", kubeconfig="kubeconfig", timeout=60),
+            OperatorSpec(name="*", kubeconfig="kubeconfig", timeout=60),
+        ]
+    )
+
+    assert sorted(
+        (operator_spec.name, operator_spec.namespace, operator_spec.timeout) for operator_spec in operators_specs
+    ) == [
+        ("kiali-ossm", "openshift-operators", 60),
+        ("rhods-operator", None, 60),
+        ("servicemeshoperator", "openshift-operators", 60),
+    ]
+
+
+def test_discover_addons_specs(mocker):
+    ocm_client = mocker.MagicMock()
+    ocm_client.api_clusters_mgmt_v1_clusters_cluster_id_addons_get.return_value.items = [
+        mocker.MagicMock(id=addon_id) for addon_id in ("managed-odh", "ocm-addon-test-operator", "managed-api-service")
+    ]
+    mocker.patch(f"{DISCOVERY_PATH}.get_addon_ocm_client", return_value=ocm_client)
+    mocker.patch(f"{DISCOVERY_PATH}.get_cluster_data", return_value={"id": "cluster-id"})
+    addons_specs = discover_addons_specs(
+        addons_specs=[
+            AddonSpec(
+                name="managed-*",
+                cluster_name="cluster-1",
+                ocm_env="stage",
+                timeout=60,
+                rosa=False,
+                brew_token=None,
+                parameters=[],
+            )
+        ],
+        ocm_token="token",
+        endpoint="endpoint",
+    )
+
+    ocm_client.api_clusters_mgmt_v1_clusters_cluster_id_addons_get.assert_called_once_with(cluster_id="cluster-id")
+    assert [(addon_spec.name, addon_spec.cluster_name) for addon_spec in addons_specs] == [
+        ("managed-api-service", "cluster-1"),
+        ("managed-odh", "cluster-1"),
+    ]
+
+
+def test_get_uninstall_waves():
+    def _operator(name, cluster_name, uninstall_after=()):
+        return {
+            "name": name,
+            "cluster-name": cluster_name,
+            "spec": OperatorSpec(name=name, kubeconfig="kubeconfig", timeout=60, uninstall_after=uninstall_after),
+        }
+
+    addons = [{"name": "addon-1"}]
+    operators = [
+        _operator(name="kiali-ossm", cluster_name="cluster-1", uninstall_after=("servicemeshoperator",)),
+        _operator(name="servicemeshoperator", cluster_name="cluster-1", uninstall_after=("rhods-operator",)),
+        _operator(name="rhods-operator", cluster_name="cluster-1"),
+        # Dependents on other clusters do not delay the operator
+        _operator(name="servicemeshoperator", cluster_name="cluster-2", uninstall_after=("rhods-operator",)),
+    ]
+
+    waves = get_uninstall_waves(addons=addons, operators=operators)
+
+    assert [
+        (wave_addons, [(operator["cluster-name"], operator["name"]) for operator in wave_operators])
+        for wave_addons, wave_operators in waves
+    ] == [
+        (addons, [("cluster-1", "rhods-operator"), ("cluster-2", "servicemeshoperator")]),
+        ([], [("cluster-1", "servicemeshoperator")]),
+        ([], [("cluster-1", "kiali-ossm")]),
+    ]
+
+
+def test_get_uninstall_waves_without_dependencies():
+    assert get_uninstall_waves(addons=[{"name": "addon-1"}], operators=[]) == [([{"name": "addon-1"}], [])]
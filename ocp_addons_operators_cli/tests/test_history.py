@@ -0,0 +1,73 @@
+import pytest
+
+from ocp_addons_operators_cli.utils.history import (
+    ProductsHistory,
+    get_cluster_type,
+    get_suggested_timeout,
+    record_product_action_duration,
+    schedule_products_actions,
+)
+
+
+@pytest.fixture
+def run_history(mocker, tmp_path):
+    run_history = ProductsHistory()
+    run_history.enable(db_file=str(tmp_path / "history" / "products-history.sqlite"))
+    mocker.patch("ocp_addons_operators_cli.utils.history.RUN_HISTORY", run_history)
+    return run_history
+
+
+def product_action(name, timeout=3600):
+    return {"product-type": "addon", "name": name, "cluster-type": "ocp-4.14", "timeout": timeout}
+
+
+def test_schedule_products_actions_longest_first(run_history):
+    for name, duration in (("short", 120), ("long", 1500), ("short", 100)):
+        record_product_action_duration(product_action=product_action(name=name), action="install", duration=duration)
+    run_history.write()
+
+    products_actions = [product_action(name=name) for name in ("short", "long", "new", "other-new")]
+
+    ordered_products_actions = schedule_products_actions(products_actions=products_actions, action="install")
+
+    assert [_product_action["name"] for _product_action in ordered_products_actions] == [
+        "new",
+        "other-new",
+        "long",
+        "short",
+    ]
+    assert schedule_products_actions(products_actions=products_actions, action="uninstall") == products_actions
+
+
+def test_products_history_latest_durations(run_history):
+    for duration in range(15):
+        run_history.record(
+            product_type="addon",
+            name="addon",
+            cluster_type="ocp-4.14",
+            action="install",
+            duration=duration,
+        )
+    run_history.write()
+
+    durations = run_history.get_durations(product_type="addon", name="addon", cluster_type="ocp-4.14", action="install")
+
+    assert len(durations) == 10
+    assert not run_history.records
+
+
+@pytest.mark.parametrize(
+    "durations, suggested_timeout",
+    [
+        pytest.param([100, 120], None, id="not_enough_runs"),
+        pytest.param([100, 120, 110], 300, id="min_timeout"),
+        pytest.param([600, 1000, 800], 1500, id="rounded_up_to_minutes"),
+    ],
+)
+def test_get_suggested_timeout(durations, suggested_timeout):
+    assert get_suggested_timeout(durations=durations) == suggested_timeout
+
+
+def test_get_cluster_type():
+    assert get_cluster_type(ocp_version="4.14.5") == "ocp-4.14"
+    assert get_cluster_type(ocp_version=None) == "ocp-unknown"
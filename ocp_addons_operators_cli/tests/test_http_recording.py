@@ -0,0 +1,94 @@
+import http.server
+import json
+import threading
+import time
+
+import pytest
+import requests
+import urllib3
+
+from ocp_addons_operators_cli.utils.http_recording import REPLAY_NOT_FOUND_STATUS, HttpRecording
+
+
+class StateHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serve an install state which progresses on every request.
+    """
+
+    states = []
+
+    def do_GET(self):
+        body = json.dumps({"state": self.states.pop(0) if len(self.states) > 1 else self.states[0]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def live_server_url():
+    StateHandler.states = ["installing", "installing", "ready"]
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StateHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def recording_file(tmp_path, live_server_url):
+    recording = HttpRecording()
+    recording.start_recording()
+    try:
+        assert requests.get(f"{live_server_url}/addon").json() == {"state": "installing"}
+        http_pool = urllib3.PoolManager()
+        for expected_state in ("installing", "ready"):
+            assert json.loads(http_pool.request("GET", f"{live_server_url}/addon").data) == {"state": expected_state}
+    finally:
+        recording.stop()
+
+    _recording_file = str(tmp_path / "recording.json")
+    recording.write(recording_file=_recording_file)
+    return _recording_file, live_server_url
+
+
+def test_http_record(recording_file):
+    _recording_file, _ = recording_file
+    with open(_recording_file) as fd:
+        exchanges = json.load(fd)["exchanges"]
+
+    assert [(exchange["method"], exchange["url"], exchange["status"]) for exchange in exchanges] == [
+        ("GET", "/addon", 200)
+    ] * 3
+
+
+def test_http_replay(recording_file):
+    _recording_file, live_server_url = recording_file
+    StateHandler.states = ["live server must not be called"]
+    recording = HttpRecording()
+    recording.start_replay(recording_file=_recording_file, speed=0)
+    try:
+        states = [requests.get(f"{live_server_url}/addon").json()["state"] for _ in range(4)]
+        not_recorded_response = requests.get(f"{live_server_url}/operator")
+    finally:
+        recording.stop()
+
+    # The last recorded exchange is repeated when the replayed run polls more
+    assert states == ["installing", "installing", "ready", "ready"]
+    assert not_recorded_response.status_code == REPLAY_NOT_FOUND_STATUS
+
+
+def test_http_replay_speed_compresses_sleeps(recording_file):
+    _recording_file, _ = recording_file
+    recording = HttpRecording()
+    recording.start_replay(recording_file=_recording_file, speed=100)
+    try:
+        start_time = time.monotonic()
+        time.sleep(1)
+        assert time.monotonic() - start_time < 0.5
+    finally:
+        recording.stop()
@@ -0,0 +1,110 @@
+import pytest
+from ocm_python_client.exceptions import ApiException
+
+from ocp_addons_operators_cli.utils.cli_utils import run_product_action
+from ocp_addons_operators_cli.utils.metrics import (
+    API_REQUESTS_METRIC,
+    PHASE_DURATION_METRIC,
+    PRODUCTS_METRIC,
+    RunMetrics,
+    api_requests_retry,
+    count_api_requests,
+    get_ocp_api_endpoint,
+)
+
+
+PRODUCT_ACTION = {"product-type": "addon", "name": "addon-name", "cluster-name": "cluster-name"}
+
+
+@pytest.fixture
+def run_metrics(mocker):
+    run_metrics = RunMetrics()
+    mocker.patch("ocp_addons_operators_cli.utils.metrics.RUN_METRICS", run_metrics)
+    return run_metrics
+
+
+def test_render_counter_with_escaped_labels():
+    run_metrics = RunMetrics()
+    run_metrics.inc(name=PRODUCTS_METRIC, labels={"action": 'in"stall', "outcome": "success"})
+    run_metrics.inc(name=PRODUCTS_METRIC, labels={"outcome": "success", "action": 'in"stall'})
+
+    rendered = run_metrics.render()
+
+    assert f"# TYPE {PRODUCTS_METRIC} counter" in rendered
+    assert f'{PRODUCTS_METRIC}{{action="in\\"stall",outcome="success"}} 2' in rendered
+    assert rendered.endswith("\n")
+
+
+def test_render_histogram():
+    run_metrics = RunMetrics()
+    run_metrics.observe(name=PHASE_DURATION_METRIC, value=10, labels={"phase": "prepare"})
+
+    rendered = run_metrics.render()
+
+    assert f'{PHASE_DURATION_METRIC}_bucket{{phase="prepare",le="5.0"}} 0' in rendered
+    assert f'{PHASE_DURATION_METRIC}_bucket{{phase="prepare",le="15.0"}} 1' in rendered
+    assert f'{PHASE_DURATION_METRIC}_bucket{{phase="prepare",le="+Inf"}} 1' in rendered
+    assert f'{PHASE_DURATION_METRIC}_sum{{phase="prepare"}} 10.0' in rendered
+    assert f'{PHASE_DURATION_METRIC}_count{{phase="prepare"}} 1' in rendered
+
+
+@pytest.mark.parametrize(
+    "resource_path, expected_endpoint",
+    [
+        pytest.param(
+            "/apis/operators.coreos.com/v1alpha1/namespaces/ns/subscriptions/sub",
+            "/apis/operators.coreos.com/v1alpha1/namespaces/{namespace}/subscriptions/{name}",
+            id="namespaced_resource",
+        ),
+        pytest.param("/api/v1/namespaces/ns", "/api/v1/namespaces/{name}", id="cluster_resource"),
+        pytest.param(
+            "/api/v1/namespaces/ns/pods/pod/log",
+            "/api/v1/namespaces/{namespace}/pods/{name}/log",
+            id="sub_resource",
+        ),
+        pytest.param("/version", "/version", id="not_resource_path"),
+    ],
+)
+def test_get_ocp_api_endpoint(resource_path, expected_endpoint):
+    assert get_ocp_api_endpoint(resource_path=resource_path) == expected_endpoint
+
+
+def test_run_product_action_outcome(run_metrics, mocker):
+    def _failed_action():
+        raise ValueError("failed")
+
+    run_product_action(
+        product_action={"func": mocker.MagicMock(), "kwargs": {}, **PRODUCT_ACTION},
+        action="install",
+    )
+    with pytest.raises(ValueError):
+        run_product_action(
+            product_action={"func": _failed_action, "kwargs": {}, **PRODUCT_ACTION},
+            action="install",
+        )
+
+    rendered = run_metrics.render()
+
+    assert f'{PRODUCTS_METRIC}{{action="install",outcome="success",product_type="addon"}} 1' in rendered
+    assert f'{PRODUCTS_METRIC}{{action="install",outcome="failure",product_type="addon"}} 1' in rendered
+    assert f'{PHASE_DURATION_METRIC}_count{{phase="install",product_type="addon"}} 2' in rendered
+
+
+def test_count_api_requests_outcome_and_retry(mocker, run_metrics):
+    mocker.patch.object(run_metrics, "enabled", True)
+    api_client = mocker.MagicMock()
+    api_client.call_api.side_effect = [None, ApiException(status=503), None]
+    count_api_requests(api_client=api_client, api_name="ocm")
+
+    api_client.call_api("/api/clusters_mgmt/v1/clusters", "GET")
+    with api_requests_retry(retry=True):
+        with pytest.raises(ApiException):
+            api_client.call_api("/api/clusters_mgmt/v1/clusters", "GET")
+
+        api_client.call_api("/api/clusters_mgmt/v1/clusters", "GET")
+
+    rendered = run_metrics.render()
+    labels = 'api="ocm",endpoint="/api/clusters_mgmt/v1/clusters",method="GET"'
+    assert f'{API_REQUESTS_METRIC}{{{labels},outcome="success",retry="false"}} 1' in rendered
+    assert f'{API_REQUESTS_METRIC}{{{labels},outcome="503",retry="true"}} 1' in rendered
+    assert f'{API_REQUESTS_METRIC}{{{labels},outcome="success",retry="true"}} 1' in rendered
@@ -0,0 +1,236 @@
+import base64
+import json
+import os
+import stat
+import time
+
+import pytest
+from ocm_python_client.api_client import ApiClient
+from ocm_python_client.exceptions import NotFoundException, UnauthorizedException
+
+from ocp_addons_operators_cli.utils.cache_utils import read_cache_file
+from ocp_addons_operators_cli.utils.ocm_utils import (
+    CachedTokenOCMPythonClient,
+    get_access_token_expiration,
+    get_addon_definition,
+    get_cluster_data,
+    get_ocm_client_with_cached_token,
+)
+
+OCM_UTILS_PATH = "ocp_addons_operators_cli.utils.ocm_utils"
+
+
+def jwt_access_token(expires_at):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": expires_at}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+@pytest.fixture
+def mocked_ocm_clients(mocker):
+    ocm_client = mocker.patch(f"{OCM_UTILS_PATH}.OCMPythonClient")
+    ocm_client.return_value.client_config.access_token = jwt_access_token(expires_at=int(time.time()) + 900)
+    cached_token_ocm_client = mocker.patch(f"{OCM_UTILS_PATH}.CachedTokenOCMPythonClient")
+    return ocm_client, cached_token_ocm_client
+
+
+def get_client(cache_dir, ocm_token="ocm-token"):
+    return get_ocm_client_with_cached_token(
+        ocm_token=ocm_token,
+        endpoint="https://sso/token",
+        ocm_env="stage",
+        token_cache_dir=str(cache_dir),
+    )
+
+
+def test_get_access_token_expiration():
+    assert get_access_token_expiration(access_token=jwt_access_token(expires_at=1234)) == 1234
+
+
+def test_get_access_token_expiration_not_jwt():
+    assert get_access_token_expiration(access_token="not-a-jwt") is None
+
+
+def test_ocm_token_cache_reused(tmp_path, mocked_ocm_clients):
+    ocm_client, cached_token_ocm_client = mocked_ocm_clients
+    get_client(cache_dir=tmp_path)
+    get_client(cache_dir=tmp_path)
+
+    assert ocm_client.call_count == 1
+    assert cached_token_ocm_client.call_count == 1
+
+
+def test_ocm_token_cache_file_permissions(tmp_path, mocked_ocm_clients):
+    get_client(cache_dir=tmp_path)
+
+    cache_files = [
+        os.path.join(root, _file)
+        for root, _, files in os.walk(tmp_path)
+        for _file in files
+        if _file.endswith(".json")
+    ]
+    assert len(cache_files) == 1
+    assert "ocm-token" not in os.path.basename(cache_files[0])
+    assert stat.S_IMODE(os.stat(cache_files[0]).st_mode) == 0o600
+
+
+def test_ocm_token_cache_different_token(tmp_path, mocked_ocm_clients):
+    ocm_client, _ = mocked_ocm_clients
+    get_client(cache_dir=tmp_path)
+    get_client(cache_dir=tmp_path, ocm_token="another-ocm-token")
+
+    assert ocm_client.call_count == 2
+
+
+def test_ocm_token_cache_expired_token(tmp_path, mocked_ocm_clients):
+    ocm_client, cached_token_ocm_client = mocked_ocm_clients
+    ocm_client.return_value.client_config.access_token = jwt_access_token(expires_at=int(time.time()) + 30)
+    get_client(cache_dir=tmp_path)
+    get_client(cache_dir=tmp_path)
+
+    assert ocm_client.call_count == 2
+    assert cached_token_ocm_client.call_count == 0
+
+
+def test_cached_token_ocm_client_refreshed_token_written_to_cache(tmp_path, mocker):
+    cache_file = str(tmp_path / "token.json")
+    refreshed_access_token = jwt_access_token(expires_at=int(time.time()) + 900)
+    mocker.patch.object(ApiClient, "call_api", side_effect=[UnauthorizedException(), "response"])
+    mocker.patch.object(
+        CachedTokenOCMPythonClient,
+        "_OCMPythonClient__confirm_auth",
+        return_value=refreshed_access_token,
+    )
+    ocm_client = CachedTokenOCMPythonClient(
+        token="ocm-token",
+        endpoint="https://sso/token",
+        access_token="rejected-access-token",
+        api_host="stage",
+        cache_file=cache_file,
+    )
+
+    assert ocm_client.call_api("/api/clusters_mgmt/v1/clusters", "GET") == "response"
+    assert read_cache_file(cache_file=cache_file)["access-token"] == refreshed_access_token
+
+
+@pytest.fixture
+def mocked_cluster(mocker):
+    cluster = mocker.patch(f"{OCM_UTILS_PATH}.Cluster")
+    cluster_instance = cluster.return_value.exists
+    cluster_instance.id = "cluster-id"
+    cluster_instance.get.side_effect = lambda key, default=None: {
+        "api": {"url": "https://api.cluster:6443"},
+        "openshift_version": "4.15.0",
+    }.get(key, default)
+    cluster.return_value.kubeconfig = {"clusters": [{"name": "cluster"}]}
+    return cluster
+
+
+def get_cached_cluster_data(cache_dir, ocm_client):
+    return get_cluster_data(
+        ocm_client=ocm_client,
+        cluster_name="cluster",
+        ocm_env="stage",
+        cluster_cache_dir=str(cache_dir),
+        cluster_cache_ttl=3600,
+    )
+
+
+def test_cluster_cache_reused(tmp_path, mocker, mocked_cluster):
+    mocked_cluster_by_id = mocker.patch(f"{OCM_UTILS_PATH}.ClusterById")
+    mocked_cluster_by_id.return_value.kubeconfig = mocked_cluster.return_value.kubeconfig
+    mocked_cluster_by_id.return_value.name = "cluster"
+    ocm_client = mocker.MagicMock()
+    ocm_client.api_clusters_mgmt_v1_clusters_cluster_id_get.return_value = mocked_cluster.return_value.exists
+    cluster_data = get_cached_cluster_data(cache_dir=tmp_path, ocm_client=ocm_client)
+    cached_cluster_data = get_cached_cluster_data(cache_dir=tmp_path, ocm_client=ocm_client)
+
+    assert mocked_cluster.call_count == 1
+    assert cached_cluster_data["id"] == cluster_data["id"] == "cluster-id"
+    ocm_client.api_clusters_mgmt_v1_clusters_cluster_id_get.assert_called_once_with(cluster_id="cluster-id")
+    mocked_cluster_by_id.assert_called_once_with(client=ocm_client, name="cluster", cluster_id="cluster-id")
+
+
+def test_cluster_cache_kubeconfig_not_cached(tmp_path, mocker, mocked_cluster):
+    cluster_data = get_cached_cluster_data(cache_dir=tmp_path, ocm_client=mocker.MagicMock())
+
+    assert not os.path.realpath(cluster_data["kubeconfig"]).startswith(os.path.realpath(tmp_path))
+    assert [_file for _file in os.listdir(tmp_path / "ocm-clusters") if not _file.endswith((".json", ".lock"))] == []
+    os.unlink(cluster_data["kubeconfig"])
+
+
+def test_cluster_cache_invalidated_on_not_found(tmp_path, mocker, mocked_cluster):
+    ocm_client = mocker.MagicMock()
+    ocm_client.api_clusters_mgmt_v1_clusters_cluster_id_get.side_effect = NotFoundException()
+    get_cached_cluster_data(cache_dir=tmp_path, ocm_client=ocm_client)
+    get_cached_cluster_data(cache_dir=tmp_path, ocm_client=ocm_client)
+
+    assert mocked_cluster.call_count == 2
+
+
+def test_cluster_cache_missing_keys(tmp_path, mocker, mocked_cluster):
+    ocm_client = mocker.MagicMock()
+    get_cached_cluster_data(cache_dir=tmp_path, ocm_client=ocm_client)
+    cache_dir = tmp_path / "ocm-clusters"
+    for cache_file in cache_dir.glob("*.json"):
+        cache_file.write_text(json.dumps({"name": "cluster"}))
+
+    get_cached_cluster_data(cache_dir=tmp_path, ocm_client=ocm_client)
+
+    assert mocked_cluster.call_count == 2
+    ocm_client.api_clusters_mgmt_v1_clusters_cluster_id_get.assert_not_called()
+
+
+@pytest.fixture
+def addon_ocm_client(mocker):
+    ocm_client = mocker.MagicMock()
+    ocm_client.api_clusters_mgmt_v1_addons_addon_id_get.return_value.to_dict.return_value = {
+        "id": "addon",
+        "name": "Addon",
+        "version": {"id": "1.0.0", "channel": "stable"},
+        "parameters": {
+            "items": [{"id": "param", "value_type": "string", "required": True, "description": "Param"}],
+        },
+    }
+    return ocm_client
+
+
+def test_get_addon_definition(addon_ocm_client):
+    assert get_addon_definition(ocm_client=addon_ocm_client, addon_name="addon", ocm_env="stage") == {
+        "id": "addon",
+        "version": {"id": "1.0.0"},
+        "parameters": {"items": [{"id": "param", "value_type": "string", "required": True}]},
+    }
+
+
+def test_get_addon_definition_cache_reused(tmp_path, addon_ocm_client):
+    for _ in range(2):
+        addon_definition = get_addon_definition(
+            ocm_client=addon_ocm_client,
+            addon_name="addon",
+            ocm_env="stage",
+            addon_cache_dir=str(tmp_path),
+            addon_cache_ttl=3600,
+        )
+
+    assert addon_definition["version"] == {"id": "1.0.0"}
+    assert addon_ocm_client.api_clusters_mgmt_v1_addons_addon_id_get.call_count == 1
+
+
+def test_get_addon_definition_cache_expired(tmp_path, mocker, addon_ocm_client):
+    get_addon_definition(
+        ocm_client=addon_ocm_client,
+        addon_name="addon",
+        ocm_env="stage",
+        addon_cache_dir=str(tmp_path),
+        addon_cache_ttl=3600,
+    )
+    mocker.patch(f"{OCM_UTILS_PATH}.time.time", return_value=time.time() + 7200)
+    get_addon_definition(
+        ocm_client=addon_ocm_client,
+        addon_name="addon",
+        ocm_env="stage",
+        addon_cache_dir=str(tmp_path),
+        addon_cache_ttl=3600,
+    )
+
+    assert addon_ocm_client.api_clusters_mgmt_v1_addons_addon_id_get.call_count == 2
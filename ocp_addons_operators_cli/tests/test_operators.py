@@ -4,7 +4,16 @@ import os
 import pytest
 from semver import Version
 
-from ocp_addons_operators_cli.utils.operators_utils import prepare_operators
+from ocp_addons_operators_cli.utils.operators_utils import (
+    CSV_FAILED_PHASE,
+    CSV_SUCCEEDED_PHASE,
+    create_operators_catalog_sources,
+    prepare_operators,
+    prepare_operators_action,
+    wait_for_operator_install_progress,
+    wait_for_operators_csvs,
+)
+from ocp_addons_operators_cli.utils.products_specs import get_operator_specs
 
 pytestmark = pytest.mark.usefixtures("mocked_prepare_operators")
 
@@ -91,6 +100,10 @@ def prepare_operator_user_kwargs_with_local_iib_path():
     return {"local_operators_latest_iib_path": "iib_path"}
 
 
+def operator_spec(operator_dict):
+    return get_operator_specs(operator_dict=operator_dict, brew_token=operator_dict["brew-token"], errors=[])[0]
+
+
 def cluster_version_major_minor_str(cluster_version):
     return f"v{cluster_version.major}.{cluster_version.minor}"
 
@@ -111,7 +124,7 @@ class TestPrepareOperatorFromJson:
         prepare_operator_user_kwargs_with_local_iib_path,
     ):
         _operators_list = prepare_operators(
-            operators=[base_operator_dict],
+            operators=[operator_spec(operator_dict=base_operator_dict)],
             install=True,
             user_kwargs_dict=prepare_operator_user_kwargs_with_local_iib_path,
         )
@@ -134,7 +147,7 @@ class TestPrepareOperatorFromJson:
         prepare_operator_user_kwargs_with_local_iib_path,
     ):
         _operators_list = prepare_operators(
-            operators=[operator_dict_with_unmatched_operator],
+            operators=[operator_spec(operator_dict=operator_dict_with_unmatched_operator)],
             install=True,
             user_kwargs_dict=prepare_operator_user_kwargs_with_local_iib_path,
         )
@@ -149,7 +162,7 @@ class TestPrepareOperatorFromJson:
         prepare_operator_user_kwargs_with_local_iib_path,
     ):
         _operators_list = prepare_operators(
-            operators=[base_operator_dict],
+            operators=[operator_spec(operator_dict=base_operator_dict)],
             install=True,
             user_kwargs_dict=prepare_operator_user_kwargs_with_local_iib_path,
         )
@@ -174,7 +187,7 @@ class TestPrepareOperatorFromJson:
             match=f".*Missing {cluster_version_major_minor} / {missing_job_name}.*",
         ):
             prepare_operators(
-                operators=[base_operator_dict],
+                operators=[operator_spec(operator_dict=base_operator_dict)],
                 install=True,
                 user_kwargs_dict=prepare_operator_user_kwargs_with_local_iib_path,
             )
@@ -205,7 +218,7 @@ def test_prepare_operator_with_iib_from_json_no_ocp_match(
         match=f".*Missing {cluster_version_major_minor} / {job_name_as_environment_variable}.*",
     ):
         prepare_operators(
-            operators=[base_operator_dict],
+            operators=[operator_spec(operator_dict=base_operator_dict)],
             install=True,
             user_kwargs_dict=prepare_operator_user_kwargs_with_local_iib_path,
         )
@@ -214,9 +227,100 @@ def test_prepare_operator_with_iib_from_json_no_ocp_match(
 @pytest.mark.parametrize("base_iib_dict", [True], indirect=True)
 class TestPrepareOperatorFromConfig:
     def test_prepare_operator_with_iib_from_config(self, operator_dict_with_iib):
-        _operators_list = prepare_operators(operators=[operator_dict_with_iib], install=True, user_kwargs_dict={})
-        assert _operators_list[0]["iib_index_image"] == operator_dict_with_iib["iib_index_image"]
+        _operators_list = prepare_operators(
+            operators=[operator_spec(operator_dict=operator_dict_with_iib)], install=True, user_kwargs_dict={}
+        )
+        assert _operators_list[0]["iib_index_image"] == operator_dict_with_iib["iib"]
 
     def test_prepare_operator_without_iib_from_config(self, base_operator_dict):
-        _operators_list = prepare_operators(operators=[base_operator_dict], install=True, user_kwargs_dict={})
+        _operators_list = prepare_operators(
+            operators=[operator_spec(operator_dict=base_operator_dict)], install=True, user_kwargs_dict={}
+        )
         assert _operators_list[0]["iib_index_image"] is None
+
+
+@pytest.fixture
+def operators_with_shared_iib(base_operator_dict):
+    operators = []
+    for idx, cluster_name in enumerate(("cluster-1", "cluster-1", "cluster-2")):
+        operator_dict = copy.deepcopy(base_operator_dict)
+        operator_dict["name"] = f"operator-{idx}"
+        operators.append({
+            "spec": operator_spec(operator_dict=operator_dict),
+            "name": operator_dict["name"],
+            "cluster-name": cluster_name,
+            "cluster-type": "ocp-4.14",
+            "ocp-client": f"{cluster_name}-client",
+            "iib_index_image": "registry/iib:1",
+        })
+
+    return operators
+
+
+@pytest.mark.parametrize("base_iib_dict", [True], indirect=True)
+def test_create_operators_catalog_sources_once_per_cluster_image(mocker, operators_with_shared_iib):
+    create_catalog_source_for_iib_install = mocker.patch(
+        "ocp_addons_operators_cli.utils.operators_utils.create_catalog_source_for_iib_install"
+    )
+    create_operators_catalog_sources(operators=operators_with_shared_iib, parallel=True)
+
+    assert create_catalog_source_for_iib_install.call_count == 2
+    assert {call.kwargs["admin_client"] for call in create_catalog_source_for_iib_install.call_args_list} == {
+        "cluster-1-client",
+        "cluster-2-client",
+    }
+    assert len({operator["catalog-source"] for operator in operators_with_shared_iib}) == 1
+
+    operators_actions = prepare_operators_action(operators=operators_with_shared_iib, install=True)
+    for operator_action in operators_actions:
+        assert operator_action["kwargs"]["source"] == operators_with_shared_iib[0]["catalog-source"]
+        assert "iib_index_image" not in operator_action["kwargs"]
+
+
+@pytest.mark.parametrize("base_iib_dict", [True], indirect=True)
+def test_prepare_operators_group_action_per_cluster(operators_with_shared_iib):
+    operators_actions = prepare_operators_action(operators=operators_with_shared_iib, install=True, group_wait=True)
+
+    assert [operator_action["cluster-name"] for operator_action in operators_actions] == ["cluster-1", "cluster-2"]
+    assert [len(operator_action["kwargs"]["operators"]) for operator_action in operators_actions] == [2, 1]
+
+
+@pytest.mark.parametrize("base_iib_dict", [True], indirect=True)
+def test_wait_for_operators_csvs_single_list_call_per_namespace(mocker):
+    mocker.patch("ocp_addons_operators_cli.utils.operators_utils.time.sleep")
+    get_namespace_csvs_phases = mocker.patch(
+        "ocp_addons_operators_cli.utils.operators_utils.get_namespace_csvs_phases",
+        side_effect=[
+            {"operator-1": "Installing", "operator-2": CSV_FAILED_PHASE},
+            {"operator-1": CSV_SUCCEEDED_PHASE},
+        ],
+    )
+
+    failed_operators = wait_for_operators_csvs(
+        admin_client="client",
+        operators_namespaces={"operator-1": "openshift-operators", "operator-2": "openshift-operators"},
+        timeouts={"operator-1": 60, "operator-2": 60},
+    )
+
+    assert failed_operators == ["operator-2"]
+    assert get_namespace_csvs_phases.call_count == 2
+
+
+@pytest.mark.parametrize("base_iib_dict", [True], indirect=True)
+def test_wait_for_operator_install_progress_install_plan_failed(mocker):
+    mocker.patch("ocp_addons_operators_cli.utils.operators_utils.time.sleep")
+    mocker.patch(
+        "ocp_addons_operators_cli.utils.operators_utils.get_operator_install_status",
+        side_effect=[
+            {"subscription-state": "UpgradePending", "install-plan-phase": "Installing"},
+            {"subscription-state": "UpgradePending", "install-plan-phase": "Failed"},
+        ],
+    )
+
+    with pytest.raises(RuntimeError, match="InstallPlan failed, last status"):
+        wait_for_operator_install_progress(
+            admin_client="client",
+            subscription=mocker.MagicMock(),
+            timeout=3600,
+            stall_timeout=600,
+        )
@@ -0,0 +1,218 @@
+import json
+
+import click
+import pytest
+
+from ocp_addons_operators_cli.utils.kubeconfig_utils import get_kubeconfig_server
+from ocp_addons_operators_cli.utils.ocm_utils import get_planned_cluster_data
+from ocp_addons_operators_cli.utils.operators_utils import assert_planned_operator_cluster
+from ocp_addons_operators_cli.utils.plan import (
+    PLAN_VERSION,
+    RunPlan,
+    get_plan_products,
+    get_planned_products,
+    read_plan_file,
+    write_plan_file,
+)
+from ocp_addons_operators_cli.utils.products_specs import AddonSpec, OperatorSpec
+
+OCM_UTILS_PATH = "ocp_addons_operators_cli.utils.ocm_utils"
+API_URL = "https://api.cluster-1:6443"
+
+
+def write_kubeconfig(path, server):
+    path.write_text(
+        "clusters: [{name: cluster-1, cluster: {server: '" + server + "'}}]\n"
+        "contexts: [{name: admin, context: {cluster: cluster-1, user: admin}}]\n"
+        "current-context: admin\n"
+    )
+    return str(path)
+
+
+@pytest.fixture
+def kubeconfig(tmp_path):
+    return write_kubeconfig(path=tmp_path / "kubeconfig", server=API_URL)
+
+
+@pytest.fixture
+def plan(kubeconfig):
+    return {
+        "plan-version": PLAN_VERSION,
+        "created-at": 0,
+        "addons": [
+            {
+                "name": "addon-1",
+                "cluster-name": "cluster-1",
+                "ocm-env": "stage",
+                "rosa": False,
+                "timeout": 1800,
+                "cluster-id": "cluster-id",
+                "api-url": API_URL,
+                "ocp-version": "4.15.1",
+                "kubeconfig": kubeconfig,
+                "addon-definition": {"id": "addon-1"},
+            }
+        ],
+        "operators": [
+            {
+                "name": "operator-1",
+                "cluster-name": "cluster-1",
+                "kubeconfig": kubeconfig,
+                "context": "admin",
+                "timeout": 3600,
+                "api-url": API_URL,
+                "cluster-type": None,
+                "namespace": "operator-1",
+                "target-namespaces": None,
+                "channel": "stable",
+                "source": "redhat-operators",
+                "iib-index-image": None,
+            }
+        ],
+    }
+
+
+def test_run_plan_render(kubeconfig):
+    addon_spec = AddonSpec(
+        name="addon-1",
+        cluster_name="cluster-1",
+        ocm_env="stage",
+        timeout=1800,
+        rosa=False,
+        brew_token=None,
+        parameters=[],
+    )
+    operators = [
+        {
+            "name": name,
+            "cluster-name": "cluster-1",
+            "cluster-type": "4.15",
+            "spec": OperatorSpec(name=name, kubeconfig=kubeconfig, timeout=3600, channel="fast"),
+            "iib_index_image": "iib:1",
+        }
+        for name in ("operator-1", "operator-2")
+    ]
+    run_plan = RunPlan()
+    run_plan.add_products(
+        addons=[
+            {
+                "name": "addon-1",
+                "cluster-name": "cluster-1",
+                "spec": addon_spec,
+                "cluster-id": "cluster-id",
+                "api-url": API_URL,
+                "ocp-version": "4.15.1",
+                "kubeconfig": kubeconfig,
+                "addon-definition": {"id": "addon-1"},
+            }
+        ],
+        operators=operators,
+    )
+
+    plan = json.loads(
+        run_plan.render(
+            products=[
+                {
+                    "product-type": "operator",
+                    "name": "operator-1,operator-2",
+                    "cluster-name": "cluster-1",
+                    "outcome": "success",
+                    "duration-seconds": 12.5,
+                },
+            ]
+        )
+    )
+
+    assert plan["plan-version"] == PLAN_VERSION
+    assert plan["addons"][0]["cluster-id"] == "cluster-id"
+    assert plan["addons"][0]["outcome"] is None
+    assert [
+        (operator["name"], operator["api-url"], operator["namespace"], operator["channel"], operator["iib-index-image"])
+        for operator in plan["operators"]
+    ] == [
+        ("operator-1", API_URL, "operator-1", "fast", "iib:1"),
+        ("operator-2", API_URL, "operator-2", "fast", "iib:1"),
+    ]
+    # Operators installed as a group share their result
+    assert {(operator["outcome"], operator["duration-seconds"]) for operator in plan["operators"]} == {
+        ("success", 12.5)
+    }
+
+
+def test_read_plan_file(tmp_path):
+    run_plan = RunPlan()
+    plan_file = str(tmp_path / "plan.json")
+    write_plan_file(plan_file=plan_file, plan=run_plan)
+    assert read_plan_file(plan_file=plan_file)["addons"] == []
+
+    (tmp_path / "old-plan.json").write_text(json.dumps({"plan-version": 0}))
+    with pytest.raises(click.Abort):
+        read_plan_file(plan_file=str(tmp_path / "old-plan.json"))
+
+
+def test_get_plan_products(plan, kubeconfig):
+    addons, operators = get_plan_products(
+        plan=plan,
+        addons=[{"name": "addon-1", "cluster-name": "cluster-1", "timeout": "10m"}],
+        operators=[{"name": "*", "kubeconfig": kubeconfig}],
+    )
+
+    assert addons == [
+        {"name": "addon-1", "cluster-name": "cluster-1", "ocm-env": "stage", "rosa": False, "timeout": "10m"}
+    ]
+    assert operators == [
+        {"name": "operator-1", "kubeconfig": kubeconfig, "timeout": 3600, "namespace": "operator-1", "context": "admin"}
+    ]
+    assert get_planned_products(plan=plan)[1][("cluster-1", "operator-1")] == plan["operators"][0]
+
+
+def test_get_plan_products_not_planned(plan):
+    with pytest.raises(click.Abort):
+        get_plan_products(plan=plan, addons=[{"name": "addon-2", "cluster-name": "cluster-1"}], operators=[])
+
+
+def test_get_kubeconfig_server(tmp_path, kubeconfig):
+    assert get_kubeconfig_server(kubeconfig=kubeconfig) == API_URL
+
+    # Kubeconfig files are read again, e.g. after a cluster is recreated
+    write_kubeconfig(path=tmp_path / "kubeconfig", server="https://api.cluster-2:6443")
+    assert get_kubeconfig_server(kubeconfig=kubeconfig) == "https://api.cluster-2:6443"
+
+
+def test_get_planned_cluster_data_reuses_kubeconfig(mocker, plan):
+    write_kubeconfig_file = mocker.patch(f"{OCM_UTILS_PATH}.write_kubeconfig_file")
+    cluster_data = get_planned_cluster_data(
+        ocm_client=mocker.MagicMock(),
+        cluster_name="cluster-1",
+        planned_addon=plan["addons"][0],
+    )
+
+    write_kubeconfig_file.assert_not_called()
+    assert cluster_data == {
+        "id": "cluster-id",
+        "api-url": API_URL,
+        "ocp-version": "4.15.1",
+        "kubeconfig": plan["addons"][0]["kubeconfig"],
+    }
+
+
+def test_get_planned_cluster_data_fetches_missing_kubeconfig(mocker, plan):
+    write_kubeconfig_file = mocker.patch(f"{OCM_UTILS_PATH}.write_kubeconfig_file", return_value="/tmp/kubeconfig")
+    cluster_data = get_planned_cluster_data(
+        ocm_client=mocker.MagicMock(),
+        cluster_name="cluster-1",
+        planned_addon={**plan["addons"][0], "kubeconfig": "/not-found/kubeconfig"},
+    )
+
+    assert write_kubeconfig_file.call_args.kwargs["cluster"].cluster_id == "cluster-id"
+    assert cluster_data["kubeconfig"] == "/tmp/kubeconfig"
+
+
+def test_assert_planned_operator_cluster(plan, tmp_path):
+    operator_spec = OperatorSpec(
+        name="operator-1",
+        kubeconfig=write_kubeconfig(path=tmp_path / "other-kubeconfig", server="https://api.cluster-2:6443"),
+        timeout=3600,
+    )
+    with pytest.raises(click.Abort):
+        assert_planned_operator_cluster(operator_spec=operator_spec, planned_operator=plan["operators"][0])
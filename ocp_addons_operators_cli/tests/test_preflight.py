@@ -0,0 +1,131 @@
+import click
+import pytest
+import urllib3
+from kubernetes.client.exceptions import ApiException
+
+from ocp_addons_operators_cli.utils.preflight import get_cluster_health_errors, run_clusters_preflight
+from ocp_addons_operators_cli.utils.products_specs import OperatorSpec
+from ocp_addons_operators_cli.utils.report import RUN_REPORT
+
+PREFLIGHT_PATH = "ocp_addons_operators_cli.utils.preflight"
+
+
+def get_node(mocker, name, ready):
+    node = mocker.MagicMock()
+    node.metadata.name = name
+    node.status.conditions = [mocker.MagicMock(type="Ready", status="True" if ready else "Unknown")]
+    return node
+
+
+@pytest.fixture
+def kubernetes_apis(mocker):
+    mocker.patch(f"{PREFLIGHT_PATH}.get_preflight_api_client")
+    version_api = mocker.patch(f"{PREFLIGHT_PATH}.kubernetes_client.VersionApi")
+    core_api = mocker.patch(f"{PREFLIGHT_PATH}.kubernetes_client.CoreV1Api")
+    core_api.return_value.list_node.return_value.items = [get_node(mocker=mocker, name="node-1", ready=True)]
+    custom_objects_api = mocker.patch(f"{PREFLIGHT_PATH}.kubernetes_client.CustomObjectsApi")
+    custom_objects_api.return_value.get_cluster_custom_object.return_value = {
+        "status": {
+            "conditions": [
+                {"type": "Available", "status": "True"},
+                {"type": "Degraded", "status": "False"},
+            ]
+        }
+    }
+    return version_api, core_api, custom_objects_api
+
+
+def test_healthy_cluster(kubernetes_apis):
+    assert get_cluster_health_errors(kubeconfig="kubeconfig", request_timeout=5) == []
+
+
+def test_unreachable_cluster(kubernetes_apis):
+    version_api, core_api, _ = kubernetes_apis
+    version_api.return_value.get_code.side_effect = urllib3.exceptions.ConnectTimeoutError("timed out")
+
+    errors = get_cluster_health_errors(kubeconfig="kubeconfig", request_timeout=5)
+    assert errors == ["API server is not reachable: timed out"]
+    core_api.return_value.list_node.assert_not_called()
+
+
+def test_unauthorized_cluster(kubernetes_apis):
+    _, core_api, _ = kubernetes_apis
+    core_api.return_value.list_node.side_effect = ApiException(status=401, reason="Unauthorized")
+
+    assert get_cluster_health_errors(kubeconfig="kubeconfig", request_timeout=5) == [
+        "Authentication failed: 401 Unauthorized"
+    ]
+
+
+def test_not_ready_nodes_and_degraded_olm(mocker, kubernetes_apis):
+    _, core_api, custom_objects_api = kubernetes_apis
+    core_api.return_value.list_node.return_value.items = [
+        get_node(mocker=mocker, name="node-1", ready=True),
+        get_node(mocker=mocker, name="node-2", ready=False),
+    ]
+    custom_objects_api.return_value.get_cluster_custom_object.return_value = {
+        "status": {
+            "conditions": [
+                {"type": "Available", "status": "True"},
+                {"type": "Degraded", "status": "True", "message": "catalog-operator is crashlooping"},
+            ]
+        }
+    }
+
+    assert get_cluster_health_errors(kubeconfig="kubeconfig", request_timeout=5) == [
+        "Nodes are not ready: ['node-2']",
+        "OLM is degraded: catalog-operator is crashlooping",
+    ]
+
+
+@pytest.fixture
+def preflight_products(mocker):
+    mocker.patch(
+        f"{PREFLIGHT_PATH}.get_cluster_name_from_kubeconfig",
+        side_effect=lambda kubeconfig, operator_name: kubeconfig,
+    )
+    mocker.patch(
+        f"{PREFLIGHT_PATH}.get_unhealthy_clusters",
+        return_value={"cluster-bad": ["API server is not reachable: timed out"]},
+    )
+    addons = [
+        {"name": "addon-1", "cluster-name": "cluster-bad", "kubeconfig": "cluster-bad"},
+        {"name": "addon-2", "cluster-name": "cluster-good", "kubeconfig": "cluster-good"},
+    ]
+    operators_specs = [
+        OperatorSpec(name="operator-1", kubeconfig=kubeconfig, timeout=60)
+        for kubeconfig in ("cluster-bad", "cluster-good")
+    ]
+    return addons, operators_specs
+
+
+def test_preflight_fail_mode(preflight_products):
+    addons, operators_specs = preflight_products
+    with pytest.raises(click.Abort):
+        run_clusters_preflight(
+            addons=addons,
+            operators_specs=operators_specs,
+            mode="fail",
+            request_timeout=5,
+            install=True,
+        )
+
+
+def test_preflight_exclude_mode(mocker, preflight_products):
+    mocker.patch.object(RUN_REPORT, "enabled", True)
+    mocker.patch.object(RUN_REPORT, "products", [])
+    addons, operators_specs = preflight_products
+
+    healthy_addons, healthy_operators_specs = run_clusters_preflight(
+        addons=addons,
+        operators_specs=operators_specs,
+        mode="exclude",
+        request_timeout=5,
+        install=True,
+    )
+    assert [addon["name"] for addon in healthy_addons] == ["addon-2"]
+    assert [operator_spec.kubeconfig for operator_spec in healthy_operators_specs] == ["cluster-good"]
+    assert [(product["name"], product["outcome"]) for product in RUN_REPORT.products] == [
+        ("addon-1", "failure"),
+        ("operator-1", "failure"),
+    ]
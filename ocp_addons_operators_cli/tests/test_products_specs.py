@@ -0,0 +1,170 @@
+import os
+
+import click
+import pytest
+import yaml
+
+from ocp_addons_operators_cli.utils.kubeconfig_utils import remove_context_kubeconfigs
+from ocp_addons_operators_cli.utils.operators_utils import get_cluster_name_from_kubeconfig
+from ocp_addons_operators_cli.utils.products_specs import AddonSpec, get_products_specs
+
+PRODUCTS_SPECS_PATH = "ocp_addons_operators_cli.utils.products_specs"
+
+
+@pytest.fixture
+def kubeconfig(tmp_path):
+    kubeconfig = tmp_path / "kubeconfig"
+    kubeconfig.write_text("clusters: []")
+    return str(kubeconfig)
+
+
+@pytest.fixture
+def multi_context_kubeconfig(tmp_path):
+    kubeconfig = tmp_path / "multi-context-kubeconfig"
+    clusters_names = ("prod-east", "prod-west", "stage-east")
+    kubeconfig.write_text(
+        yaml.dump({
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [
+                {"name": f"api-{name}:6443", "cluster": {"server": f"https://api-{name}:6443"}}
+                for name in clusters_names
+            ],
+            "users": [{"name": f"admin-{name}", "user": {"token": f"token-{name}"}} for name in clusters_names],
+            "contexts": [
+                {"name": name, "context": {"cluster": f"api-{name}:6443", "user": f"admin-{name}"}}
+                for name in clusters_names
+            ],
+            "current-context": "prod-east",
+        })
+    )
+    return str(kubeconfig)
+
+
+def test_get_products_specs(kubeconfig):
+    addons_specs, operators_specs = get_products_specs(
+        addons=[{"name": "addon-1", "cluster-name": "cluster-1", "timeout": "1h", "has-external-resources": "false"}],
+        operators=[{"name": "operator-1", "kubeconfig": kubeconfig, "iib": "iib-image"}],
+        brew_token="brew-token",
+    )
+
+    assert addons_specs[0].timeout == 3600
+    assert addons_specs[0].ocm_env == "stage"
+    assert addons_specs[0].parameters == [{"id": "has-external-resources", "value": "false"}]
+    assert operators_specs[0].iib == "iib-image"
+    assert operators_specs[0].timeout == 3600
+    assert not hasattr(addons_specs[0], "__dict__")
+
+
+def test_get_products_specs_reports_all_errors(mocker):
+    mocked_logger = mocker.patch(f"{PRODUCTS_SPECS_PATH}.LOGGER")
+    with pytest.raises(click.Abort):
+        get_products_specs(
+            addons=[
+                {"name": "addon-1", "cluster-name": None},
+                {"name": "addon-2", "cluster-name": "cluster-1", "ocm-env": "dev", "timeout": "abc"},
+            ],
+            operators=[{"name": "operator-1", "kubeconfig": "/missing/kubeconfig", "iib": "iib-image"}],
+            brew_token=None,
+        )
+
+    error_message = mocked_logger.error.call_args.args[0]
+    for error in ("addon-1: `cluster-name`", "wrong OCM environment dev", "invalid `timeout` abc", "does not exist"):
+        assert error in error_message
+    assert "--brew-token" in error_message
+
+
+def test_get_products_specs_kubeconfig_checked_once(mocker, kubeconfig):
+    mocked_exists = mocker.patch(f"{PRODUCTS_SPECS_PATH}.os.path.exists", return_value=True)
+    get_products_specs(
+        addons=[],
+        operators=[{"name": f"operator-{idx}", "kubeconfig": kubeconfig} for idx in range(10)],
+        brew_token=None,
+    )
+    mocked_exists.assert_called_once_with(kubeconfig)
+
+    # Each validation pass checks the kubeconfig again
+    get_products_specs(addons=[], operators=[{"name": "operator-1", "kubeconfig": kubeconfig}], brew_token=None)
+    assert mocked_exists.call_count == 2
+
+
+def test_addon_spec_slots():
+    addon_spec = AddonSpec(
+        name="addon-1",
+        cluster_name="cluster-1",
+        ocm_env="stage",
+        timeout=60,
+        rosa=False,
+        brew_token=None,
+        parameters=[],
+    )
+    with pytest.raises(AttributeError):
+        addon_spec.ocm_client = "client"
+
+
+def test_get_products_specs_retry_policy(kubeconfig):
+    addons_specs, operators_specs = get_products_specs(
+        addons=[{"name": "addon-1", "cluster-name": "cluster-1", "retries": "3", "retry-backoff": "1m"}],
+        operators=[{"name": "operator-1", "kubeconfig": kubeconfig}],
+        brew_token=None,
+        retries=1,
+        retry_backoff="10s",
+    )
+
+    assert (addons_specs[0].retries, addons_specs[0].retry_backoff) == (3, 60)
+    assert addons_specs[0].parameters == []
+    assert (operators_specs[0].retries, operators_specs[0].retry_backoff) == (1, 10)
+
+
+def test_get_products_specs_operator_contexts(multi_context_kubeconfig):
+    context_kubeconfigs = {}
+    _, operators_specs = get_products_specs(
+        addons=[],
+        operators=[
+            {"name": "operator-1", "kubeconfig": multi_context_kubeconfig, "context": "prod-*"},
+            {"name": "operator-2", "kubeconfig": multi_context_kubeconfig, "context": ["stage-east", "prod-west"]},
+        ],
+        brew_token=None,
+        context_kubeconfigs=context_kubeconfigs,
+    )
+
+    assert [(operator_spec.name, operator_spec.context) for operator_spec in operators_specs] == [
+        ("operator-1", "prod-east"),
+        ("operator-1", "prod-west"),
+        ("operator-2", "prod-west"),
+        ("operator-2", "stage-east"),
+    ]
+    # One kubeconfig file per context, shared by the context operators
+    assert operators_specs[1].kubeconfig == operators_specs[2].kubeconfig
+    for operator_spec in operators_specs:
+        with open(operator_spec.kubeconfig) as fd:
+            context_kubeconfig = yaml.safe_load(fd)
+
+        assert context_kubeconfig["current-context"] == operator_spec.context
+        assert [user["name"] for user in context_kubeconfig["users"]] == [f"admin-{operator_spec.context}"]
+        assert (
+            get_cluster_name_from_kubeconfig(kubeconfig=operator_spec.kubeconfig, operator_name=operator_spec.name)
+            == f"api-{operator_spec.context}"
+        )
+
+    context_kubeconfigs_files = list(context_kubeconfigs.values())
+    assert len(context_kubeconfigs_files) == 3
+    remove_context_kubeconfigs(context_kubeconfigs=context_kubeconfigs)
+    assert not any(os.path.exists(context_kubeconfig_file) for context_kubeconfig_file in context_kubeconfigs_files)
+
+
+def test_get_products_specs_operator_contexts_no_match(mocker, multi_context_kubeconfig):
+    mocked_logger = mocker.patch(f"{PRODUCTS_SPECS_PATH}.LOGGER")
+    with pytest.raises(click.Abort):
+        get_products_specs(
+            addons=[],
+            operators=[{"name": "operator-1", "kubeconfig": multi_context_kubeconfig, "context": "dev-*"}],
+            brew_token=None,
+        )
+
+    assert "no context in kubeconfig" in mocked_logger.error.call_args.args[0]
+
+
+def test_multi_cluster_kubeconfig_without_context(multi_context_kubeconfig):
+    with pytest.raises(click.Abort):
+        get_cluster_name_from_kubeconfig(kubeconfig=multi_context_kubeconfig, operator_name="operator-1")
@@ -0,0 +1,32 @@
+import os
+import threading
+
+from ocp_addons_operators_cli.utils.profiling import RunProfiler
+
+
+def test_run_profiler_per_thread_and_merged_profiles(tmp_path):
+    run_profiler = RunProfiler()
+    run_profiler.start(profile_dir=str(tmp_path))
+
+    def _product_action():
+        with run_profiler.profile_thread(name="addon-addon-name-cluster-name"):
+            sum(range(1000))
+
+    worker = threading.Thread(target=_product_action, name="worker")
+    worker.start()
+    worker.join()
+    run_profiler.stop()
+
+    profile_files = os.listdir(tmp_path)
+    assert {"main.pstats", "merged.pstats", "merged.folded", "worker-addon-addon-name-cluster-name.pstats"}.issubset(
+        profile_files
+    )
+    assert not run_profiler.enabled
+
+
+def test_run_profiler_disabled_profile_thread():
+    run_profiler = RunProfiler()
+    with run_profiler.profile_thread(name="operator"):
+        pass
+
+    assert not run_profiler.enabled
@@ -0,0 +1,49 @@
+import pytest
+
+from ocp_addons_operators_cli.utils.addons_utils import wait_for_addon_install_progress
+from ocp_addons_operators_cli.utils.progress import ProgressTracker, get_conditions_summary
+
+PROGRESS_PATH = "ocp_addons_operators_cli.utils.progress"
+
+
+@pytest.fixture
+def mocked_monotonic(mocker):
+    return mocker.patch(f"{PROGRESS_PATH}.time.monotonic")
+
+
+def test_progress_tracker_stalled(mocked_monotonic):
+    mocked_monotonic.side_effect = [0, 10, 50, 120]
+    progress_tracker = ProgressTracker(name="Addon addon-1 installation", timeout=3600, stall_timeout=60)
+    progress_tracker.update(status={"state": "installing"})
+    progress_tracker.update(status={"state": "installing"})
+
+    with pytest.raises(RuntimeError, match="did not progress for 60 seconds, last status: {'state': 'installing'}"):
+        progress_tracker.update(status={"state": "installing"})
+
+
+def test_progress_tracker_progress_resets_stall_window(mocked_monotonic):
+    mocked_monotonic.side_effect = [0, 10, 60, 110]
+    progress_tracker = ProgressTracker(name="Addon addon-1 installation", timeout=3600, stall_timeout=60)
+    for state in ("pending", "installing", "installing"):
+        progress_tracker.update(status={"state": state})
+
+
+def test_get_conditions_summary():
+    conditions = [
+        {"type": "Installed", "status": "False", "reason": "ImagePullBackOff", "lastTransitionTime": "now"},
+        {"type": "Ready", "status": "True"},
+    ]
+
+    assert get_conditions_summary(conditions=conditions) == ["Installed=False (ImagePullBackOff)", "Ready=True"]
+
+
+def test_wait_for_addon_install_progress_failed_state(mocker):
+    mocker.patch("ocp_addons_operators_cli.utils.addons_utils.time.sleep")
+    cluster_addon = mocker.MagicMock(addon_name="addon-1")
+    cluster_addon.addon_installation_instance.side_effect = [
+        {"state": "installing"},
+        {"state": "failed", "state_description": "addon failed"},
+    ]
+
+    with pytest.raises(RuntimeError, match="failed, last status: {'state': 'failed', 'state-description': 'addon"):
+        wait_for_addon_install_progress(cluster_addon=cluster_addon, wait_timeout=3600, stall_timeout=600)
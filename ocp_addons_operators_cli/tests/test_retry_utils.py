@@ -0,0 +1,76 @@
+import pytest
+from kubernetes.dynamic.exceptions import ConflictError, ServiceUnavailableError
+from ocm_python_client.exceptions import ApiException, ServiceException
+from timeout_sampler import TimeoutExpiredError
+
+from ocp_addons_operators_cli.utils.retry_utils import is_transient_error, run_product_action_with_retries
+
+
+@pytest.fixture
+def mocked_sleep(mocker):
+    return mocker.patch("ocp_addons_operators_cli.utils.retry_utils.time.sleep")
+
+
+def product_action(func, retry_func, retries):
+    return {
+        "func": func,
+        "retry-func": retry_func,
+        "kwargs": {"name": "operator-1"},
+        "product-type": "operator",
+        "name": "operator-1",
+        "cluster-name": "cluster-1",
+        "retries": retries,
+        "retry-backoff": 10,
+    }
+
+
+@pytest.mark.parametrize(
+    "exc, transient",
+    [
+        pytest.param(ConnectionResetError(), True, id="connection_reset"),
+        pytest.param(ServiceException(status=503), True, id="ocm_5xx"),
+        pytest.param(ApiException(status=429), True, id="ocm_too_many_requests"),
+        pytest.param(ApiException(status=400), False, id="ocm_4xx"),
+        pytest.param(ServiceUnavailableError(ApiException(status=503)), True, id="ocp_5xx"),
+        pytest.param(ConflictError(ApiException(status=409)), False, id="ocp_conflict"),
+        pytest.param(TimeoutExpiredError(value="csv", last_exp=ConnectionResetError()), True, id="wait_transient"),
+        pytest.param(TimeoutExpiredError(value="csv"), False, id="wait_timeout"),
+        pytest.param(ValueError(), False, id="fatal"),
+    ],
+)
+def test_is_transient_error(exc, transient):
+    assert is_transient_error(exc=exc) is transient
+
+
+def test_run_product_action_with_retries_resumes_with_retry_func(mocker, mocked_sleep):
+    func = mocker.MagicMock(side_effect=ConnectionResetError())
+    retry_func = mocker.MagicMock(side_effect=[ServiceException(status=502), "installed"])
+
+    result = run_product_action_with_retries(
+        product_action=product_action(func=func, retry_func=retry_func, retries=2),
+        action="install",
+    )
+
+    assert result == "installed"
+    func.assert_called_once_with(name="operator-1")
+    assert retry_func.call_count == 2
+    assert [call.args[0] for call in mocked_sleep.call_args_list] == [10, 20]
+
+
+@pytest.mark.parametrize(
+    "exc, retries",
+    [
+        pytest.param(ValueError(), 2, id="fatal_error"),
+        pytest.param(ConnectionResetError(), 0, id="no_retries"),
+    ],
+)
+def test_run_product_action_with_retries_not_retried(mocker, mocked_sleep, exc, retries):
+    retry_func = mocker.MagicMock()
+    func = mocker.MagicMock(side_effect=exc)
+    with pytest.raises(type(exc)):
+        run_product_action_with_retries(
+            product_action=product_action(func=func, retry_func=retry_func, retries=retries),
+            action="install",
+        )
+
+    retry_func.assert_not_called()
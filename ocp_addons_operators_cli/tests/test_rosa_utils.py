@@ -0,0 +1,151 @@
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ocm_python_wrapper.cluster
+import pytest
+import rosa.cli as rosa_cli
+
+from ocp_addons_operators_cli.utils.report import RUN_REPORT
+from ocp_addons_operators_cli.utils.rosa_utils import ROSA_CLI_DISPATCHER, ROSA_CONFIG_ENV, RosaCli
+
+ROSA_UTILS_PATH = "ocp_addons_operators_cli.utils.rosa_utils"
+
+
+def get_ocm_client(mocker, host, token):
+    ocm_client = mocker.MagicMock()
+    ocm_client.api_client.configuration.host = host
+    ocm_client.api_client.token = token
+    return ocm_client
+
+
+@pytest.fixture
+def rosa_commands(mocker):
+    commands = []
+
+    def _run(command, env, **kwargs):
+        commands.append((command, env[ROSA_CONFIG_ENV]))
+        return subprocess.CompletedProcess(args=command, returncode=0, stdout="{}", stderr="")
+
+    mocker.patch.object(rosa_cli, "parse_help", return_value={})
+    mocker.patch(f"{ROSA_UTILS_PATH}.subprocess.run", side_effect=_run)
+    return commands
+
+
+def test_rosa_cli_logs_in_once_per_env_and_token(mocker, rosa_commands):
+    rosa = RosaCli()
+    stage_client = get_ocm_client(mocker=mocker, host="stage", token="token-1")
+    for addon_name in ("addon-1", "addon-2"):
+        rosa.execute(command=f"install addon {addon_name} --cluster c1", ocm_client=stage_client)
+
+    rosa.execute(
+        command="install addon addon-3 --cluster c1",
+        ocm_client=get_ocm_client(mocker=mocker, host="production", token="token-2"),
+    )
+
+    commands_names = [command[1] for command, _ in rosa_commands]
+    assert commands_names == ["login", "install", "install", "login", "install"]
+    stage_config, production_config = rosa_commands[0][1], rosa_commands[3][1]
+    assert stage_config != production_config
+    assert {config_file for _, config_file in rosa_commands[:3]} == {stage_config}
+
+    rosa.stop()
+    assert [command[1] for command, _ in rosa_commands[5:]] == ["logout", "logout"]
+    assert not os.path.exists(os.path.dirname(stage_config))
+    assert not os.path.exists(os.path.dirname(production_config))
+
+
+def test_rosa_cli_concurrency(mocker, rosa_commands):
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def _run(command, env, **kwargs):
+        with lock:
+            running.append(command)
+            max_running.append(len(running))
+
+        time.sleep(0.05)
+        with lock:
+            running.remove(command)
+
+        return subprocess.CompletedProcess(args=command, returncode=0, stdout="{}", stderr="")
+
+    mocker.patch(f"{ROSA_UTILS_PATH}.subprocess.run", side_effect=_run)
+    rosa = RosaCli(max_concurrency=2)
+    ocm_client = get_ocm_client(mocker=mocker, host="stage", token="token")
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(
+            executor.map(
+                lambda index: rosa.execute(command=f"install addon addon-{index}", ocm_client=ocm_client),
+                range(6),
+            )
+        )
+
+    assert max(max_running) == 2
+
+
+def test_rosa_cli_report(mocker, rosa_commands):
+    mocker.patch.object(RUN_REPORT, "enabled", True)
+    mocker.patch.object(RUN_REPORT, "commands", [])
+    rosa = RosaCli()
+    rosa.execute(
+        command="install addon addon-1 --cluster c1 --secret-param value",
+        ocm_client=get_ocm_client(mocker=mocker, host="stage", token="token"),
+    )
+
+    assert [(command["command"], command["outcome"]) for command in RUN_REPORT.commands] == [
+        ("rosa login", "success"),
+        ("rosa install addon addon-1", "success"),
+    ]
+
+
+def test_rosa_cli_failed_command(mocker, rosa_commands):
+    mocker.patch(
+        f"{ROSA_UTILS_PATH}.subprocess.run",
+        return_value=subprocess.CompletedProcess(args=[], returncode=1, stdout="", stderr="login failed"),
+    )
+    with pytest.raises(rosa_cli.CommandExecuteError, match="login failed"):
+        RosaCli().execute(command="uninstall addon addon-1", token="token", ocm_env="stage")
+
+
+def test_rosa_cli_start_stop():
+    rosa = RosaCli()
+    rosa.start()
+    try:
+        assert ocm_python_wrapper.cluster.rosa_cli is ROSA_CLI_DISPATCHER
+        assert ROSA_CLI_DISPATCHER.CommandExecuteError is rosa_cli.CommandExecuteError
+    finally:
+        rosa.stop()
+
+    assert ocm_python_wrapper.cluster.rosa_cli is rosa_cli
+
+
+def test_rosa_cli_dispatcher_overlapping_sessions():
+    session_1_rosa, session_2_rosa = RosaCli(), RosaCli()
+    session_1_rosa.start()
+    session_2_rosa.start()
+    try:
+        with ThreadPoolExecutor(
+            initializer=ROSA_CLI_DISPATCHER.set_thread_rosa_cli,
+            initargs=(session_2_rosa,),
+        ) as executor:
+            with ROSA_CLI_DISPATCHER.route(rosa_cli=session_1_rosa):
+                assert ocm_python_wrapper.cluster.rosa_cli.execute.__self__ is session_1_rosa
+                assert executor.submit(lambda: ocm_python_wrapper.cluster.rosa_cli.execute.__self__).result() is (
+                    session_2_rosa
+                )
+
+        # Threads not routed to a session use `rosa.cli`
+        assert ROSA_CLI_DISPATCHER.execute is rosa_cli.execute
+
+        # The dispatcher stays installed until the last session stops
+        session_1_rosa.stop()
+        assert ocm_python_wrapper.cluster.rosa_cli is ROSA_CLI_DISPATCHER
+    finally:
+        session_1_rosa.stop()
+        session_2_rosa.stop()
+
+    assert ocm_python_wrapper.cluster.rosa_cli is rosa_cli
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import threading
+
+import click
+import pytest
+
+from ocp_addons_operators_cli.session import ProductsSession
+from ocp_addons_operators_cli.utils.history import RUN_HISTORY
+from ocp_addons_operators_cli.utils.plan import PLAN_VERSION
+
+SESSION_PATH = "ocp_addons_operators_cli.session"
+ADDONS = [{"name": "addon-1", "ocm-env": "stage"}]
+OPERATORS = [{"name": "operator-1"}]
+
+
+@pytest.fixture
+def kubeconfig(tmp_path):
+    kubeconfig = tmp_path / "kubeconfig"
+    kubeconfig.write_text("clusters: []")
+    return str(kubeconfig)
+
+
+@pytest.fixture
+def session_products(mocker):
+    def _prepare_addons(addons, ocm_clients, addons_definitions, **kwargs):
+        ocm_clients.setdefault("stage", object())
+        addons_definitions.setdefault("addon-1", {})
+        return [{"name": addon.name, "cluster-name": addon.cluster_name} for addon in addons]
+
+    def _prepare_operators(operators, ocp_clients, **kwargs):
+        for operator in operators:
+            ocp_clients.setdefault(operator.kubeconfig, mocker.MagicMock())
+
+        return [{"spec": operator, "name": operator.name, "cluster-name": "cluster-1"} for operator in operators]
+
+    def _run_install_or_uninstall_products(operators, addons, install, report, **kwargs):
+        for product in addons + operators:
+            report.record(
+                product_action={
+                    "product-type": "addon",
+                    "name": product["name"],
+                    "cluster-name": product["cluster-name"],
+                },
+                action="install" if install else "uninstall",
+                success=product["name"] != "failing-addon",
+                duration=1,
+            )
+
+    prepare_addons = mocker.patch(f"{SESSION_PATH}.prepare_addons", side_effect=_prepare_addons)
+    prepare_operators = mocker.patch(f"{SESSION_PATH}.prepare_operators", side_effect=_prepare_operators)
+    run_products = mocker.patch(
+        f"{SESSION_PATH}.run_install_or_uninstall_products",
+        side_effect=_run_install_or_uninstall_products,
+    )
+    mocker.patch(f"{SESSION_PATH}.verify_user_input")
+    return prepare_addons, prepare_operators, run_products
+
+
+def test_session_reuses_clients_between_runs(session_products, kubeconfig):
+    prepare_addons, prepare_operators, run_products = session_products
+    with ProductsSession(cluster_name="cluster-1", kubeconfig=kubeconfig) as session:
+        session.install(addons=ADDONS, operators=OPERATORS)
+        ocm_clients = dict(session.ocm_clients)
+        ocp_clients = dict(session.ocp_clients)
+        session.uninstall(addons=ADDONS, operators=OPERATORS)
+
+        assert session.ocm_clients == ocm_clients
+        assert session.ocp_clients == ocp_clients
+        for _call in prepare_addons.call_args_list:
+            assert _call.kwargs["ocm_clients"] is session.ocm_clients
+            assert _call.kwargs["addons_definitions"] is session.addons_definitions
+
+        for _call in prepare_operators.call_args_list:
+            assert _call.kwargs["ocp_clients"] is session.ocp_clients
+
+        for _call in run_products.call_args_list:
+            assert _call.kwargs["executor"] is session.executor
+
+
+def test_session_run_results(session_products):
+    with ProductsSession(cluster_name="cluster-1") as session:
+        results = session.install(addons=[*ADDONS, {"name": "failing-addon", "ocm-env": "stage"}])
+
+    assert [(result["name"], result["cluster-name"], result["outcome"]) for result in results] == [
+        ("addon-1", "cluster-1", "success"),
+        ("failing-addon", "cluster-1", "failure"),
+    ]
+    # Each run returns its own results
+    assert all(result["action"] == "install" for result in results)
+
+
+def test_session_does_not_change_user_products(session_products):
+    addons = [{"name": "addon-1", "ocm-env": "stage"}]
+    with ProductsSession(cluster_name="cluster-1") as session:
+        session.install(addons=addons)
+
+    assert addons == [{"name": "addon-1", "ocm-env": "stage"}]
+
+
+def test_session_fail_fast(session_products):
+    _, _, run_products = session_products
+    with ProductsSession(cluster_name="cluster-1") as session:
+        session.install(addons=ADDONS)
+        assert run_products.call_args.kwargs["fail_fast"] is False
+
+        run_products.side_effect = click.Abort()
+        with pytest.raises(click.Abort):
+            session.install(addons=ADDONS, fail_fast=True)
+
+
+def test_session_starts_on_valid_user_input(session_products, tmp_path):
+    with ProductsSession(cluster_name="cluster-1", products_history=True, cache_dir=str(tmp_path)) as session:
+        with pytest.raises(click.Abort):
+            session.install(addons=[{"name": "addon-1", "ocm-env": "dev"}])
+
+        assert session.executor is None
+        assert not RUN_HISTORY.enabled
+
+        session.install(addons=ADDONS)
+        assert session.executor
+        assert RUN_HISTORY.enabled
+
+    # The session products history is released on close
+    assert not RUN_HISTORY.enabled
+
+
+def test_session_install_async(session_products, kubeconfig):
+    async def _install_and_uninstall(session):
+        return await asyncio.gather(
+            session.install_async(addons=ADDONS),
+            session.uninstall_async(operators=OPERATORS),
+        )
+
+    with ProductsSession(cluster_name="cluster-1", kubeconfig=kubeconfig) as session:
+        install_results, uninstall_results = asyncio.run(_install_and_uninstall(session=session))
+
+    assert [(result["name"], result["action"]) for result in install_results] == [("addon-1", "install")]
+    assert [(result["name"], result["action"]) for result in uninstall_results] == [("operator-1", "uninstall")]
+
+
+def test_session_streaming(session_products, kubeconfig, tmp_path):
+    prepare_addons, prepare_operators, run_products = session_products
+    cluster_2_kubeconfig = tmp_path / "kubeconfig-cluster-2"
+    cluster_2_kubeconfig.write_text("clusters: [{name: 'cluster-2:6443'}]")
+    with ProductsSession(
+        cluster_name="cluster-1",
+        kubeconfig=str(cluster_2_kubeconfig),
+        streaming=True,
+        streaming_max_clusters=1,
+    ) as session:
+        results = session.install(addons=ADDONS, operators=OPERATORS)
+
+        # Clusters clients are not kept in the session
+        assert session.ocp_clients == {}
+
+    assert [(result["name"], result["outcome"]) for result in results] == [
+        ("addon-1", "success"),
+        ("operator-1", "success"),
+    ]
+    # Each cluster is prepared and run on its own, with its own OCP clients, released after its products
+    assert [[addon.name for addon in _call.kwargs["addons"]] for _call in prepare_addons.call_args_list] == [
+        ["addon-1"],
+        [],
+    ]
+    assert [
+        [operator.name for operator in _call.kwargs["operators"]] for _call in prepare_operators.call_args_list
+    ] == [[], ["operator-1"]]
+    for _call in prepare_operators.call_args_list:
+        assert _call.kwargs["ocp_clients"] == {}
+
+    assert run_products.call_count == 2
+
+
+def test_session_streaming_prepares_clusters_concurrently(session_products, tmp_path):
+    prepare_addons, prepare_operators, _ = session_products
+    cluster_2_kubeconfig = tmp_path / "kubeconfig-cluster-2"
+    cluster_2_kubeconfig.write_text("clusters: [{name: 'cluster-2:6443'}]")
+    # Fails if clusters are prepared one at a time
+    clusters_barrier = threading.Barrier(parties=2, timeout=5)
+
+    def _prepare_operators(operators, **kwargs):
+        clusters_barrier.wait()
+        return []
+
+    prepare_operators.side_effect = _prepare_operators
+    with ProductsSession(cluster_name="cluster-1", kubeconfig=str(cluster_2_kubeconfig), streaming=True) as session:
+        session.install(addons=ADDONS, operators=OPERATORS)
+
+    assert {_call.kwargs["lock"] for _call in prepare_addons.call_args_list} == {session._lock}
+
+
+def test_session_streaming_fail_fast(session_products):
+    _, _, run_products = session_products
+    run_products.side_effect = click.Abort()
+    with ProductsSession(cluster_name="cluster-1", streaming=True) as session:
+        with pytest.raises(click.Abort):
+            session.install(addons=ADDONS, fail_fast=True)
+
+
+def test_session_streaming_failed_cluster(session_products, tmp_path):
+    prepare_addons, _, _ = session_products
+    cluster_2_kubeconfig = tmp_path / "kubeconfig-cluster-2"
+    cluster_2_kubeconfig.write_text("clusters: [{name: 'cluster-2:6443'}]")
+
+    def _prepare_addons(addons, **kwargs):
+        if addons:
+            raise click.Abort()
+
+        return []
+
+    prepare_addons.side_effect = _prepare_addons
+    with ProductsSession(cluster_name="cluster-1", kubeconfig=str(cluster_2_kubeconfig), streaming=True) as session:
+        results = session.install(addons=ADDONS, operators=OPERATORS)
+
+    # The failed cluster products are failures, the other clusters products are processed
+    assert sorted((result["name"], result["outcome"]) for result in results) == [
+        ("addon-1", "failure"),
+        ("operator-1", "success"),
+    ]
+    assert [result["error"] for result in results if result["outcome"] == "failure"] == [
+        "Cluster cluster-1 failed: Abort()"
+    ]
+
+
+def test_session_plan_in(mocker, session_products, tmp_path):
+    prepare_addons, _, run_products = session_products
+    discover_addons_specs = mocker.patch(f"{SESSION_PATH}.discover_addons_specs")
+    planned_addon = {
+        "name": "addon-1",
+        "cluster-name": "cluster-1",
+        "ocm-env": "stage",
+        "rosa": False,
+        "timeout": 1800,
+    }
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(
+        json.dumps({"plan-version": PLAN_VERSION, "created-at": 0, "addons": [planned_addon], "operators": []})
+    )
+    with ProductsSession(cluster_name="cluster-1", plan_in=str(plan_file)) as session:
+        results = session.uninstall()
+
+    discover_addons_specs.assert_not_called()
+    assert prepare_addons.call_args.kwargs["planned_addons"] == {("cluster-1", "addon-1"): planned_addon}
+    assert [(result["name"], result["action"]) for result in results] == [("addon-1", "uninstall")]
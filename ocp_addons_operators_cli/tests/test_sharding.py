@@ -0,0 +1,117 @@
+import json
+
+import click
+import pytest
+
+from ocp_addons_operators_cli.utils.products_specs import AddonSpec, OperatorSpec
+from ocp_addons_operators_cli.utils.report import RunReport, get_shard_report_file
+from ocp_addons_operators_cli.utils.sharding import assert_shard, get_cluster_shard, get_shard_products_specs
+
+SHARD_COUNT = 3
+
+
+@pytest.fixture
+def products_specs(mocker):
+    mocker.patch(
+        "ocp_addons_operators_cli.utils.sharding.get_cluster_name_from_kubeconfig",
+        side_effect=lambda kubeconfig, operator_name: kubeconfig.split("/")[-1],
+    )
+    addons_specs = [
+        AddonSpec(
+            name=f"addon-{idx}",
+            cluster_name=f"cluster-{idx % 5}",
+            ocm_env="stage",
+            timeout=60,
+            rosa=False,
+            brew_token=None,
+            parameters=[],
+        )
+        for idx in range(10)
+    ]
+    operators_specs = [
+        OperatorSpec(name=f"operator-{idx}", kubeconfig=f"/kubeconfigs/cluster-{idx % 5}", timeout=60)
+        for idx in range(10)
+    ]
+    return addons_specs, operators_specs
+
+
+def test_get_shard_products_specs_split_by_cluster(products_specs):
+    addons_specs, operators_specs = products_specs
+    shards_clusters = []
+    shards_products = []
+    for shard_index in range(SHARD_COUNT):
+        shard_addons_specs, shard_operators_specs = get_shard_products_specs(
+            addons_specs=addons_specs,
+            operators_specs=operators_specs,
+            shard_index=shard_index,
+            shard_count=SHARD_COUNT,
+        )
+        shards_clusters.append(
+            {addon_spec.cluster_name for addon_spec in shard_addons_specs}
+            | {operator_spec.kubeconfig.split("/")[-1] for operator_spec in shard_operators_specs}
+        )
+        shards_products.extend(shard_addons_specs + shard_operators_specs)
+
+    assert len(shards_products) == len(addons_specs + operators_specs)
+    for shard_index, shard_clusters in enumerate(shards_clusters):
+        for other_shard_clusters in shards_clusters[shard_index + 1 :]:
+            assert not shard_clusters & other_shard_clusters
+
+
+def test_get_cluster_shard_stable():
+    # Shards must not change between runs and hosts, workers of the same run compute them independently
+    assert [get_cluster_shard(cluster_name=f"cluster-{idx}", shard_count=SHARD_COUNT) for idx in range(5)] == [
+        2,
+        2,
+        0,
+        1,
+        0,
+    ]
+
+
+@pytest.mark.parametrize(
+    "shard_index, shard_count",
+    [
+        pytest.param(0, None, id="missing_shard_count"),
+        pytest.param(3, 3, id="index_out_of_range"),
+        pytest.param(0, 0, id="zero_shards"),
+    ],
+)
+def test_assert_shard_invalid(shard_index, shard_count):
+    with pytest.raises(click.Abort):
+        assert_shard(shard_index=shard_index, shard_count=shard_count)
+
+
+def test_get_shard_report_file():
+    assert get_shard_report_file(report_file="/tmp/report.json", shard_index=1, shard_count=3) == (
+        "/tmp/report-shard-1-of-3.json"
+    )
+    assert get_shard_report_file(report_file="/tmp/report.json", shard_index=None, shard_count=None) == (
+        "/tmp/report.json"
+    )
+
+
+def test_run_report_render():
+    run_report = RunReport()
+    run_report.record(
+        product_action={"product-type": "addon", "name": "addon-1", "cluster-name": "cluster-1"},
+        action="install",
+        success=False,
+        duration=1.23456,
+        error=ValueError("failed"),
+    )
+
+    report = json.loads(run_report.render(shard_index=1, shard_count=3))
+
+    assert (report["shard-index"], report["shard-count"]) == (1, 3)
+    assert report["products"] == [
+        {
+            "product-type": "addon",
+            "name": "addon-1",
+            "cluster-name": "cluster-1",
+            "action": "install",
+            "outcome": "failure",
+            "duration-seconds": 1.235,
+            "error": "failed",
+        }
+    ]
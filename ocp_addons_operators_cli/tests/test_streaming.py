@@ -0,0 +1,89 @@
+import json
+
+from ocp_addons_operators_cli.utils.operators_utils import close_ocp_clients
+from ocp_addons_operators_cli.utils.products_specs import AddonSpec, OperatorSpec
+from ocp_addons_operators_cli.utils.report import RunReport
+from ocp_addons_operators_cli.utils.streaming import get_clusters_products_specs, record_cluster_products_failure
+
+
+def get_addon_spec(name, cluster_name):
+    return AddonSpec(
+        name=name,
+        cluster_name=cluster_name,
+        ocm_env="stage",
+        timeout=60,
+        rosa=False,
+        brew_token=None,
+        parameters=[],
+    )
+
+
+def test_get_clusters_products_specs(tmp_path):
+    kubeconfig = tmp_path / "kubeconfig"
+    kubeconfig.write_text("clusters: [{name: 'cluster-1:6443'}]")
+    other_kubeconfig = tmp_path / "other-kubeconfig"
+    other_kubeconfig.write_text("clusters: [{name: 'cluster-3:6443'}]")
+    addons_specs = [
+        get_addon_spec(name="addon-1", cluster_name="cluster-1"),
+        get_addon_spec(name="addon-2", cluster_name="cluster-2"),
+        get_addon_spec(name="addon-3", cluster_name="cluster-1"),
+    ]
+    operators_specs = [
+        OperatorSpec(name="operator-1", kubeconfig=str(kubeconfig), timeout=60),
+        OperatorSpec(name="operator-2", kubeconfig=str(other_kubeconfig), timeout=60),
+    ]
+
+    clusters_products_specs = get_clusters_products_specs(addons_specs=addons_specs, operators_specs=operators_specs)
+
+    assert {
+        cluster_name: ([addon_spec.name for addon_spec in addons], [operator_spec.name for operator_spec in operators])
+        for cluster_name, (addons, operators) in clusters_products_specs.items()
+    } == {
+        "cluster-1": (["addon-1", "addon-3"], ["operator-1"]),
+        "cluster-2": (["addon-2"], []),
+        "cluster-3": ([], ["operator-2"]),
+    }
+    assert list(clusters_products_specs) == ["cluster-1", "cluster-2", "cluster-3"]
+
+
+def test_close_ocp_clients(mocker):
+    ocp_client = mocker.MagicMock()
+    ocp_clients = {"kubeconfig": ocp_client}
+
+    close_ocp_clients(ocp_clients=ocp_clients)
+
+    ocp_client.client.close.assert_called_once()
+    assert ocp_clients == {}
+
+
+def test_run_report_peak_memory():
+    assert json.loads(RunReport().render())["peak-memory-bytes"] > 0
+
+
+def test_record_cluster_products_failure(tmp_path):
+    report = RunReport()
+    report.record(
+        product_action={"product-type": "operator", "name": "operator-1,operator-2", "cluster-name": "cluster-1"},
+        action="install",
+        success=True,
+        duration=1,
+    )
+    record_cluster_products_failure(
+        cluster_name="cluster-1",
+        addons_specs=[get_addon_spec(name="addon-1", cluster_name="cluster-1")],
+        operators_specs=[
+            OperatorSpec(name=name, kubeconfig=str(tmp_path), timeout=60)
+            for name in ("operator-1", "operator-2", "operator-3")
+        ],
+        action="install",
+        error=RuntimeError("cluster lock timeout"),
+        duration=2,
+        report=report,
+    )
+
+    # Processed products keep their result
+    assert [(product["name"], product["outcome"]) for product in report.products] == [
+        ("operator-1,operator-2", "success"),
+        ("addon-1", "failure"),
+        ("operator-3", "failure"),
+    ]
@@ -0,0 +1,56 @@
+import json
+import threading
+import time
+
+import pytest
+
+from ocp_addons_operators_cli.utils.tracing import RunTrace, trace_span
+
+
+@pytest.fixture
+def run_trace(mocker):
+    run_trace = RunTrace()
+    run_trace.enabled = True
+    mocker.patch("ocp_addons_operators_cli.utils.tracing.RUN_TRACE", run_trace)
+    return run_trace
+
+
+def test_trace_spans_per_thread_track(run_trace):
+    def _worker():
+        with trace_span(name="install", category="addon", args={"name": "addon-name"}) as span_args:
+            span_args["cluster-name"] = "cluster-name"
+
+    with trace_span(name="prepare", category="addon"):
+        pass
+
+    worker = threading.Thread(target=_worker, name="worker")
+    worker.start()
+    worker.join()
+
+    trace = json.loads(run_trace.render())
+    spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+    threads_names = {event["tid"]: event["args"]["name"] for event in trace["traceEvents"] if event["ph"] == "M"}
+
+    assert threads_names[spans["install"]["tid"]] == "worker"
+    assert spans["prepare"]["tid"] != spans["install"]["tid"]
+    assert spans["install"]["args"] == {"name": "addon-name", "cluster-name": "cluster-name"}
+
+
+def test_trace_async_span(run_trace):
+    start_time = time.perf_counter()
+    run_trace.add_async_span(name="queued", category="operator", start_time=start_time, end_time=start_time + 1)
+
+    begin_event, end_event = json.loads(run_trace.render())["traceEvents"]
+
+    assert (begin_event["ph"], end_event["ph"]) == ("b", "e")
+    assert begin_event["id"] == end_event["id"]
+    assert end_event["ts"] - begin_event["ts"] == pytest.approx(1_000_000)
+
+
+def test_trace_span_disabled(mocker):
+    run_trace = RunTrace()
+    mocker.patch("ocp_addons_operators_cli.utils.tracing.RUN_TRACE", run_trace)
+    with trace_span(name="prepare", category="operator"):
+        pass
+
+    assert run_trace.events == []
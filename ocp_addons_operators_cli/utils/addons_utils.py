@@ -1,51 +1,30 @@
-import tempfile
+import contextlib
+import functools
+import time
 
 import click
-import yaml
 from ocm_python_client.exceptions import NotFoundException
-from ocm_python_wrapper.cluster import Cluster, ClusterAddOn
-from ocm_python_wrapper.ocm_client import OCMPythonClient
+from ocp_utilities.must_gather import collect_must_gather
 from simple_logger.logger import get_logger
 
-from ocp_addons_operators_cli.constants import PRODUCTION_STR, STAGE_STR, TIMEOUT_30MIN
-from ocp_addons_operators_cli.utils.general import tts
+from ocp_addons_operators_cli.constants import ADDON_STR, PREPARE_PHASE
+from ocp_addons_operators_cli.utils.history import get_cluster_type
+from ocp_addons_operators_cli.utils.metrics import product_phase
+from ocp_addons_operators_cli.utils.ocm_utils import (
+    ClusterAddOnById,
+    get_addon_definition,
+    get_cluster_data,
+    get_ocm_client,
+    get_planned_cluster_data,
+)
+from ocp_addons_operators_cli.utils.progress import PRODUCT_WAIT_POLL_INTERVAL_SECONDS, ProgressTracker
+from ocp_addons_operators_cli.utils.tracing import CLIENT_BUILD_SPAN, CLUSTER_DATA_SPAN, trace_span
 
 LOGGER = get_logger(name=__name__)
 
-
-def extract_addon_params(addon_dict):
-    """
-    Extract addon parameters from user input
-
-    Args:
-        addon_dict (dict): dict constructed from addon user input
-
-    Returns:
-        list: list of addon parameters dicts
-
-    """
-    exclude_list = [
-        "cluster-addon",
-        "name",
-        "timeout",
-        "rosa",
-        "ocm-client",
-        "cluster-object",
-        "ocm-env",
-        "brew-token",
-        "cluster-name",
-        "must_gather_output_dir",
-        "kubeconfig",
-    ]
-    resource_parameters = []
-
-    for key, value in addon_dict.items():
-        if key in exclude_list:
-            continue
-
-        resource_parameters.append({"id": key, "value": value})
-
-    return resource_parameters
+ADDON_READY_STATE = "ready"
+ADDON_FAILED_STATE = "failed"
+BOOLEAN_PARAMETER_VALUES = ("true", "false")
 
 
 def get_addons_from_user_input(**kwargs):
@@ -61,126 +40,475 @@ def get_addons_from_user_input(**kwargs):
     return addons
 
 
-def assert_missing_cluster_names(addons):
-    LOGGER.info("Verify `cluster name` is not missing from user input.")
-    addons_missing_cluster_name = [addon["name"] for addon in addons if not addon.get("cluster-name")]
-    if addons_missing_cluster_name:
-        LOGGER.error(
-            f"For addons {addons_missing_cluster_name} `cluster-name` is missing. "
-            "Either add to addon config or pass `--cluster-name`"
+def get_addon_ocm_client(
+    addon_spec,
+    ocm_token,
+    endpoint,
+    token_cache_dir=None,
+    ocm_clients=None,
+    span_args=None,
+    lock=None,
+):
+    """
+    Get the OCM client of the addon OCM environment, built once per OCM environment.
+
+    Args:
+        ocm_clients (dict, optional): OCM clients already built, by OCM environment; updated with the addon client
+        lock (threading.Lock, optional): lock held around `ocm_clients` lookups and updates, when it is shared between
+            threads
+
+    Returns:
+        OCMPythonClient: OCM client
+    """
+    ocm_clients = {} if ocm_clients is None else ocm_clients
+    lock = lock or contextlib.nullcontext()
+    with lock:
+        ocm_client = ocm_clients.get(addon_spec.ocm_env)
+
+    if not ocm_client:
+        with trace_span(name=CLIENT_BUILD_SPAN, category=ADDON_STR, args=span_args):
+            ocm_client = get_ocm_client(
+                ocm_token=ocm_token,
+                endpoint=endpoint,
+                ocm_env=addon_spec.ocm_env,
+                token_cache_dir=token_cache_dir,
+            )
+
+        with lock:
+            ocm_client = ocm_clients.setdefault(addon_spec.ocm_env, ocm_client)
+
+    return ocm_client
+
+
+def prepare_addon(
+    addon_spec,
+    ocm_token,
+    endpoint,
+    must_gather_output_dir,
+    token_cache_dir=None,
+    cluster_cache_dir=None,
+    cluster_cache_ttl=None,
+    addon_cache_ttl=None,
+    addons_definitions=None,
+    ocm_clients=None,
+    planned_addon=None,
+    lock=None,
+):
+    """
+    Get addon runtime data (OCM client, cluster data, addon definition) for install or uninstall
+
+    Args:
+        addon_spec (AddonSpec): addon spec
+        addons_definitions (dict, optional): addons definitions already fetched, by (ocm env, addon name);
+            updated with the addon definition
+        ocm_clients (dict, optional): OCM clients already built, by OCM environment; updated with the addon client
+        planned_addon (dict, optional): addon plan entry of a previous run, its cluster data and addon definition
+            are reused, see `plan.py`
+        lock (threading.Lock, optional): lock held around `ocm_clients` and `addons_definitions` lookups and updates,
+            when they are shared between threads
+
+    Returns:
+        dict or None: addon dict, None if the addon cluster does not exist
+    """
+    addon_name = addon_spec.name
+    cluster_name = addon_spec.cluster_name
+    span_args = {"name": addon_name, "cluster-name": cluster_name}
+    ocm_client = get_addon_ocm_client(
+        addon_spec=addon_spec,
+        ocm_token=ocm_token,
+        endpoint=endpoint,
+        token_cache_dir=token_cache_dir,
+        ocm_clients=ocm_clients,
+        span_args=span_args,
+        lock=lock,
+    )
+
+    with trace_span(name=CLUSTER_DATA_SPAN, category=ADDON_STR, args=span_args):
+        if planned_addon:
+            cluster_data = get_planned_cluster_data(
+                ocm_client=ocm_client,
+                cluster_name=cluster_name,
+                planned_addon=planned_addon,
+            )
+        else:
+            cluster_data = get_cluster_data(
+                ocm_client=ocm_client,
+                cluster_name=cluster_name,
+                ocm_env=addon_spec.ocm_env,
+                cluster_cache_dir=cluster_cache_dir,
+                cluster_cache_ttl=cluster_cache_ttl,
+            )
+
+    if not cluster_data:
+        return None
+
+    addons_definitions = {} if addons_definitions is None else addons_definitions
+    addon_definition_key = (addon_spec.ocm_env, addon_name)
+    lock = lock or contextlib.nullcontext()
+    with lock:
+        if planned_addon:
+            addons_definitions.setdefault(addon_definition_key, planned_addon["addon-definition"])
+
+        addon_definition = addons_definitions.get(addon_definition_key)
+
+    try:
+        if addon_definition is None:
+            addon_definition = get_addon_definition(
+                ocm_client=ocm_client,
+                addon_name=addon_name,
+                ocm_env=addon_spec.ocm_env,
+                addon_cache_dir=cluster_cache_dir,
+                addon_cache_ttl=addon_cache_ttl,
+            )
+            with lock:
+                addon_definition = addons_definitions.setdefault(addon_definition_key, addon_definition)
+
+        cluster_addon = ClusterAddOnById(
+            client=ocm_client,
+            cluster_name=cluster_name,
+            addon_name=addon_name,
+            cluster_id=cluster_data["id"],
+            addon_definition=addon_definition,
         )
+    except NotFoundException as exc:
+        LOGGER.error(f"Failed to get addon for cluster {cluster_name} on {exc}.")
         raise click.Abort()
 
+    return {
+        "spec": addon_spec,
+        "name": addon_name,
+        "cluster-name": cluster_name,
+        "ocm-client": ocm_client,
+        "cluster-id": cluster_data["id"],
+        "api-url": cluster_data.get("api-url"),
+        "ocp-version": cluster_data.get("ocp-version"),
+        "cluster-type": get_cluster_type(ocp_version=cluster_data.get("ocp-version")),
+        "kubeconfig": cluster_data["kubeconfig"],
+        "cluster-addon": cluster_addon,
+        "addon-definition": addon_definition,
+        "must_gather_output_dir": must_gather_output_dir,
+    }
 
-def assert_invalid_ocm_env(addons):
-    LOGGER.info("Verify `ocm env` is supported.")
-    supported_envs = [STAGE_STR, PRODUCTION_STR]
 
-    addons_wrong_env = {
-        addon["name"]: ocm_env
-        for addon in addons
-        if ((ocm_env := addon.get("ocm-env")) and ocm_env not in supported_envs)
-    }
+def get_addon_parameters_errors(addon_spec, addon_definition):
+    """
+    Validate addon parameters against the addon definition: unknown parameters, missing required parameters
+    (without default value), number parameters values and allowed values.
 
-    if addons_wrong_env:
-        LOGGER.error(f"Addons {addons_wrong_env} have wrong OCM environment. Supported envs: {supported_envs}")
-        raise click.Abort()
+    Parameters which apply only to some clusters (with cluster conditions) are not checked for being required,
+    `ClusterAddOn.install_addon` checks them against the cluster.
 
+    Args:
+        addon_spec (AddonSpec): addon spec
+        addon_definition (dict): addon definition, see `get_addon_definition`
 
-def assert_missing_managed_odh_brew_token(addons, brew_token):
-    managed_odh_str = "managed-odh"
-    LOGGER.info(
-        f"Verify `brew token` is not missing from user input for addon `{managed_odh_str}` installation in {STAGE_STR}."
-    )
-    if any(addon["name"] == managed_odh_str and addon["ocm-env"] == STAGE_STR for addon in addons) and not brew_token:
-        LOGGER.error(f"{managed_odh_str} addon on {STAGE_STR} requires brew token. Pass `--brew-token`")
-        raise click.Abort()
+    Returns:
+        list: validation errors
+    """
+    addon_str = f"Addon {addon_spec.name} on cluster {addon_spec.cluster_name}"
+    parameters_definitions = {
+        param["id"]: param for param in addon_definition.get("parameters", {}).get("items") or []
+    }
+    user_parameters = {param["id"]: param["value"] for param in addon_spec.parameters}
+    errors = []
+    if unknown_parameters := [param for param in user_parameters if param not in parameters_definitions]:
+        errors.append(
+            f"{addon_str}: unknown parameters {unknown_parameters}, "
+            f"supported parameters: {list(parameters_definitions)}"
+        )
 
+    for param_id, param_definition in parameters_definitions.items():
+        if param_id not in user_parameters:
+            if (
+                param_definition.get("required")
+                and not param_definition.get("default_value")
+                and not param_definition.get("conditions")
+            ):
+                errors.append(f"{addon_str}: missing required parameter `{param_id}`")
 
-def assert_addons_user_input(addons, brew_token):
-    if addons:
-        LOGGER.info("Verify addons data from user input.")
-        assert_missing_cluster_names(addons=addons)
-        assert_invalid_ocm_env(addons=addons)
-        assert_missing_managed_odh_brew_token(addons=addons, brew_token=brew_token)
+            continue
 
+        param_value = user_parameters[param_id]
+        value_type = param_definition.get("value_type")
+        if value_type == "number":
+            try:
+                int(param_value)
+            except (TypeError, ValueError):
+                errors.append(f"{addon_str}: parameter `{param_id}` must be a number, got `{param_value}`")
+
+        elif value_type == "boolean" and str(param_value).lower() not in BOOLEAN_PARAMETER_VALUES:
+            errors.append(f"{addon_str}: parameter `{param_id}` must be `true` or `false`, got `{param_value}`")
+
+        if allowed_values := [str(option.get("value")) for option in param_definition.get("options") or []]:
+            if str(param_value) not in allowed_values:
+                errors.append(
+                    f"{addon_str}: parameter `{param_id}` value `{param_value}` is not allowed, "
+                    f"allowed values: {allowed_values}"
+                )
+
+    return errors
+
+
+def prepare_addons(
+    addons,
+    ocm_token,
+    endpoint,
+    must_gather_output_dir,
+    token_cache_dir=None,
+    cluster_cache_dir=None,
+    cluster_cache_ttl=None,
+    addon_cache_ttl=None,
+    install=False,
+    addons_definitions=None,
+    ocm_clients=None,
+    planned_addons=None,
+    lock=None,
+):
+    """
+    Prepare addons for install or uninstall
 
-def write_kubeconfig_file(cluster):
-    with tempfile.NamedTemporaryFile(prefix=f"kubeconfig-{cluster.name}", delete=False, mode="w") as fd:
-        fd.write(yaml.dump(cluster.kubeconfig))
-        return fd.name
+    OCM clients are built once per OCM environment and addons definitions are fetched once per OCM environment and
+    addon; on install, addons parameters are validated against them before any addon is installed.
 
+    Args:
+        addons (list): list of AddonSpec
+        addon_cache_ttl (int, optional): time in seconds to keep cached addons definitions in `cluster_cache_dir`
+        install (bool): True if addons are installed
+        addons_definitions (dict, optional): addons definitions to reuse between runs, see `prepare_addon`
+        ocm_clients (dict, optional): OCM clients to reuse between runs, see `prepare_addon`
+        planned_addons (dict, optional): addons plan entries by (cluster name, addon name), see `prepare_addon`
+        lock (threading.Lock, optional): lock of `addons_definitions` and `ocm_clients`, see `prepare_addon`
 
-def prepare_addons(addons, ocm_token, endpoint, brew_token, install, must_gather_output_dir):
+    Returns:
+        list: list of addons dicts, see `prepare_addon`
+    """
     LOGGER.info("Preparing addons dict")
+    prepared_addons = []
     missing_clusters_addons = []
-    for addon in addons:
-        addon_name = addon["name"]
-        cluster_name = addon["cluster-name"]
-        addon["timeout"] = tts(ts=addon.get("timeout", TIMEOUT_30MIN))
-        ocm_env = addon.get("ocm-env", STAGE_STR)
-        addon["ocm-env"] = ocm_env
-        addon["brew-token"] = brew_token
-        addon["rosa"] = bool(addon.get("rosa"))
-        addon["must_gather_output_dir"] = must_gather_output_dir
-
-        ocm_client = OCMPythonClient(
-            token=ocm_token,
-            endpoint=endpoint,
-            api_host=ocm_env,
-            discard_unknown_keys=True,
-        ).client
-        addon["ocm-client"] = ocm_client
-        cluster = Cluster(
-            client=ocm_client,
-            name=cluster_name,
-        )
-
-        if cluster.exists:
-            addon["cluster-object"] = cluster
-            addon["kubeconfig"] = write_kubeconfig_file(cluster=cluster)
+    parameters_errors = []
+    addons_definitions = {} if addons_definitions is None else addons_definitions
+    ocm_clients = {} if ocm_clients is None else ocm_clients
+    for addon_spec in addons:
+        with product_phase(product_type=ADDON_STR, phase=PREPARE_PHASE), trace_span(
+            name=PREPARE_PHASE,
+            category=ADDON_STR,
+            args={"name": addon_spec.name, "cluster-name": addon_spec.cluster_name},
+        ):
+            addon = prepare_addon(
+                addon_spec=addon_spec,
+                ocm_token=ocm_token,
+                endpoint=endpoint,
+                must_gather_output_dir=must_gather_output_dir,
+                token_cache_dir=token_cache_dir,
+                cluster_cache_dir=cluster_cache_dir,
+                cluster_cache_ttl=cluster_cache_ttl,
+                addon_cache_ttl=addon_cache_ttl,
+                addons_definitions=addons_definitions,
+                ocm_clients=ocm_clients,
+                planned_addon=(planned_addons or {}).get((addon_spec.cluster_name, addon_spec.name)),
+                lock=lock,
+            )
+
+        if addon:
+            prepared_addons.append(addon)
+            if install:
+                parameters_errors.extend(
+                    get_addon_parameters_errors(addon_spec=addon_spec, addon_definition=addon["addon-definition"])
+                )
         else:
-            missing_clusters_addons.append(addon_name)
-
-        try:
-            addon["cluster-addon"] = ClusterAddOn(client=ocm_client, cluster_name=cluster_name, addon_name=addon_name)
-        except NotFoundException as exc:
-            LOGGER.error(f"Failed to get addon for cluster {cluster_name} on {exc}.")
-            raise click.Abort()
-
-        if install:
-            addon["parameters"] = extract_addon_params(addon_dict=addon)
+            missing_clusters_addons.append(addon_spec.name)
 
     if missing_clusters_addons:
         LOGGER.error(f"Addons {missing_clusters_addons}: clusters do not exist.")
         raise click.Abort()
 
-    return addons
+    if parameters_errors:
+        parameters_errors_str = "\n".join(parameters_errors)
+        LOGGER.error(f"Invalid addons parameters:\n{parameters_errors_str}")
+        raise click.Abort()
+
+    return prepared_addons
+
+
+def resume_addon_install(cluster_addon, wait_timeout, **kwargs):
+    """
+    Retry addon installation in place: wait for the addon if it was already submitted, else install it.
+    """
+    if cluster_addon.addon_installation_instance():
+        LOGGER.info(f"Addon {cluster_addon.addon_name} was already submitted, waiting for its installation")
+        return cluster_addon.wait_for_install_state(state=cluster_addon.State.READY, wait_timeout=wait_timeout)
+
+    return cluster_addon.install_addon(wait_timeout=wait_timeout, **kwargs)
 
 
-def prepare_addons_action(addons, install):
+def wait_for_addon_install_progress(cluster_addon, wait_timeout, stall_timeout):
+    """
+    Wait for addon installation, fail early if the addon installation failed or its state did not change
+    for `stall_timeout` seconds.
+
+    Args:
+        cluster_addon (ClusterAddOn): cluster addon
+        wait_timeout (int): timeout in seconds to wait for the addon installation
+        stall_timeout (int): no-progress window in seconds
+    """
+    progress_tracker = ProgressTracker(
+        name=f"Addon {cluster_addon.addon_name} installation",
+        timeout=wait_timeout,
+        stall_timeout=stall_timeout,
+    )
+    while True:
+        addon_installation = cluster_addon.addon_installation_instance()
+        status = {
+            "state": addon_installation and str(addon_installation.get("state")),
+            "state-description": addon_installation and addon_installation.get("state_description"),
+        }
+        if status["state"] == ADDON_READY_STATE:
+            LOGGER.info(f"{cluster_addon.addon_name} v{cluster_addon.addon_version} successfully installed")
+            return
+
+        progress_tracker.update(status=status)
+        if status["state"] == ADDON_FAILED_STATE:
+            progress_tracker.fail(reason="failed")
+
+        time.sleep(PRODUCT_WAIT_POLL_INTERVAL_SECONDS)
+
+
+def install_addon_with_stall_detection(
+    cluster_addon,
+    wait_timeout,
+    stall_timeout,
+    must_gather_output_dir=None,
+    kubeconfig_path=None,
+    **kwargs,
+):
+    """
+    Install addon (unless it was already submitted) and wait for it with stall detection,
+    see `wait_for_addon_install_progress`.
+    """
+    if not cluster_addon.addon_installation_instance():
+        cluster_addon.install_addon(
+            wait=False,
+            wait_timeout=wait_timeout,
+            must_gather_output_dir=must_gather_output_dir,
+            kubeconfig_path=kubeconfig_path,
+            **kwargs,
+        )
+
+    try:
+        wait_for_addon_install_progress(
+            cluster_addon=cluster_addon,
+            wait_timeout=wait_timeout,
+            stall_timeout=stall_timeout,
+        )
+    except RuntimeError as exc:
+        LOGGER.error(f"{cluster_addon.addon_name} Install Failed. \n{exc}")
+        if must_gather_output_dir:
+            collect_must_gather(
+                must_gather_output_dir=must_gather_output_dir,
+                kubeconfig_path=kubeconfig_path,
+                cluster_name=cluster_addon.name,
+                product_name=cluster_addon.addon_name,
+            )
+        raise
+
+
+def resume_addon_uninstall(cluster_addon, **kwargs):
+    """
+    Retry addon uninstallation in place, skip it if the addon was already removed.
+    """
+    if not cluster_addon.addon_installation_instance():
+        LOGGER.info(f"Addon {cluster_addon.addon_name} was already removed")
+        return None
+
+    return cluster_addon.uninstall_addon(**kwargs)
+
+
+def delete_addon(cluster_addon, rosa=False):
+    """
+    Delete addon without waiting for its removal; deletion is verified by the caller,
+    see `cli_utils.wait_for_products_deletion`.
+
+    Args:
+        cluster_addon (ClusterAddOn): cluster addon
+        rosa (bool): use ROSA cli if True else use OCM API
+
+    Returns:
+        list: addon pending deletion dict
+    """
+    cluster_addon.uninstall_addon(wait=False, rosa=rosa)
+    return [
+        {
+            "resource": f"Addon {cluster_addon.addon_name} on cluster {cluster_addon.name}",
+            "exists": cluster_addon.addon_installation_instance,
+            "namespace": False,
+        }
+    ]
+
+
+def prepare_addons_action(addons, install, fast_uninstall=False):
     addons_action_list = []
 
     for addon in addons:
         addon_obj = addon["cluster-addon"]
-        addon_func = addon_obj.install_addon if install else addon_obj.uninstall_addon
         name = addon["name"]
-        LOGGER.info(f"Preparing addon: {name}, func: {addon_func.__name__}")
+        addon_spec = addon["spec"]
+        if not install and fast_uninstall:
+            LOGGER.info(f"Preparing addon: {name}, func: {delete_addon.__name__}")
+            addons_action_list.append({
+                "func": delete_addon,
+                "kwargs": {"cluster_addon": addon_obj, "rosa": addon_spec.rosa},
+                "product-type": ADDON_STR,
+                "name": name,
+                "cluster-name": addon["cluster-name"],
+                "cluster-type": addon["cluster-type"],
+                "timeout": addon_spec.timeout,
+                "retries": addon_spec.retries,
+                "retry-backoff": addon_spec.retry_backoff,
+            })
+            continue
 
         action_kwargs = {
             "wait": True,
-            "wait_timeout": addon["timeout"],
-            "rosa": addon["rosa"],
+            "wait_timeout": addon_spec.timeout,
+            "rosa": addon_spec.rosa,
         }
+        if install and addon_spec.stall_timeout:
+            # Installation is idempotent, retries run the same function
+            addon_func = addon_retry_func = functools.partial(
+                install_addon_with_stall_detection,
+                cluster_addon=addon_obj,
+            )
+            action_kwargs.pop("wait")
+            action_kwargs["stall_timeout"] = addon_spec.stall_timeout
+            LOGGER.info(f"Preparing addon: {name}, func: {install_addon_with_stall_detection.__name__}")
+        else:
+            addon_func = addon_obj.install_addon if install else addon_obj.uninstall_addon
+            addon_retry_func = functools.partial(
+                resume_addon_install if install else resume_addon_uninstall,
+                cluster_addon=addon_obj,
+            )
+            LOGGER.info(f"Preparing addon: {name}, func: {addon_func.__name__}")
+
         if install:
-            action_kwargs["parameters"] = addon["parameters"]
-            brew_token = addon.get("brew-token")
+            action_kwargs["parameters"] = addon_spec.parameters
+            brew_token = addon_spec.brew_token
             if brew_token:
                 action_kwargs["brew_token"] = brew_token
             if must_gather_output_dir := addon.get("must_gather_output_dir"):
                 action_kwargs["must_gather_output_dir"] = must_gather_output_dir
                 action_kwargs["kubeconfig_path"] = addon["kubeconfig"]
 
-        addons_action_list.append((addon_func, action_kwargs))
+        addons_action_list.append({
+            "func": addon_func,
+            "retry-func": addon_retry_func,
+            "kwargs": action_kwargs,
+            "product-type": ADDON_STR,
+            "name": name,
+            "cluster-name": addon["cluster-name"],
+            "cluster-type": addon["cluster-type"],
+            "timeout": addon_spec.timeout,
+            "retries": addon_spec.retries,
+            "retry-backoff": addon_spec.retry_backoff,
+        })
 
     return addons_action_list
@@ -0,0 +1,93 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.utils.general import write_file_atomically
+
+LOGGER = get_logger(name=__name__)
+
+
+def get_cache_key(*args):
+    """
+    Build a stable cache key from the given values.
+
+    The values are hashed so secrets (tokens) never end up in file names.
+
+    Returns:
+        str: sha256 hex digest of the values
+    """
+    return hashlib.sha256("\0".join([str(arg) for arg in args]).encode()).hexdigest()
+
+
+def get_cache_file_path(cache_dir, cache_name, key):
+    """
+    Get cache file path, create cache directory (accessible only by the current user) if needed.
+
+    Args:
+        cache_dir (str): base cache directory
+        cache_name (str): cache sub-directory, one per cache type
+        key (str): cache key, see `get_cache_key`
+
+    Returns:
+        str: cache file path
+    """
+    _cache_dir = os.path.join(os.path.expanduser(cache_dir), cache_name)
+    os.makedirs(_cache_dir, mode=0o700, exist_ok=True)
+    return os.path.join(_cache_dir, f"{key}.json")
+
+
+@contextlib.contextmanager
+def cache_file_lock(cache_file):
+    """
+    Exclusive lock on a cache file, shared between processes on the same host.
+
+    Args:
+        cache_file (str): cache file path
+    """
+    lock_fd = os.open(f"{cache_file}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        os.close(lock_fd)
+
+
+def read_cache_file(cache_file):
+    """
+    Read cache file data.
+
+    Args:
+        cache_file (str): cache file path
+
+    Returns:
+        dict: cache data, empty dict if file does not exist or is corrupted
+    """
+    try:
+        with open(cache_file) as fd:
+            return json.load(fd)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        LOGGER.warning(f"Ignoring corrupted cache file {cache_file}")
+        return {}
+
+
+def write_cache_file(cache_file, data):
+    """
+    Atomically write cache file data, readable only by the current user.
+
+    Args:
+        cache_file (str): cache file path
+        data (dict): data to write
+    """
+    write_file_atomically(file_path=cache_file, content=json.dumps(data))
+
+
+def remove_cache_file(cache_file):
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(cache_file)
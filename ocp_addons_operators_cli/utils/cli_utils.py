@@ -1,21 +1,33 @@
+import contextlib
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import click
 from simple_logger.logger import get_logger
 
-from ocp_addons_operators_cli.constants import SUPPORTED_ACTIONS
-from ocp_addons_operators_cli.utils.addons_utils import (
-    assert_addons_user_input,
-    prepare_addons_action,
-)
-from ocp_addons_operators_cli.utils.general import set_debug_os_flags
-from ocp_addons_operators_cli.utils.operators_utils import (
-    assert_operators_user_input,
-    prepare_operators_action,
+from ocp_addons_operators_cli.constants import INSTALL_STR, SUPPORTED_ACTIONS, UNINSTALL_STR
+from ocp_addons_operators_cli.utils.addons_utils import prepare_addons_action
+from ocp_addons_operators_cli.utils.cluster_lock import CLUSTER_LOCK_TYPES
+from ocp_addons_operators_cli.utils.general import set_debug_os_flags, tts
+from ocp_addons_operators_cli.utils.history import (
+    RUN_HISTORY,
+    record_product_action_duration,
+    schedule_products_actions,
 )
+from ocp_addons_operators_cli.utils.metrics import product_phase, record_product_outcome
+from ocp_addons_operators_cli.utils.operators_utils import create_operators_catalog_sources, prepare_operators_action
+from ocp_addons_operators_cli.utils.preflight import CLUSTER_PREFLIGHT_MODES
+from ocp_addons_operators_cli.utils.products_specs import is_name_pattern
+from ocp_addons_operators_cli.utils.profiling import RUN_PROFILER
+from ocp_addons_operators_cli.utils.report import record_product_report
+from ocp_addons_operators_cli.utils.retry_utils import run_product_action_with_retries
+from ocp_addons_operators_cli.utils.sharding import assert_shard
+from ocp_addons_operators_cli.utils.tracing import QUEUED_SPAN, RUN_TRACE, trace_span
 
 LOGGER = get_logger(name=__name__)
 
+PRODUCTS_DELETION_POLL_INTERVAL_SECONDS = 10
+
 
 def abort_no_ocm_token(ocm_token, addons):
     LOGGER.info("Verify OCM TOKEN is not missing from user input")
@@ -56,64 +68,320 @@ def assert_operators_iib_configuration(kwargs):
             raise click.Abort()
 
 
+def assert_positive_time(time_value, time_name):
+    if time_value is None:
+        return
+
+    LOGGER.info(f"Verify `{time_name}` from user input")
+    try:
+        if tts(ts=time_value) > 0:
+            return
+    except ValueError:
+        pass
+
+    LOGGER.error(f"Invalid `{time_name}` {time_value}, must be a positive time; format examples: `1h`, `30m`, `3600s`")
+    raise click.Abort()
+
+
+def assert_choice(value, value_name, choices):
+    if value is not None and value not in choices:
+        LOGGER.error(f"Invalid `{value_name}` {value}, supported values: {choices}")
+        raise click.Abort()
+
+
+def assert_products_names_patterns(action, products):
+    if action == UNINSTALL_STR:
+        return
+
+    if patterns := [product.get("name") for product in products if is_name_pattern(name=product.get("name"))]:
+        LOGGER.error(f"Products names patterns {patterns} select installed products, supported only on uninstall")
+        raise click.Abort()
+
+
+def assert_plan_action(action, plan_in, plan_out):
+    if plan_out and action != INSTALL_STR:
+        LOGGER.error("`--plan-out` is supported only on install")
+        raise click.Abort()
+
+    if plan_in and action != UNINSTALL_STR:
+        LOGGER.error("`--plan-in` is supported only on uninstall")
+        raise click.Abort()
+
+
 def verify_user_input(**kwargs):
     action = kwargs.get("action")
     operators = kwargs.get("operators")
     addons = kwargs.get("addons")
     ocm_token = kwargs.get("ocm_token")
-    brew_token = kwargs.get("brew_token")
 
     abort_no_ocm_token(ocm_token=ocm_token, addons=addons)
 
     assert_action(action=action)
 
-    if not (operators or addons):
+    # Planned products are used with `--plan-in`
+    if not (operators or addons or kwargs.get("plan_in")):
         LOGGER.error("At least one '--operator' or `--addon` option must be provided.")
         raise click.Abort()
 
-    assert_operators_user_input(operators=operators, brew_token=brew_token)
-    assert_addons_user_input(addons=addons, brew_token=brew_token)
+    assert_plan_action(action=action, plan_in=kwargs.get("plan_in"), plan_out=kwargs.get("plan_out"))
 
     assert_operators_iib_configuration(kwargs=kwargs)
+    assert_products_names_patterns(action=action, products=addons + operators)
+    for time_name in ("ocm_cluster_cache_ttl", "ocm_addon_cache_ttl"):
+        assert_positive_time(time_value=kwargs.get(time_name), time_name=time_name)
+    assert_shard(shard_index=kwargs.get("shard_index"), shard_count=kwargs.get("shard_count"))
+    assert_choice(value=kwargs.get("cluster_lock"), value_name="cluster_lock", choices=CLUSTER_LOCK_TYPES)
+    if kwargs.get("cluster_lock"):
+        assert_positive_time(time_value=kwargs.get("cluster_lock_timeout"), time_name="cluster_lock_timeout")
+    assert_choice(
+        value=kwargs.get("cluster_preflight"),
+        value_name="cluster_preflight",
+        choices=CLUSTER_PREFLIGHT_MODES,
+    )
+    if kwargs.get("cluster_preflight"):
+        assert_positive_time(
+            time_value=kwargs.get("cluster_preflight_timeout"),
+            time_name="cluster_preflight_timeout",
+        )
 
+    if kwargs.get("http_record") and kwargs.get("http_replay"):
+        LOGGER.error("`--http-record` and `--http-replay` cannot be used together")
+        raise click.Abort()
+
+    if (kwargs.get("http_replay_speed") or 0) < 0:
+        LOGGER.error(f"Invalid `http_replay_speed` {kwargs['http_replay_speed']}, must be 0 or more")
+        raise click.Abort()
+
+    if (rosa_max_concurrency := kwargs.get("rosa_max_concurrency")) is not None and rosa_max_concurrency < 1:
+        LOGGER.error(f"Invalid `rosa_max_concurrency` {rosa_max_concurrency}, must be 1 or more")
+        raise click.Abort()
+
+    if (streaming_max_clusters := kwargs.get("streaming_max_clusters")) is not None and streaming_max_clusters < 1:
+        LOGGER.error(f"Invalid `streaming_max_clusters` {streaming_max_clusters}, must be 1 or more")
+        raise click.Abort()
 
-def run_install_or_uninstall_products(operators, addons, parallel, debug, install):
+    if kwargs.get("skip_namespace_wait") and not kwargs.get("fast_uninstall"):
+        LOGGER.error("`--skip-namespace-wait` requires `--fast-uninstall`")
+        raise click.Abort()
+
+
+def run_product_action(product_action, action, submitted_at=None, report=None):
+    """
+    Run product install or uninstall function, retry transient errors, record its duration and outcome
+    and profile it if enabled.
+
+    Args:
+        product_action (dict): product action, see `prepare_addons_action` and `prepare_operators_action`
+        action (str): install or uninstall
+        submitted_at (float, optional): `time.perf_counter()` when the action was submitted to the executor;
+            the time spent waiting for a free worker is traced
+        report (RunReport, optional): report to record the product outcome in, in addition to the run report
+
+    Returns:
+        Any: product function result
+    """
+    product_type = product_action["product-type"]
+    span_args = {"name": product_action["name"], "cluster-name": product_action["cluster-name"]}
+    if submitted_at and RUN_TRACE.enabled:
+        RUN_TRACE.add_async_span(
+            name=QUEUED_SPAN,
+            category=product_type,
+            start_time=submitted_at,
+            end_time=time.perf_counter(),
+            args=span_args,
+        )
+
+    profile_name = f"{product_type}-{product_action['name']}-{product_action['cluster-name']}"
+    start_time = time.perf_counter()
+    try:
+        with RUN_PROFILER.profile_thread(name=profile_name), product_phase(
+            product_type=product_type, phase=action
+        ), trace_span(name=action, category=product_type, args=span_args):
+            result = run_product_action_with_retries(product_action=product_action, action=action)
+    except Exception as exc:
+        record_product_outcome(product_type=product_type, action=action, success=False)
+        record_product_report(
+            product_action=product_action,
+            action=action,
+            success=False,
+            duration=time.perf_counter() - start_time,
+            error=exc,
+            report=report,
+        )
+        raise
+
+    duration = time.perf_counter() - start_time
+    record_product_outcome(product_type=product_type, action=action, success=True)
+    record_product_action_duration(product_action=product_action, action=action, duration=duration)
+    record_product_report(
+        product_action=product_action,
+        action=action,
+        success=True,
+        duration=duration,
+        report=report,
+    )
+    return result
+
+
+def wait_for_products_deletion(pending_deletions, timeout, skip_namespace_wait=False):
+    """
+    Wait for products resources deletion, issued by fast uninstall actions.
+
+    All pending resources are checked every interval in a single shared phase, after all deletions were issued.
+
+    Args:
+        pending_deletions (list): resources pending deletion dicts
+        timeout (int): timeout in seconds
+        skip_namespace_wait (bool): do not wait for namespaces termination; namespaces which still exist
+            at the end of the run are reported
+
+    Returns:
+        list: resources pending deletion dicts which still exist
+    """
+    LOGGER.info(f"Verifying products deletion, skip namespaces wait: {skip_namespace_wait}")
+    start_time = time.monotonic()
+    pending = [
+        pending_deletion
+        for pending_deletion in pending_deletions
+        if not (skip_namespace_wait and pending_deletion["namespace"])
+    ]
+    while True:
+        pending = [pending_deletion for pending_deletion in pending if pending_deletion["exists"]()]
+        if not pending or time.monotonic() - start_time > timeout:
+            break
+
+        time.sleep(PRODUCTS_DELETION_POLL_INTERVAL_SECONDS)
+
+    if skip_namespace_wait:
+        pending.extend(
+            pending_deletion
+            for pending_deletion in pending_deletions
+            if pending_deletion["namespace"] and pending_deletion["exists"]()
+        )
+
+    return pending
+
+
+def verify_products_deletion(pending_deletions, timeout, skip_namespace_wait=False):
+    leftovers = wait_for_products_deletion(
+        pending_deletions=pending_deletions,
+        timeout=timeout,
+        skip_namespace_wait=skip_namespace_wait,
+    )
+    if terminating_namespaces := [leftover["resource"] for leftover in leftovers if leftover["namespace"]]:
+        LOGGER.warning(f"Namespaces still terminating: {terminating_namespaces}")
+
+    if not_deleted_resources := [leftover["resource"] for leftover in leftovers if not leftover["namespace"]]:
+        LOGGER.error(f"Resources were not deleted after {timeout} seconds: {not_deleted_resources}")
+        raise click.Abort()
+
+
+def run_install_or_uninstall_products(
+    operators,
+    addons,
+    parallel,
+    debug,
+    install,
+    operators_group_wait=False,
+    fast_uninstall=False,
+    skip_namespace_wait=False,
+    fail_fast=True,
+    executor=None,
+    report=None,
+):
+    """
+    Install or uninstall prepared products.
+
+    Args:
+        operators (list): operators dicts, see `prepare_operators`
+        addons (list): addons dicts, see `prepare_addons`
+        parallel (bool): run products actions in parallel
+        debug (bool): enable wrapper libraries debug logs
+        install (bool): True to install, False to uninstall
+        fail_fast (bool): abort on the first failed product; if False, all products are processed and failures
+            are only logged and recorded
+        executor (ThreadPoolExecutor, optional): executor for parallel actions; a new one is used if not set
+        report (RunReport, optional): report to record the products outcomes in, in addition to the run report
+
+    Returns:
+        list: results of the successful products actions
+    """
     if debug:
         set_debug_os_flags()
 
-    futures = []
+    futures = {}
     processed_results = []
+    failed_products = []
     action = "install" if install else "uninstall"
 
-    with ThreadPoolExecutor() as executor:
+    if install:
+        create_operators_catalog_sources(operators=operators, parallel=parallel)
+
+    with contextlib.nullcontext(executor) if executor else ThreadPoolExecutor() as _executor:
         operators_action_list = prepare_operators_action(
             operators=operators,
             install=install,
+            group_wait=operators_group_wait,
+            fast_uninstall=fast_uninstall,
         )
 
         addons_action_list = prepare_addons_action(
             addons=addons,
             install=install,
+            fast_uninstall=fast_uninstall,
         )
 
+        products_action_list = addons_action_list + operators_action_list
+        if parallel and RUN_HISTORY.enabled:
+            products_action_list = schedule_products_actions(products_actions=products_action_list, action=action)
+
         LOGGER.info(f"Running products installation; parallel: {parallel}")
-        for product_action_tuple in addons_action_list + operators_action_list:
-            action_func = product_action_tuple[0]
-            action_kwargs = product_action_tuple[1]
+        for product_action in products_action_list:
             if parallel:
-                futures.append(executor.submit(action_func, **action_kwargs))
-            else:
-                processed_results.append(action_func(**action_kwargs))
-
-    if futures:
-        for result in as_completed(futures):
-            if result.exception():
-                # TODO: Add cluster name, product name and type to threads
-                LOGGER.error(
-                    f"Failed to {action}: {result.exception()}\n",
+                future = _executor.submit(
+                    run_product_action,
+                    product_action=product_action,
+                    action=action,
+                    submitted_at=time.perf_counter(),
+                    report=report,
                 )
+                futures[future] = product_action
+            else:
+                try:
+                    processed_results.append(
+                        run_product_action(product_action=product_action, action=action, report=report)
+                    )
+                except Exception as exc:
+                    if fail_fast:
+                        raise
+
+                    log_product_action_failure(product_action=product_action, action=action, exc=exc)
+                    failed_products.append(product_action["name"])
+
+    for result in as_completed(futures):
+        if result.exception():
+            product_action = futures[result]
+            log_product_action_failure(product_action=product_action, action=action, exc=result.exception())
+            if fail_fast:
                 raise click.Abort()
-            processed_results.append(result.result())
+
+            failed_products.append(product_action["name"])
+            continue
+
+        processed_results.append(result.result())
+
+    if fast_uninstall and not install and addons + operators:
+        verify_products_deletion(
+            pending_deletions=[
+                pending_deletion for pending_deletions in processed_results for pending_deletion in pending_deletions
+            ],
+            timeout=max(product["spec"].timeout for product in addons + operators),
+            skip_namespace_wait=skip_namespace_wait,
+        )
+
+    if failed_products:
+        LOGGER.error(f"Failed to {action} products: {failed_products}")
+        return processed_results
 
     addon_names = [addon["name"] for addon in addons]
     operator_names = [operator["name"] for operator in operators]
@@ -124,6 +392,13 @@ def run_install_or_uninstall_products(operators, addons, parallel, debug, instal
     return processed_results
 
 
+def log_product_action_failure(product_action, action, exc):
+    LOGGER.error(
+        f"Failed to {action} {product_action['product-type']} {product_action['name']} "
+        f"on cluster {product_action['cluster-name']}: {exc}\n",
+    )
+
+
 def set_parallel(user_input_parallel, operators, addons):
     LOGGER.info("Setting `parallel` option")
     if len(operators + addons) > 1:
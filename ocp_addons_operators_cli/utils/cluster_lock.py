@@ -0,0 +1,266 @@
+import contextlib
+import datetime
+import fcntl
+import os
+import socket
+import threading
+import time
+import uuid
+
+import click
+from kubernetes.dynamic.exceptions import ConflictError, NotFoundError
+from ocp_resources.lease import Lease
+from ocp_utilities.infra import get_client
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.utils.cache_utils import get_cache_file_path, get_cache_key
+
+LOGGER = get_logger(name=__name__)
+
+LEASE_CLUSTER_LOCK = "lease"
+FILE_CLUSTER_LOCK = "file"
+CLUSTER_LOCK_TYPES = (LEASE_CLUSTER_LOCK, FILE_CLUSTER_LOCK)
+CLUSTER_LOCK_NAME = "ocp-addons-operators-cli"
+CLUSTER_LOCKS_CACHE_NAME = "cluster-locks"
+LEASE_DURATION_SECONDS = 60
+CLUSTER_LOCK_POLL_INTERVAL_SECONDS = 5
+LEASE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def get_lock_holder_identity():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class LeaseClusterLock:
+    """
+    Cluster lock based on a `coordination.k8s.io/v1` Lease in the cluster itself, shared by runs on any host.
+
+    The Lease is taken when it does not exist, is held by this run or expired; concurrent takeovers are resolved by
+    the API server resourceVersion check. While held, a heartbeat thread renews the Lease every third of its
+    duration, so a crashed run releases the cluster after at most `lease_duration` seconds.
+    """
+
+    def __init__(self, lease_api, cluster_name, namespace, holder_identity, lease_duration=LEASE_DURATION_SECONDS):
+        self.lease_api = lease_api
+        self.cluster_name = cluster_name
+        self.namespace = namespace
+        self.holder_identity = holder_identity
+        self.lease_duration = lease_duration
+        self._heartbeat = None
+        self._stop_heartbeat = threading.Event()
+
+    def _lease_body(self, resource_version=None, acquire_time=None, lease_transitions=0):
+        now = datetime.datetime.now(tz=datetime.timezone.utc).strftime(LEASE_TIME_FORMAT)
+        metadata = {"name": CLUSTER_LOCK_NAME, "namespace": self.namespace}
+        if resource_version:
+            metadata["resourceVersion"] = resource_version
+
+        return {
+            "apiVersion": "coordination.k8s.io/v1",
+            "kind": "Lease",
+            "metadata": metadata,
+            "spec": {
+                "holderIdentity": self.holder_identity,
+                "leaseDurationSeconds": self.lease_duration,
+                "acquireTime": acquire_time or now,
+                "renewTime": now,
+                "leaseTransitions": lease_transitions,
+            },
+        }
+
+    @staticmethod
+    def _is_expired(lease_spec):
+        renew_time = lease_spec.get("renewTime")
+        if not renew_time:
+            return True
+
+        renewed_at = datetime.datetime.strptime(renew_time, LEASE_TIME_FORMAT).replace(tzinfo=datetime.timezone.utc)
+        expires_at = renewed_at + datetime.timedelta(seconds=lease_spec.get("leaseDurationSeconds") or 0)
+        return expires_at < datetime.datetime.now(tz=datetime.timezone.utc)
+
+    def _try_acquire(self):
+        try:
+            lease = self.lease_api.get(name=CLUSTER_LOCK_NAME, namespace=self.namespace).to_dict()
+        except NotFoundError:
+            try:
+                self.lease_api.create(body=self._lease_body(), namespace=self.namespace)
+                return True
+            except ConflictError:
+                return False
+
+        lease_spec = lease.get("spec", {})
+        holder = lease_spec.get("holderIdentity")
+        if holder and holder != self.holder_identity and not self._is_expired(lease_spec=lease_spec):
+            LOGGER.info(f"Cluster {self.cluster_name} lock is held by {holder}, waiting")
+            return False
+
+        is_holder = holder == self.holder_identity
+        try:
+            self.lease_api.replace(
+                body=self._lease_body(
+                    resource_version=lease["metadata"]["resourceVersion"],
+                    acquire_time=lease_spec.get("acquireTime") if is_holder else None,
+                    lease_transitions=lease_spec.get("leaseTransitions", 0) + (0 if is_holder else 1),
+                ),
+                namespace=self.namespace,
+            )
+            return True
+        except ConflictError:
+            return False
+
+    def _run_heartbeat(self):
+        while not self._stop_heartbeat.wait(timeout=self.lease_duration / 3):
+            try:
+                if not self._try_acquire():
+                    LOGGER.error(f"Cluster {self.cluster_name} lock was lost")
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.warning(f"Failed to renew cluster {self.cluster_name} lock: {exc}")
+
+    def acquire(self, wait_timeout):
+        """
+        Wait for the cluster lock.
+
+        Args:
+            wait_timeout (int): time in seconds to wait for the lock
+
+        Returns:
+            bool: True if the lock was acquired
+        """
+        deadline = time.monotonic() + wait_timeout
+        while not self._try_acquire():
+            if time.monotonic() > deadline:
+                return False
+
+            time.sleep(CLUSTER_LOCK_POLL_INTERVAL_SECONDS)
+
+        LOGGER.info(f"Acquired cluster {self.cluster_name} lock as {self.holder_identity}")
+        self._stop_heartbeat.clear()
+        self._heartbeat = threading.Thread(
+            target=self._run_heartbeat,
+            name=f"cluster-lock-heartbeat-{self.cluster_name}",
+            daemon=True,
+        )
+        self._heartbeat.start()
+        return True
+
+    def release(self):
+        if self._heartbeat:
+            self._stop_heartbeat.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+
+        try:
+            lease = self.lease_api.get(name=CLUSTER_LOCK_NAME, namespace=self.namespace).to_dict()
+            if lease.get("spec", {}).get("holderIdentity") == self.holder_identity:
+                self.lease_api.delete(name=CLUSTER_LOCK_NAME, namespace=self.namespace)
+                LOGGER.info(f"Released cluster {self.cluster_name} lock")
+        except (ConflictError, NotFoundError) as exc:
+            LOGGER.warning(f"Failed to release cluster {self.cluster_name} lock: {exc}")
+
+
+class FileClusterLock:
+    """
+    Cluster lock based on a local lock file, shared by runs on the same host.
+    """
+
+    def __init__(self, lock_file, cluster_name):
+        self.lock_file = lock_file
+        self.cluster_name = cluster_name
+        self._lock_fd = None
+
+    def acquire(self, wait_timeout):
+        self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = time.monotonic() + wait_timeout
+        while True:
+            try:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                LOGGER.info(f"Acquired cluster {self.cluster_name} lock {self.lock_file}")
+                return True
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+                    return False
+
+                LOGGER.info(f"Cluster {self.cluster_name} lock is held by another run, waiting")
+                time.sleep(CLUSTER_LOCK_POLL_INTERVAL_SECONDS)
+
+    def release(self):
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+            LOGGER.info(f"Released cluster {self.cluster_name} lock")
+
+
+def get_products_clusters_clients(operators, addons):
+    """
+    Get a cluster client for each products cluster; operators clients are reused, addons clusters clients are
+    built from their kubeconfig.
+
+    Returns:
+        dict: cluster name as key, cluster client as value
+    """
+    clusters_clients = {operator["cluster-name"]: operator["ocp-client"] for operator in operators}
+    for addon in addons:
+        if addon["cluster-name"] not in clusters_clients:
+            clusters_clients[addon["cluster-name"]] = get_client(config_file=addon["kubeconfig"])
+
+    return clusters_clients
+
+
+def get_cluster_lock(lock_type, cluster_name, cluster_client, namespace, cache_dir, holder_identity):
+    if lock_type == LEASE_CLUSTER_LOCK:
+        return LeaseClusterLock(
+            lease_api=Lease(client=cluster_client, name=CLUSTER_LOCK_NAME, namespace=namespace).api,
+            cluster_name=cluster_name,
+            namespace=namespace,
+            holder_identity=holder_identity,
+        )
+
+    cache_file = get_cache_file_path(
+        cache_dir=cache_dir,
+        cache_name=CLUSTER_LOCKS_CACHE_NAME,
+        key=get_cache_key(cluster_name),
+    )
+    return FileClusterLock(lock_file=f"{os.path.splitext(cache_file)[0]}.lock", cluster_name=cluster_name)
+
+
+@contextlib.contextmanager
+def clusters_locks(operators, addons, lock_type, namespace, wait_timeout, cache_dir):
+    """
+    Hold the locks of all products clusters, no-op if `lock_type` is not set.
+
+    Locks are acquired in cluster name order, so concurrent runs sharing several clusters do not deadlock.
+
+    Args:
+        operators (list): operators dicts
+        addons (list): addons dicts
+        lock_type (str): `lease` or `file`
+        namespace (str): Lease namespace, for `lease` locks
+        wait_timeout (int): time in seconds to wait for each cluster lock
+        cache_dir (str): base cache directory, for `file` locks
+    """
+    if not lock_type:
+        yield
+        return
+
+    holder_identity = get_lock_holder_identity()
+    clusters_clients = get_products_clusters_clients(operators=operators, addons=addons)
+    with contextlib.ExitStack() as locks_stack:
+        for cluster_name in sorted(clusters_clients):
+            cluster_lock = get_cluster_lock(
+                lock_type=lock_type,
+                cluster_name=cluster_name,
+                cluster_client=clusters_clients[cluster_name],
+                namespace=namespace,
+                cache_dir=cache_dir,
+                holder_identity=holder_identity,
+            )
+            if not cluster_lock.acquire(wait_timeout=wait_timeout):
+                LOGGER.error(f"Timed out after {wait_timeout} seconds waiting for cluster {cluster_name} lock")
+                raise click.Abort()
+
+            locks_stack.callback(cluster_lock.release)
+
+        yield
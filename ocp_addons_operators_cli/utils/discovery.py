@@ -0,0 +1,275 @@
+import copy
+import fnmatch
+from collections import defaultdict
+
+import click
+from ocp_resources.cluster_service_version import ClusterServiceVersion
+from ocp_resources.subscription import Subscription
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.utils.addons_utils import get_addon_ocm_client
+from ocp_addons_operators_cli.utils.ocm_utils import get_cluster_data
+from ocp_addons_operators_cli.utils.operators_utils import get_cluster_name_from_kubeconfig, get_ocp_client
+from ocp_addons_operators_cli.utils.products_specs import is_name_pattern
+
+LOGGER = get_logger(name=__name__)
+
+# Namespaces which are never deleted with their discovered operators
+PROTECTED_NAMESPACES_PREFIXES = ("openshift-", "kube-")
+PROTECTED_NAMESPACES = ("openshift", "default")
+
+
+def copy_spec(spec, **changes):
+    product_spec = copy.copy(spec)
+    for name, value in changes.items():
+        setattr(product_spec, name, value)
+
+    return product_spec
+
+
+def discover_cluster_addons(ocm_client, cluster_id, name_pattern):
+    """
+    Get the names of the addons installed on a cluster matching `name_pattern`, with a single OCM list call.
+    """
+    addons_installations = ocm_client.api_clusters_mgmt_v1_clusters_cluster_id_addons_get(cluster_id=cluster_id)
+    return sorted(
+        addon_installation.id
+        for addon_installation in addons_installations.items or []
+        if fnmatch.fnmatchcase(addon_installation.id, name_pattern)
+    )
+
+
+def is_protected_namespace(namespace):
+    return namespace in PROTECTED_NAMESPACES or namespace.startswith(PROTECTED_NAMESPACES_PREFIXES)
+
+
+def get_operators_dependents(subscriptions, ocp_client):
+    """
+    Get the operators which depend on each operator, from their CSVs owned and required CRDs; a single list call.
+
+    Args:
+        subscriptions (list): Subscriptions dicts
+        ocp_client (DynamicClient): cluster client
+
+    Returns:
+        dict: operator (Subscription) name as key, set of the names of the operators which require its CRDs as value
+    """
+    subscriptions_by_csv = {
+        (subscription["metadata"]["namespace"], subscription.get("status", {}).get("installedCSV")): subscription
+        for subscription in subscriptions
+    }
+    crds_owners = {}
+    crds_requirers = defaultdict(set)
+    for csv in ClusterServiceVersion.get(client=ocp_client, raw=True):
+        csv_dict = csv.to_dict()
+        if "olm.copiedFrom" in (csv_dict["metadata"].get("labels") or {}):
+            continue
+
+        subscription = subscriptions_by_csv.get((csv_dict["metadata"]["namespace"], csv_dict["metadata"]["name"]))
+        if not subscription:
+            continue
+
+        crds = csv_dict.get("spec", {}).get("customresourcedefinitions") or {}
+        for crd in crds.get("owned") or []:
+            crds_owners[crd["name"]] = subscription["metadata"]["name"]
+
+        for crd in crds.get("required") or []:
+            crds_requirers[crd["name"]].add(subscription["metadata"]["name"])
+
+    operators_dependents = defaultdict(set)
+    for crd_name, requirers in crds_requirers.items():
+        if owner := crds_owners.get(crd_name):
+            operators_dependents[owner].update(requirer for requirer in requirers if requirer != owner)
+
+    return operators_dependents
+
+
+def discover_cluster_operators(ocp_client, name_pattern, namespace=None, label_selector=None):
+    """
+    Get the operators installed on a cluster, from their OLM Subscriptions, with a single list call.
+
+    Subscriptions owned by another resource (e.g. created by the addon operator for an addon) are skipped.
+    Operators namespaces are deleted only if the operator is their only Subscription, they are not platform
+    namespaces and Subscriptions are not filtered by labels.
+
+    Args:
+        ocp_client (DynamicClient): cluster client
+        name_pattern (str): Subscriptions names glob pattern
+        namespace (str, optional): Subscriptions namespace, all namespaces if not set
+        label_selector (str, optional): Subscriptions label selector
+
+    Returns:
+        list: operators dicts, with `name`, `namespace`, `clean-up-namespace` and `uninstall-after` (names of the
+            operators which depend on the operator)
+    """
+    subscriptions = [
+        subscription.to_dict()
+        for subscription in Subscription.get(
+            client=ocp_client,
+            namespace=namespace,
+            label_selector=label_selector,
+            raw=True,
+        )
+    ]
+    namespaces_subscriptions = defaultdict(int)
+    for subscription in subscriptions:
+        namespaces_subscriptions[subscription["metadata"]["namespace"]] += 1
+
+    subscriptions = [
+        subscription
+        for subscription in subscriptions
+        if fnmatch.fnmatchcase(subscription["metadata"]["name"], name_pattern)
+        and not subscription["metadata"].get("ownerReferences")
+    ]
+    operators_dependents = get_operators_dependents(subscriptions=subscriptions, ocp_client=ocp_client)
+    operators = []
+    for subscription in subscriptions:
+        name = subscription["metadata"]["name"]
+        subscription_namespace = subscription["metadata"]["namespace"]
+        operators.append({
+            "name": name,
+            "namespace": subscription_namespace,
+            "clean-up-namespace": not label_selector
+            and namespaces_subscriptions[subscription_namespace] == 1
+            and not is_protected_namespace(namespace=subscription_namespace),
+            "uninstall-after": tuple(sorted(operators_dependents.get(name, ()))),
+        })
+
+    return operators
+
+
+def discover_addons_specs(
+    addons_specs,
+    ocm_token,
+    endpoint,
+    token_cache_dir=None,
+    cluster_cache_dir=None,
+    cluster_cache_ttl=None,
+    ocm_clients=None,
+):
+    """
+    Replace the addons specs whose name is a pattern by a spec for each matching addon installed on their cluster.
+
+    Returns:
+        list: list of AddonSpec
+    """
+    discovered_specs = []
+    products_keys = {
+        (addon_spec.cluster_name, addon_spec.name)
+        for addon_spec in addons_specs
+        if not is_name_pattern(name=addon_spec.name)
+    }
+    for addon_spec in addons_specs:
+        if not is_name_pattern(name=addon_spec.name):
+            discovered_specs.append(addon_spec)
+            continue
+
+        ocm_client = get_addon_ocm_client(
+            addon_spec=addon_spec,
+            ocm_token=ocm_token,
+            endpoint=endpoint,
+            token_cache_dir=token_cache_dir,
+            ocm_clients=ocm_clients,
+        )
+        cluster_data = get_cluster_data(
+            ocm_client=ocm_client,
+            cluster_name=addon_spec.cluster_name,
+            ocm_env=addon_spec.ocm_env,
+            cluster_cache_dir=cluster_cache_dir,
+            cluster_cache_ttl=cluster_cache_ttl,
+        )
+        if not cluster_data:
+            LOGGER.error(f"Addons {addon_spec.name}: cluster {addon_spec.cluster_name} does not exist.")
+            raise click.Abort()
+
+        addons_names = discover_cluster_addons(
+            ocm_client=ocm_client,
+            cluster_id=cluster_data["id"],
+            name_pattern=addon_spec.name,
+        )
+        LOGGER.info(f"Discovered addons {addons_names} on cluster {addon_spec.cluster_name}")
+        for addon_name in addons_names:
+            if (addon_spec.cluster_name, addon_name) not in products_keys:
+                products_keys.add((addon_spec.cluster_name, addon_name))
+                discovered_specs.append(copy_spec(spec=addon_spec, name=addon_name))
+
+    return discovered_specs
+
+
+def discover_operators_specs(operators_specs, ocp_clients=None):
+    """
+    Replace the operators specs whose name is a pattern by a spec for each matching operator installed on their
+    cluster, see `discover_cluster_operators`.
+
+    Returns:
+        list: list of OperatorSpec
+    """
+    discovered_specs = []
+    products_keys = {
+        (operator_spec.kubeconfig, operator_spec.name)
+        for operator_spec in operators_specs
+        if not is_name_pattern(name=operator_spec.name)
+    }
+    for operator_spec in operators_specs:
+        if not is_name_pattern(name=operator_spec.name):
+            discovered_specs.append(operator_spec)
+            continue
+
+        operators = discover_cluster_operators(
+            ocp_client=get_ocp_client(kubeconfig=operator_spec.kubeconfig, ocp_clients=ocp_clients),
+            name_pattern=operator_spec.name,
+            namespace=operator_spec.namespace,
+            label_selector=operator_spec.label_selector,
+        )
+        cluster_name = get_cluster_name_from_kubeconfig(
+            kubeconfig=operator_spec.kubeconfig,
+            operator_name=operator_spec.name,
+        )
+        LOGGER.info(f"Discovered operators {[operator['name'] for operator in operators]} on cluster {cluster_name}")
+        for operator in operators:
+            if (operator_spec.kubeconfig, operator["name"]) not in products_keys:
+                products_keys.add((operator_spec.kubeconfig, operator["name"]))
+                discovered_specs.append(
+                    copy_spec(
+                        spec=operator_spec,
+                        name=operator["name"],
+                        namespace=operator["namespace"],
+                        clean_up_namespace=operator["clean-up-namespace"],
+                        uninstall_after=operator["uninstall-after"],
+                    )
+                )
+
+    return discovered_specs
+
+
+def get_uninstall_waves(addons, operators):
+    """
+    Split products into uninstall waves: an operator is uninstalled in a wave after all the operators of the same
+    cluster which depend on it (see `OperatorSpec.uninstall_after`); products of a wave are uninstalled together.
+
+    Args:
+        addons (list): addons dicts
+        operators (list): operators dicts
+
+    Returns:
+        list: list of (addons dicts, operators dicts) tuples, in uninstall order
+    """
+    pending = {(operator["cluster-name"], operator["name"]): operator for operator in operators}
+    waves = []
+    wave_addons = addons
+    while pending:
+        wave_operators = [
+            operator
+            for operator in pending.values()
+            if not any((operator["cluster-name"], name) in pending for name in operator["spec"].uninstall_after)
+        ]
+        if not wave_operators:
+            LOGGER.warning(f"Circular operators dependencies, uninstalling together: {sorted(pending)}")
+            wave_operators = list(pending.values())
+
+        waves.append((wave_addons, wave_operators))
+        wave_addons = []
+        for operator in wave_operators:
+            pending.pop((operator["cluster-name"], operator["name"]))
+
+    return waves or [(addons, [])]
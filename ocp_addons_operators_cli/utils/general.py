@@ -1,6 +1,8 @@
 import json
 import os
 import re
+import resource
+import sys
 import tempfile
 
 from clouds.aws.session_clients import s3_client
@@ -14,6 +16,39 @@ def set_debug_os_flags():
     os.environ["OPENSHIFT_PYTHON_WRAPPER_LOG_LEVEL"] = "DEBUG"
 
 
+def write_file_atomically(file_path, content, mode=0o600):
+    """
+    Write file content to a temporary file and rename it, readers never see a partially written file.
+
+    Args:
+        file_path (str): file path
+        content (str): content to write
+        mode (int, optional): file permissions, default: readable only by the current user
+    """
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as tmp_fd:
+            tmp_fd.write(content)
+        os.chmod(tmp_file, mode)
+        os.replace(tmp_file, file_path)
+    except Exception:
+        os.unlink(tmp_file)
+        raise
+
+
+def get_peak_memory_bytes():
+    """
+    Get the process peak resident memory (max RSS) in bytes.
+    """
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak_memory if sys.platform == "darwin" else peak_memory * 1024
+
+
+def format_memory_bytes(memory_bytes):
+    return f"{memory_bytes / 1024**2:.1f} MiB"
+
+
 def get_operators_iibs_config_from_json(
     s3_bucket_operators_latest_iib_path=None,
     aws_region=None,
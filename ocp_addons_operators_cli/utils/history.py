@@ -0,0 +1,206 @@
+import contextlib
+import math
+import os
+import sqlite3
+import statistics
+import threading
+import time
+
+from simple_logger.logger import get_logger
+
+LOGGER = get_logger(name=__name__)
+
+HISTORY_DB_FILE_NAME = "products-history.sqlite"
+# Number of latest successful runs used to estimate a product duration
+HISTORY_RUNS_LIMIT = 10
+# Minimal number of runs to suggest a product timeout
+SUGGESTED_TIMEOUT_MIN_RUNS = 3
+SUGGESTED_TIMEOUT_FACTOR = 1.5
+SUGGESTED_TIMEOUT_MIN_SECONDS = 300
+
+
+def get_cluster_type(ocp_version):
+    """
+    Get cluster type for products history, OCP major.minor version.
+
+    Args:
+        ocp_version (str): cluster OCP version, e.g. `4.14.5`
+
+    Returns:
+        str: cluster type, e.g. `ocp-4.14`; `ocp-unknown` if the version is not known
+    """
+    if not ocp_version:
+        return "ocp-unknown"
+
+    return f"ocp-{'.'.join(str(ocp_version).split('.')[:2])}"
+
+
+class ProductsHistory:
+    """
+    Products actions durations, stored in a local SQLite database.
+
+    Durations are recorded per product type, product name, cluster type and action; new durations are kept in
+    memory during the run and written once when the run ends.
+    """
+
+    def __init__(self):
+        self.db_file = None
+        self.records = []
+        self._lock = threading.Lock()
+        self._users = 0
+
+    @property
+    def enabled(self):
+        return self.db_file is not None
+
+    def _connect(self):
+        return contextlib.closing(sqlite3.connect(self.db_file))
+
+    def enable(self, db_file):
+        LOGGER.info(f"Using products history database {db_file}")
+        os.makedirs(os.path.dirname(db_file), mode=0o700, exist_ok=True)
+        with self._lock:
+            self.db_file = db_file
+            self._users += 1
+
+        with self._connect() as connection, connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS products_runs ("
+                "product_type TEXT, name TEXT, cluster_type TEXT, action TEXT, duration REAL, recorded_at REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS products_runs_key "
+                "ON products_runs (product_type, name, cluster_type, action, recorded_at)"
+            )
+
+    def disable(self):
+        """
+        Release a history `enable`; the history is written and disabled when its last user releases it.
+        """
+        self.write()
+        with self._lock:
+            self._users = max(self._users - 1, 0)
+            if not self._users:
+                self.db_file = None
+
+    def record(self, product_type, name, cluster_type, action, duration):
+        with self._lock:
+            self.records.append((product_type, name, cluster_type, action, duration, time.time()))
+
+    def get_durations(self, product_type, name, cluster_type, action):
+        """
+        Get durations of the latest successful runs of a product action.
+
+        Returns:
+            list: durations in seconds, latest first
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT duration FROM products_runs "
+                "WHERE product_type = ? AND name = ? AND cluster_type = ? AND action = ? "
+                "ORDER BY recorded_at DESC LIMIT ?",
+                (product_type, name, cluster_type, action, HISTORY_RUNS_LIMIT),
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def write(self):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            records, self.records = self.records, []
+
+        if records:
+            LOGGER.info(f"Writing {len(records)} products durations to products history")
+            with self._connect() as connection, connection:
+                connection.executemany("INSERT INTO products_runs VALUES (?, ?, ?, ?, ?, ?)", records)
+
+
+RUN_HISTORY = ProductsHistory()
+
+
+def enable_history(cache_dir):
+    RUN_HISTORY.enable(db_file=os.path.join(os.path.expanduser(cache_dir), HISTORY_DB_FILE_NAME))
+
+
+def disable_history():
+    RUN_HISTORY.disable()
+
+
+def get_product_action_durations(product_action, action):
+    return RUN_HISTORY.get_durations(
+        product_type=product_action["product-type"],
+        name=product_action["name"],
+        cluster_type=product_action["cluster-type"],
+        action=action,
+    )
+
+
+def record_product_action_duration(product_action, action, duration):
+    if RUN_HISTORY.enabled:
+        RUN_HISTORY.record(
+            product_type=product_action["product-type"],
+            name=product_action["name"],
+            cluster_type=product_action["cluster-type"],
+            action=action,
+            duration=duration,
+        )
+
+
+def get_suggested_timeout(durations):
+    """
+    Suggest a product timeout from its durations: the longest duration with a safety margin,
+    rounded up to minutes.
+
+    Returns:
+        int or None: timeout in seconds, None if there are not enough durations
+    """
+    if len(durations) < SUGGESTED_TIMEOUT_MIN_RUNS:
+        return None
+
+    suggested_timeout = max(max(durations) * SUGGESTED_TIMEOUT_FACTOR, SUGGESTED_TIMEOUT_MIN_SECONDS)
+    return math.ceil(suggested_timeout / 60) * 60
+
+
+def schedule_products_actions(products_actions, action):
+    """
+    Order products actions by expected duration, longest first, and log suggested timeouts.
+
+    The expected duration is the median of the product latest durations on the same cluster type; products
+    without history are scheduled first, in their original order.
+
+    Args:
+        products_actions (list): products actions, see `prepare_addons_action` and `prepare_operators_action`
+        action (str): install or uninstall
+
+    Returns:
+        list: ordered products actions
+    """
+    expected_durations = []
+    for product_action in products_actions:
+        durations = get_product_action_durations(product_action=product_action, action=action)
+        expected_durations.append(statistics.median(durations) if durations else math.inf)
+
+        suggested_timeout = get_suggested_timeout(durations=durations)
+        if suggested_timeout and suggested_timeout < product_action["timeout"]:
+            LOGGER.info(
+                f"{product_action['product-type']} {product_action['name']} {action} on "
+                f"{product_action['cluster-type']} clusters took at most {max(durations):.0f}s in the last "
+                f"{len(durations)} runs; suggested timeout: {suggested_timeout // 60}m "
+                f"(current: {product_action['timeout'] // 60}m)"
+            )
+
+    ordered_products_actions = [
+        product_action
+        for _, product_action in sorted(
+            zip(expected_durations, products_actions),
+            key=lambda expected_duration_action: expected_duration_action[0],
+            reverse=True,
+        )
+    ]
+    LOGGER.info(
+        "Products scheduled longest first: "
+        f"{[product_action['name'] for product_action in ordered_products_actions]}"
+    )
+    return ordered_products_actions
@@ -0,0 +1,227 @@
+import base64
+import http.server
+import io
+import json
+import threading
+import time
+from collections import defaultdict
+
+import urllib3
+from simple_logger.logger import get_logger
+from urllib3.connectionpool import HTTPConnectionPool
+
+from ocp_addons_operators_cli.utils.general import write_file_atomically
+
+LOGGER = get_logger(name=__name__)
+
+# Response headers which describe the recorded transfer, not the recorded content
+TRANSFER_HEADERS = ("content-length", "transfer-encoding", "connection", "keep-alive")
+REPLAY_NOT_FOUND_STATUS = 501
+ORIGINAL_URLOPEN = HTTPConnectionPool.urlopen
+ORIGINAL_SLEEP = time.sleep
+
+
+def get_exchange_key(method, scheme, host, port, url):
+    return f"{method} {scheme}://{host}:{port}{url}"
+
+
+class HttpRecording:
+    """
+    Record the HTTP exchanges of a run (OCM, SSO, OCP and AWS APIs), or replay them from a local stand-in server.
+
+    Exchanges are intercepted at `urllib3` connection pools, which are used by all the API clients, including the
+    clients built inside the wrapper libraries.
+
+    On replay, requests are served by a local HTTP server; the exchanges of each method and URL are served in their
+    recorded order, the last one is repeated when the run polls more than the recorded run did.
+    Responses are delayed by their recorded duration divided by `speed`, and so are the run sleeps (polling
+    intervals, retries backoff); `speed` 0 disables all delays.
+    """
+
+    def __init__(self):
+        self.exchanges = []
+        self.replay_exchanges = defaultdict(list)
+        self.speed = 1
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start_time = None
+        self._replay_server = None
+        self._replay_pool = None
+
+    def _urlopen(self, pool, method, url, body=None, headers=None, **kwargs):
+        # urllib3 retries and redirects call `urlopen` again, only the outermost call is recorded/replayed
+        if getattr(self._local, "in_urlopen", False):
+            return ORIGINAL_URLOPEN(pool, method, url, body=body, headers=headers, **kwargs)
+
+        self._local.in_urlopen = True
+        try:
+            if self._replay_pool:
+                return ORIGINAL_URLOPEN(
+                    self._replay_pool,
+                    method,
+                    f"/{pool.scheme}/{pool.host}/{pool.port}{url}",
+                    body=body,
+                    headers=headers,
+                    **kwargs,
+                )
+
+            return self._record_urlopen(pool=pool, method=method, url=url, body=body, headers=headers, **kwargs)
+        finally:
+            self._local.in_urlopen = False
+
+    def _record_urlopen(self, pool, method, url, body=None, headers=None, **kwargs):
+        preload_content = kwargs.pop("preload_content", True)
+        decode_content = kwargs.pop("decode_content", True)
+        request_time = time.monotonic()
+        response = ORIGINAL_URLOPEN(
+            pool,
+            method,
+            url,
+            body=body,
+            headers=headers,
+            preload_content=False,
+            decode_content=decode_content,
+            **kwargs,
+        )
+        raw_body = response.read(decode_content=False)
+        response.release_conn()
+        elapsed = time.monotonic() - request_time
+
+        response_headers = [
+            (name, value) for name, value in response.headers.items() if name.lower() not in TRANSFER_HEADERS
+        ]
+        with self._lock:
+            self.exchanges.append({
+                "offset": round(request_time - self._start_time, 6),
+                "elapsed": round(elapsed, 6),
+                "method": method,
+                "scheme": pool.scheme,
+                "host": pool.host,
+                "port": pool.port,
+                "url": url,
+                "status": response.status,
+                "reason": response.reason,
+                "headers": response_headers,
+                "body": base64.b64encode(raw_body).decode(),
+            })
+
+        return urllib3.HTTPResponse(
+            body=io.BytesIO(raw_body),
+            headers=[*response_headers, ("Content-Length", str(len(raw_body)))],
+            status=response.status,
+            reason=response.reason,
+            preload_content=preload_content,
+            decode_content=decode_content,
+            request_method=method,
+            request_url=url,
+        )
+
+    def _sleep(self, seconds):
+        ORIGINAL_SLEEP(seconds / self.speed if self.speed else 0)
+
+    def _patch_urlopen(self):
+        recording = self
+
+        def urlopen(pool, method, url, *args, **kwargs):
+            return recording._urlopen(pool, method, url, *args, **kwargs)
+
+        HTTPConnectionPool.urlopen = urlopen
+
+    def start_recording(self):
+        LOGGER.info("Recording HTTP exchanges")
+        self._start_time = time.monotonic()
+        self._patch_urlopen()
+
+    def write(self, recording_file):
+        with self._lock:
+            exchanges = list(self.exchanges)
+
+        LOGGER.info(f"Writing {len(exchanges)} recorded HTTP exchanges to {recording_file}")
+        write_file_atomically(file_path=recording_file, content=json.dumps({"exchanges": exchanges}))
+
+    def next_replay_exchange(self, key):
+        with self._lock:
+            exchanges = self.replay_exchanges.get(key)
+            if not exchanges:
+                return None
+
+            return exchanges.pop(0) if len(exchanges) > 1 else exchanges[0]
+
+    def start_replay(self, recording_file, speed=1):
+        with open(recording_file) as fd:
+            exchanges = json.load(fd)["exchanges"]
+
+        for exchange in sorted(exchanges, key=lambda _exchange: _exchange["offset"]):
+            self.replay_exchanges[
+                get_exchange_key(
+                    method=exchange["method"],
+                    scheme=exchange["scheme"],
+                    host=exchange["host"],
+                    port=exchange["port"],
+                    url=exchange["url"],
+                )
+            ].append(exchange)
+
+        self.speed = speed
+        self._replay_server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), get_replay_handler(recording=self))
+        self._replay_server.daemon_threads = True
+        threading.Thread(target=self._replay_server.serve_forever, name="http-replay-server", daemon=True).start()
+        self._replay_pool = HTTPConnectionPool(host="127.0.0.1", port=self._replay_server.server_address[1])
+        self._patch_urlopen()
+        time.sleep = self._sleep
+        LOGGER.info(
+            f"Replaying {len(exchanges)} HTTP exchanges from {recording_file} "
+            f"on {self._replay_pool.host}:{self._replay_pool.port}, speed: {speed or 'no delays'}"
+        )
+
+    def stop(self):
+        HTTPConnectionPool.urlopen = ORIGINAL_URLOPEN
+        time.sleep = ORIGINAL_SLEEP
+        if self._replay_server:
+            self._replay_server.shutdown()
+            self._replay_server.server_close()
+            self._replay_pool.close()
+            self._replay_server = self._replay_pool = None
+
+
+def get_replay_handler(recording):
+    class ReplayHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _replay(self):
+            if content_length := int(self.headers.get("Content-Length", 0)):
+                self.rfile.read(content_length)
+
+            _, scheme, host, port_and_url = self.path.split("/", 3)
+            port, _, url = port_and_url.partition("/")
+            key = get_exchange_key(method=self.command, scheme=scheme, host=host, port=int(port), url=f"/{url}")
+            exchange = recording.next_replay_exchange(key=key)
+            if not exchange:
+                LOGGER.error(f"No recorded HTTP exchange for {key}")
+                body = json.dumps({"message": f"No recorded HTTP exchange for {key}"}).encode()
+                self.send_response(REPLAY_NOT_FOUND_STATUS)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            recording._sleep(exchange["elapsed"])
+            body = base64.b64decode(exchange["body"])
+            self.send_response(exchange["status"], exchange["reason"])
+            for name, value in exchange["headers"]:
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _replay
+
+        def log_message(self, format, *args):
+            LOGGER.debug(format % args)
+
+    return ReplayHandler
+
+
+HTTP_RECORDING = HttpRecording()
@@ -0,0 +1,130 @@
+import fnmatch
+import os
+import tempfile
+
+import yaml
+from simple_logger.logger import get_logger
+
+LOGGER = get_logger(name=__name__)
+
+
+def load_kubeconfig(kubeconfig, kubeconfigs=None):
+    """
+    Load a kubeconfig file.
+
+    Args:
+        kubeconfig (str): kubeconfig file path
+        kubeconfigs (dict, optional): kubeconfigs loaded by the current validation pass, by path; the file is read
+            once per pass, and on each call without `kubeconfigs`
+    """
+    if kubeconfigs is not None and kubeconfig in kubeconfigs:
+        return kubeconfigs[kubeconfig]
+
+    with open(kubeconfig) as fd:
+        kubeconfig_dict = yaml.safe_load(fd)
+
+    if kubeconfigs is not None:
+        kubeconfigs[kubeconfig] = kubeconfig_dict
+
+    return kubeconfig_dict
+
+
+def get_kubeconfig_contexts(kubeconfig, contexts_patterns, kubeconfigs=None):
+    """
+    Get kubeconfig contexts names matching any of the patterns, in kubeconfig order.
+
+    Args:
+        kubeconfig (str): kubeconfig file path
+        contexts_patterns (list): contexts names or glob patterns, e.g. `prod-*`
+        kubeconfigs (dict, optional): kubeconfigs loaded by the current validation pass, see `load_kubeconfig`
+
+    Returns:
+        list: matching contexts names
+    """
+    return [
+        context["name"]
+        for context in load_kubeconfig(kubeconfig=kubeconfig, kubeconfigs=kubeconfigs).get("contexts") or []
+        if any(fnmatch.fnmatchcase(context["name"], pattern) for pattern in contexts_patterns)
+    ]
+
+
+def get_kubeconfig_server(kubeconfig):
+    """
+    Get the API server URL of the kubeconfig current context, or of its only cluster.
+
+    Args:
+        kubeconfig (str): kubeconfig file path
+
+    Returns:
+        str or None: API server URL
+    """
+    kubeconfig_dict = load_kubeconfig(kubeconfig=kubeconfig)
+    clusters = kubeconfig_dict.get("clusters") or []
+    current_context = next(
+        (
+            context["context"]
+            for context in kubeconfig_dict.get("contexts") or []
+            if context["name"] == kubeconfig_dict.get("current-context")
+        ),
+        {},
+    )
+    cluster = next(
+        (cluster for cluster in clusters if cluster["name"] == current_context.get("cluster")),
+        clusters[0] if len(clusters) == 1 else {},
+    )
+    return cluster.get("cluster", {}).get("server")
+
+
+def write_context_kubeconfig(kubeconfig, context, context_kubeconfigs, kubeconfigs=None):
+    """
+    Write a kubeconfig file holding only `context`, with its cluster and user, as the current context.
+
+    Files are written once per kubeconfig and context in `context_kubeconfigs`, so all operators of a context share
+    the same file and the same cached OCP client; remove them with `remove_context_kubeconfigs`.
+
+    Args:
+        kubeconfig (str): kubeconfig file path
+        context (str): context name
+        context_kubeconfigs (dict): context kubeconfig files paths, by (kubeconfig file path, context name)
+        kubeconfigs (dict, optional): kubeconfigs loaded by the current validation pass, see `load_kubeconfig`
+
+    Returns:
+        str: context kubeconfig file path
+    """
+    if context_kubeconfig_file := context_kubeconfigs.get((kubeconfig, context)):
+        return context_kubeconfig_file
+
+    kubeconfig_dict = load_kubeconfig(kubeconfig=kubeconfig, kubeconfigs=kubeconfigs)
+    context_dict = next(_context for _context in kubeconfig_dict["contexts"] if _context["name"] == context)
+    cluster_name = context_dict["context"]["cluster"]
+    user_name = context_dict["context"].get("user")
+    context_kubeconfig = {
+        **{key: value for key, value in kubeconfig_dict.items() if key not in ("clusters", "contexts", "users")},
+        "clusters": [cluster for cluster in kubeconfig_dict["clusters"] if cluster["name"] == cluster_name],
+        "contexts": [context_dict],
+        "users": [user for user in kubeconfig_dict.get("users") or [] if user["name"] == user_name],
+        "current-context": context,
+    }
+    # Kubeconfig files hold credentials, temporary files are readable only by the current user
+    with tempfile.NamedTemporaryFile(prefix="kubeconfig-context-", delete=False, mode="w") as fd:
+        fd.write(yaml.dump(context_kubeconfig))
+
+    LOGGER.info(f"Kubeconfig {kubeconfig} context {context} written to {fd.name}")
+    context_kubeconfigs[(kubeconfig, context)] = fd.name
+    return fd.name
+
+
+def remove_context_kubeconfigs(context_kubeconfigs):
+    """
+    Remove the context kubeconfig files written by `write_context_kubeconfig`, they hold credentials.
+
+    Args:
+        context_kubeconfigs (dict): context kubeconfig files paths, by (kubeconfig file path, context name)
+    """
+    for context_kubeconfig_file in context_kubeconfigs.values():
+        try:
+            os.remove(context_kubeconfig_file)
+        except FileNotFoundError:
+            pass
+
+    context_kubeconfigs.clear()
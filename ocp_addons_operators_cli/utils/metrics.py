@@ -0,0 +1,281 @@
+import contextlib
+import functools
+import re
+import threading
+import time
+from collections import defaultdict
+
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.utils.general import get_peak_memory_bytes, write_file_atomically
+
+LOGGER = get_logger(name=__name__)
+
+METRICS_PREFIX = "ocp_addons_operators_cli"
+PRODUCTS_METRIC = f"{METRICS_PREFIX}_products_total"
+PRODUCT_RETRIES_METRIC = f"{METRICS_PREFIX}_product_retries_total"
+PHASE_DURATION_METRIC = f"{METRICS_PREFIX}_phase_duration_seconds"
+API_REQUESTS_METRIC = f"{METRICS_PREFIX}_api_requests_total"
+OCM_TOKEN_REFRESHES_METRIC = f"{METRICS_PREFIX}_ocm_token_refreshes_total"
+IIB_CACHE_METRIC = f"{METRICS_PREFIX}_iib_cache_lookups_total"
+RUN_DURATION_METRIC = f"{METRICS_PREFIX}_run_duration_seconds"
+PEAK_MEMORY_METRIC = f"{METRICS_PREFIX}_peak_memory_bytes"
+
+COUNTER_TYPE = "counter"
+HISTOGRAM_TYPE = "histogram"
+GAUGE_TYPE = "gauge"
+METRICS_DEFINITIONS = {
+    PRODUCTS_METRIC: (COUNTER_TYPE, "Number of processed products by type, action and outcome."),
+    PRODUCT_RETRIES_METRIC: (COUNTER_TYPE, "Number of products actions retries after transient errors."),
+    PHASE_DURATION_METRIC: (HISTOGRAM_TYPE, "Duration of products phases (prepare, install, uninstall) in seconds."),
+    API_REQUESTS_METRIC: (
+        COUNTER_TYPE,
+        "Number of OCM and OCP API requests by endpoint, outcome and whether they were made by a product retry.",
+    ),
+    OCM_TOKEN_REFRESHES_METRIC: (COUNTER_TYPE, "Number of OCM requests which refreshed an expired access token."),
+    IIB_CACHE_METRIC: (COUNTER_TYPE, "Number of operators IIB lookups in the latest IIB json by result."),
+    RUN_DURATION_METRIC: (GAUGE_TYPE, "Duration of the last run in seconds."),
+    PEAK_MEMORY_METRIC: (GAUGE_TYPE, "Peak resident memory of the last run process in bytes."),
+}
+# API requests made by a product action retry are labeled `retry="true"`, see `api_requests_retry`
+API_REQUESTS_CONTEXT = threading.local()
+# Addons and operators phases take from seconds to an hour
+HISTOGRAM_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+# Kubernetes API paths: /api/<version>/... or /apis/<group>/<version>/...
+# optionally followed by namespaces/<namespace>, resource, name and sub-resource.
+OCP_API_PATH_RE = re.compile(
+    r"^/(?P<base>api/[^/]+|apis/[^/]+/[^/]+)"
+    r"(?:/namespaces/(?P<namespace>[^/]+)(?=/))?"
+    r"(?:/(?P<resource>[^/]+))?(?:/(?P<name>[^/]+))?(?:/(?P<subresource>[^/]+))?"
+)
+
+
+class RunMetrics:
+    """
+    Thread-safe in-memory metrics of a single run, rendered in Prometheus text format.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.samples = defaultdict(float)
+        self.histograms = {}
+
+    @staticmethod
+    def _labels_key(labels):
+        return tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, labels=None, value=1):
+        with self._lock:
+            self.samples[(name, self._labels_key(labels=labels))] += value
+
+    def set(self, name, value, labels=None):
+        with self._lock:
+            self.samples[(name, self._labels_key(labels=labels))] = value
+
+    def observe(self, name, value, labels=None):
+        with self._lock:
+            histogram = self.histograms.setdefault(
+                (name, self._labels_key(labels=labels)),
+                {"buckets": [0] * len(HISTOGRAM_BUCKETS), "sum": 0.0, "count": 0},
+            )
+            for idx, bucket in enumerate(HISTOGRAM_BUCKETS):
+                if value <= bucket:
+                    histogram["buckets"][idx] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @staticmethod
+    def _format_labels(labels_key, extra_labels=()):
+        labels = [*labels_key, *extra_labels]
+        if not labels:
+            return ""
+
+        escaped_labels = []
+        for label_name, label_value in labels:
+            label_value = str(label_value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+            escaped_labels.append(f'{label_name}="{label_value}"')
+
+        return f"{{{','.join(escaped_labels)}}}"
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (metric_type, metric_help) in METRICS_DEFINITIONS.items():
+                lines.extend([f"# HELP {name} {metric_help}", f"# TYPE {name} {metric_type}"])
+                for (sample_name, labels_key), value in sorted(self.samples.items()):
+                    if sample_name == name:
+                        lines.append(f"{name}{self._format_labels(labels_key=labels_key)} {value}")
+
+                for (histogram_name, labels_key), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+
+                    for bucket, bucket_count in zip(HISTOGRAM_BUCKETS, histogram["buckets"]):
+                        _labels = self._format_labels(labels_key=labels_key, extra_labels=(("le", float(bucket)),))
+                        lines.append(f"{name}_bucket{_labels} {bucket_count}")
+                    _labels = self._format_labels(labels_key=labels_key, extra_labels=(("le", "+Inf"),))
+                    lines.append(f"{name}_bucket{_labels} {histogram['count']}")
+                    lines.append(f"{name}_sum{self._format_labels(labels_key=labels_key)} {histogram['sum']}")
+                    lines.append(f"{name}_count{self._format_labels(labels_key=labels_key)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+RUN_METRICS = RunMetrics()
+
+
+@contextlib.contextmanager
+def product_phase(product_type, phase):
+    """
+    Measure a product phase duration.
+
+    Args:
+        product_type (str): addon or operator
+        phase (str): phase name; prepare, install or uninstall
+    """
+    start_time = time.monotonic()
+    try:
+        yield
+    finally:
+        RUN_METRICS.observe(
+            name=PHASE_DURATION_METRIC,
+            value=time.monotonic() - start_time,
+            labels={"product_type": product_type, "phase": phase},
+        )
+
+
+def record_product_outcome(product_type, action, success):
+    RUN_METRICS.inc(
+        name=PRODUCTS_METRIC,
+        labels={"product_type": product_type, "action": action, "outcome": "success" if success else "failure"},
+    )
+
+
+def record_product_retry(product_type, action):
+    RUN_METRICS.inc(name=PRODUCT_RETRIES_METRIC, labels={"product_type": product_type, "action": action})
+
+
+def record_iib_cache_lookup(hit):
+    RUN_METRICS.inc(name=IIB_CACHE_METRIC, labels={"result": "hit" if hit else "miss"})
+
+
+@contextlib.contextmanager
+def api_requests_retry(retry):
+    """
+    Label the API requests made by the current thread as made by a product action retry.
+
+    Args:
+        retry (bool): True if the product action is retried
+    """
+    previous_retry = getattr(API_REQUESTS_CONTEXT, "retry", False)
+    API_REQUESTS_CONTEXT.retry = retry
+    try:
+        yield
+    finally:
+        API_REQUESTS_CONTEXT.retry = previous_retry
+
+
+def get_api_request_outcome(exc=None):
+    """
+    Get API request outcome label: `success`, the failed request HTTP status or `error` if there is no status.
+    """
+    if exc is None:
+        return "success"
+
+    return str(status) if (status := getattr(exc, "status", None)) else "error"
+
+
+def get_ocp_api_endpoint(resource_path):
+    """
+    Get OCP API endpoint template from a request path, to keep metrics labels cardinality low.
+
+    Example:
+        >>> get_ocp_api_endpoint(resource_path="/apis/operators.coreos.com/v1alpha1/namespaces/ns/subscriptions/sub")
+        '/apis/operators.coreos.com/v1alpha1/namespaces/{namespace}/subscriptions/{name}'
+    """
+    if not (match := OCP_API_PATH_RE.match(resource_path)):
+        return resource_path
+
+    endpoint = f"/{match['base']}"
+    if match["namespace"]:
+        endpoint += "/namespaces/{namespace}"
+    if match["resource"]:
+        endpoint += f"/{match['resource']}"
+    if match["name"]:
+        endpoint += "/{name}"
+    if match["subresource"]:
+        endpoint += f"/{match['subresource']}"
+
+    return endpoint
+
+
+def count_api_requests(api_client, api_name, get_endpoint=None):
+    """
+    Count API requests made by an API client (OCM or kubernetes `ApiClient`), only if metrics are enabled.
+
+    Requests are labeled with their outcome (`success` or the failed request HTTP status) and `retry`, whether
+    they were made by a product action retry, see `api_requests_retry`.
+    OCM clients refresh an expired access token and resend the request internally; such requests are counted as
+    OCM token refreshes.
+
+    Args:
+        api_client (ApiClient): API client, its `call_api` is wrapped
+        api_name (str): API name, `ocm` or `ocp`
+        get_endpoint (func, optional): function to get endpoint template from request path
+    """
+    if not RUN_METRICS.enabled:
+        return api_client
+
+    call_api = api_client.call_api
+
+    @functools.wraps(call_api)
+    def _call_api(resource_path, method, *args, **kwargs):
+        labels = {
+            "api": api_name,
+            "method": method,
+            "endpoint": get_endpoint(resource_path=resource_path) if get_endpoint else resource_path,
+        }
+        access_token = getattr(api_client.configuration, "access_token", None)
+        outcome = get_api_request_outcome()
+        try:
+            return call_api(resource_path, method, *args, **kwargs)
+        except Exception as exc:
+            outcome = get_api_request_outcome(exc=exc)
+            raise
+        finally:
+            RUN_METRICS.inc(
+                name=API_REQUESTS_METRIC,
+                labels={
+                    **labels,
+                    "outcome": outcome,
+                    "retry": str(getattr(API_REQUESTS_CONTEXT, "retry", False)).lower(),
+                },
+            )
+            if getattr(api_client.configuration, "access_token", None) != access_token:
+                RUN_METRICS.inc(name=OCM_TOKEN_REFRESHES_METRIC, labels=labels)
+
+    api_client.call_api = _call_api
+    return api_client
+
+
+def enable_metrics():
+    """
+    Enable collecting API requests metrics, which wraps the API clients.
+    """
+    RUN_METRICS.enabled = True
+
+
+def write_metrics_file(metrics_file, run_duration):
+    """
+    Write run metrics to a file in Prometheus text format (readable by node-exporter textfile collector).
+
+    Args:
+        metrics_file (str): metrics file path
+        run_duration (float): run duration in seconds
+    """
+    RUN_METRICS.set(name=RUN_DURATION_METRIC, value=run_duration)
+    RUN_METRICS.set(name=PEAK_MEMORY_METRIC, value=get_peak_memory_bytes())
+    LOGGER.info(f"Writing run metrics to {metrics_file}")
+    write_file_atomically(file_path=metrics_file, content=RUN_METRICS.render(), mode=0o644)
@@ -0,0 +1,480 @@
+import base64
+import json
+import os
+import tempfile
+import time
+
+import yaml
+from ocm_python_client.api_client import ApiClient
+from ocm_python_client.configuration import Configuration
+from ocm_python_client.exceptions import NotFoundException
+from ocm_python_wrapper.cluster import Cluster, ClusterAddOn
+from ocm_python_wrapper.ocm_client import OCMPythonClient
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.utils.cache_utils import (
+    cache_file_lock,
+    get_cache_file_path,
+    get_cache_key,
+    read_cache_file,
+    remove_cache_file,
+    write_cache_file,
+)
+from ocp_addons_operators_cli.utils.kubeconfig_utils import get_kubeconfig_server
+from ocp_addons_operators_cli.utils.metrics import count_api_requests
+
+LOGGER = get_logger(name=__name__)
+
+OCM_TOKENS_CACHE_NAME = "ocm-tokens"
+OCM_CLUSTERS_CACHE_NAME = "ocm-clusters"
+OCM_ADDONS_CACHE_NAME = "ocm-addons"
+# Addon definition parameters keys used by parameters validation and `ClusterAddOn.install_addon`
+ADDON_PARAMETER_DEFINITION_KEYS = ("id", "value_type", "required", "default_value", "options", "conditions")
+CLUSTER_CACHE_REQUIRED_KEYS = ("cached-at", "id")
+# Do not reuse access tokens which are about to expire
+ACCESS_TOKEN_EXPIRATION_MARGIN_SECONDS = 60
+
+
+class CachedTokenOCMPythonClient(OCMPythonClient):
+    """
+    OCM client which uses an existing access token instead of exchanging the offline token at the SSO endpoint.
+
+    If the access token is rejected by OCM, `OCMPythonClient.call_api` refreshes it using the offline token;
+    the refreshed token is written back to the cache file.
+
+    `OCMPythonClient.__init__` always exchanges the offline token, so it is skipped and the attributes it sets
+    (`endpoint`, `token`, `client_config`) are set here instead; this relies on the internals of
+    openshift-cluster-management-python-wrapper 2.x (pinned to `<3` in pyproject.toml).
+    """
+
+    def __init__(
+        self,
+        token,
+        endpoint,
+        access_token,
+        api_host="production",
+        discard_unknown_keys=False,
+        cache_file=None,
+    ):
+        self.endpoint = endpoint
+        self.token = token
+        self.cache_file = cache_file
+        self.client_config = Configuration(
+            host=self.get_base_api_uri(api_host),
+            access_token=access_token,
+            discard_unknown_keys=discard_unknown_keys,
+        )
+
+        ApiClient.__init__(self, configuration=self.client_config)
+
+    def call_api(self, *args, **kwargs):
+        access_token = self.client_config.access_token
+        try:
+            return super().call_api(*args, **kwargs)
+        finally:
+            if self.cache_file and self.client_config.access_token != access_token:
+                LOGGER.info("Updating cached OCM access token")
+                with cache_file_lock(cache_file=self.cache_file):
+                    write_access_token_cache_file(
+                        cache_file=self.cache_file,
+                        access_token=self.client_config.access_token,
+                    )
+
+
+class ClusterById(Cluster):
+    """
+    Cluster which skips the OCM cluster search when the cluster id is already known.
+    """
+
+    def __init__(self, client, name, cluster_id=None):
+        self._known_cluster_id = cluster_id
+        super().__init__(client=client, name=name)
+
+    def _cluster_id(self):
+        return self._known_cluster_id or super()._cluster_id()
+
+
+class ClusterAddOnById(ClusterAddOn):
+    """
+    ClusterAddOn which skips the OCM cluster search when the cluster id is already known, and the OCM addon
+    definition requests when the addon definition is already known, see `get_addon_definition`.
+    """
+
+    def __init__(self, client, cluster_name, addon_name, cluster_id=None, addon_definition=None):
+        self._known_cluster_id = cluster_id
+        self._known_addon_definition = addon_definition
+        super().__init__(client=client, cluster_name=cluster_name, addon_name=addon_name)
+
+    def _cluster_id(self):
+        return self._known_cluster_id or super()._cluster_id()
+
+    def addon_info(self):
+        return self._known_addon_definition or super().addon_info()
+
+
+def get_access_token_expiration(access_token):
+    """
+    Get access token expiration time from its JWT `exp` claim.
+
+    Args:
+        access_token (str): SSO access token
+
+    Returns:
+        int or None: expiration time (epoch seconds), None if the token cannot be decoded
+    """
+    try:
+        payload = access_token.split(".")[1]
+        return int(json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def write_access_token_cache_file(cache_file, access_token):
+    """
+    Write an access token to the cache file, remove the cache file if the token expiration time is unknown.
+
+    Args:
+        cache_file (str): cache file path, must be locked by the caller
+        access_token (str): SSO access token
+    """
+    if expires_at := get_access_token_expiration(access_token=access_token):
+        write_cache_file(cache_file=cache_file, data={"access-token": access_token, "expires-at": expires_at})
+    else:
+        LOGGER.warning("Failed to get OCM access token expiration time, token will not be cached")
+        remove_cache_file(cache_file=cache_file)
+
+
+def get_ocm_client_with_cached_token(ocm_token, endpoint, ocm_env, token_cache_dir):
+    """
+    Get OCM client, reuse access token from the on-disk cache if valid.
+
+    The cache file is locked while the token is fetched, concurrent processes wait and reuse the new token.
+
+    Args:
+        ocm_token (str): OCM offline token
+        endpoint (str): SSO endpoint url
+        ocm_env (str): OCM environment
+        token_cache_dir (str): base cache directory
+
+    Returns:
+        OCMPythonClient: OCM client
+    """
+    cache_file = get_cache_file_path(
+        cache_dir=token_cache_dir,
+        cache_name=OCM_TOKENS_CACHE_NAME,
+        key=get_cache_key(ocm_token, endpoint, ocm_env),
+    )
+
+    with cache_file_lock(cache_file=cache_file):
+        cached_token = read_cache_file(cache_file=cache_file)
+        if cached_token.get("expires-at", 0) - ACCESS_TOKEN_EXPIRATION_MARGIN_SECONDS > time.time():
+            LOGGER.info(f"Using cached OCM access token for {ocm_env}")
+            return CachedTokenOCMPythonClient(
+                token=ocm_token,
+                endpoint=endpoint,
+                access_token=cached_token["access-token"],
+                api_host=ocm_env,
+                discard_unknown_keys=True,
+                cache_file=cache_file,
+            )
+
+        ocm_client = OCMPythonClient(
+            token=ocm_token,
+            endpoint=endpoint,
+            api_host=ocm_env,
+            discard_unknown_keys=True,
+        )
+        write_access_token_cache_file(cache_file=cache_file, access_token=ocm_client.client_config.access_token)
+
+        return ocm_client
+
+
+def get_ocm_client(ocm_token, endpoint, ocm_env, token_cache_dir=None):
+    """
+    Get OCM API client
+
+    Args:
+        ocm_token (str): OCM offline token
+        endpoint (str): SSO endpoint url
+        ocm_env (str): OCM environment
+        token_cache_dir (str, optional): base cache directory; if set, access tokens are cached between runs
+
+    Returns:
+        DefaultApi: OCM API client
+    """
+    if token_cache_dir:
+        ocm_python_client = get_ocm_client_with_cached_token(
+            ocm_token=ocm_token,
+            endpoint=endpoint,
+            ocm_env=ocm_env,
+            token_cache_dir=token_cache_dir,
+        )
+    else:
+        ocm_python_client = OCMPythonClient(
+            token=ocm_token,
+            endpoint=endpoint,
+            api_host=ocm_env,
+            discard_unknown_keys=True,
+        )
+
+    count_api_requests(api_client=ocm_python_client, api_name="ocm")
+    return ocm_python_client.client
+
+
+def write_kubeconfig_file(cluster):
+    with tempfile.NamedTemporaryFile(prefix=f"kubeconfig-{cluster.name}", delete=False, mode="w") as fd:
+        fd.write(yaml.dump(cluster.kubeconfig))
+        return fd.name
+
+
+def get_cluster_data_from_instance(cluster_instance):
+    return {
+        "id": cluster_instance.id,
+        "api-url": cluster_instance.get("api", {}).get("url"),
+        "ocp-version": cluster_instance.get("openshift_version"),
+    }
+
+
+def get_cluster_data_from_ocm(ocm_client, cluster_name):
+    """
+    Get cluster data from OCM
+
+    Args:
+        ocm_client (DefaultApi): OCM API client
+        cluster_name (str): cluster name
+
+    Returns:
+        dict or None: cluster id, api url, OCP version and kubeconfig file path; None if cluster does not exist
+    """
+    cluster = Cluster(client=ocm_client, name=cluster_name)
+    cluster_instance = cluster.exists
+    if not cluster_instance:
+        return None
+
+    return {
+        **get_cluster_data_from_instance(cluster_instance=cluster_instance),
+        "kubeconfig": write_kubeconfig_file(cluster=cluster),
+    }
+
+
+def get_valid_cached_cluster_data(ocm_client, cluster_name, cluster_cache_file, cluster_cache_ttl):
+    """
+    Get cluster data from the cache if it did not expire and the cluster still exists.
+
+    Cluster existence is validated with a single GET by cluster id; cache is invalidated if the cluster is not found.
+
+    Returns:
+        dict or None: cached cluster data (updated with the current api url and OCP version)
+    """
+    cached_data = read_cache_file(cache_file=cluster_cache_file)
+    if any(key not in cached_data for key in CLUSTER_CACHE_REQUIRED_KEYS):
+        return None
+
+    if cached_data["cached-at"] + cluster_cache_ttl < time.time():
+        return None
+
+    try:
+        cluster_instance = ocm_client.api_clusters_mgmt_v1_clusters_cluster_id_get(cluster_id=cached_data["id"])
+    except NotFoundException:
+        LOGGER.info(f"Cached cluster {cluster_name} [{cached_data['id']}] not found, invalidating cache.")
+        remove_cache_file(cache_file=cluster_cache_file)
+        return None
+
+    cached_data.update(get_cluster_data_from_instance(cluster_instance=cluster_instance))
+    return cached_data
+
+
+def get_cluster_data_with_cache(ocm_client, cluster_name, ocm_env, cluster_cache_dir, cluster_cache_ttl):
+    """
+    Get cluster data, reuse data cached by previous runs to skip the OCM clusters search.
+
+    The cluster kubeconfig holds admin credentials, it is not cached and is always fetched from OCM.
+
+    Args:
+        ocm_client (DefaultApi): OCM API client
+        cluster_name (str): cluster name
+        ocm_env (str): OCM environment
+        cluster_cache_dir (str): base cache directory
+        cluster_cache_ttl (int): time in seconds to keep cached cluster data
+
+    Returns:
+        dict or None: cluster id, api url, OCP version and kubeconfig file path; None if cluster does not exist
+    """
+    cluster_cache_file = get_cache_file_path(
+        cache_dir=cluster_cache_dir,
+        cache_name=OCM_CLUSTERS_CACHE_NAME,
+        key=get_cache_key(ocm_env, cluster_name),
+    )
+
+    with cache_file_lock(cache_file=cluster_cache_file):
+        if cluster_data := get_valid_cached_cluster_data(
+            ocm_client=ocm_client,
+            cluster_name=cluster_name,
+            cluster_cache_file=cluster_cache_file,
+            cluster_cache_ttl=cluster_cache_ttl,
+        ):
+            LOGGER.info(f"Using cached cluster {cluster_name} data")
+            cluster = ClusterById(client=ocm_client, name=cluster_name, cluster_id=cluster_data["id"])
+
+        else:
+            cluster = Cluster(client=ocm_client, name=cluster_name)
+            cluster_instance = cluster.exists
+            if not cluster_instance:
+                remove_cache_file(cache_file=cluster_cache_file)
+                return None
+
+            cluster_data = {
+                **get_cluster_data_from_instance(cluster_instance=cluster_instance),
+                "name": cluster_name,
+                "cached-at": time.time(),
+            }
+            write_cache_file(cache_file=cluster_cache_file, data=cluster_data)
+
+    return {**cluster_data, "kubeconfig": write_kubeconfig_file(cluster=cluster)}
+
+
+def get_cluster_data(ocm_client, cluster_name, ocm_env, cluster_cache_dir=None, cluster_cache_ttl=None):
+    """
+    Get cluster data
+
+    Args:
+        ocm_client (DefaultApi): OCM API client
+        cluster_name (str): cluster name
+        ocm_env (str): OCM environment
+        cluster_cache_dir (str, optional): base cache directory
+        cluster_cache_ttl (int, optional): time in seconds to keep cached cluster data; if not set, cache is not used
+
+    Returns:
+        dict or None: cluster id, api url, OCP version and kubeconfig file path; None if cluster does not exist
+    """
+    if cluster_cache_dir and cluster_cache_ttl:
+        return get_cluster_data_with_cache(
+            ocm_client=ocm_client,
+            cluster_name=cluster_name,
+            ocm_env=ocm_env,
+            cluster_cache_dir=cluster_cache_dir,
+            cluster_cache_ttl=cluster_cache_ttl,
+        )
+
+    return get_cluster_data_from_ocm(ocm_client=ocm_client, cluster_name=cluster_name)
+
+
+def get_planned_cluster_data(ocm_client, cluster_name, planned_addon):
+    """
+    Get cluster data resolved by a previous run plan, without the OCM clusters search, see `plan.py`.
+
+    The planned kubeconfig file is reused if it still exists and points to the planned API server, otherwise the
+    kubeconfig is fetched from OCM by cluster id.
+
+    Args:
+        ocm_client (DefaultApi): OCM API client
+        cluster_name (str): cluster name
+        planned_addon (dict): addon plan entry
+
+    Returns:
+        dict or None: cluster id, api url, OCP version and kubeconfig file path; None if cluster does not exist
+    """
+    kubeconfig = planned_addon.get("kubeconfig")
+    if not (
+        kubeconfig
+        and os.path.exists(kubeconfig)
+        and get_kubeconfig_server(kubeconfig=kubeconfig) == planned_addon["api-url"]
+    ):
+        cluster = ClusterById(client=ocm_client, name=cluster_name, cluster_id=planned_addon["cluster-id"])
+        try:
+            kubeconfig = write_kubeconfig_file(cluster=cluster)
+        except NotFoundException:
+            LOGGER.info(f"Planned cluster {cluster_name} [{planned_addon['cluster-id']}] not found.")
+            return None
+
+    return {
+        "id": planned_addon["cluster-id"],
+        "api-url": planned_addon["api-url"],
+        "ocp-version": planned_addon["ocp-version"],
+        "kubeconfig": kubeconfig,
+    }
+
+
+def get_addon_definition_from_ocm(ocm_client, addon_name):
+    """
+    Get addon definition from OCM, only the version and parameters definitions are kept.
+
+    Args:
+        ocm_client (DefaultApi): OCM API client
+        addon_name (str): addon name
+
+    Returns:
+        dict: addon definition, in `ClusterAddOn.addon_info` format
+    """
+    addon_info = ocm_client.api_clusters_mgmt_v1_addons_addon_id_get(addon_name).to_dict()
+    addon_definition = {"id": addon_name, "version": {"id": addon_info["version"]["id"]}}
+    if addon_parameters := addon_info.get("parameters"):
+        addon_definition["parameters"] = {
+            "items": [
+                {key: param[key] for key in ADDON_PARAMETER_DEFINITION_KEYS if key in param}
+                for param in addon_parameters.get("items", [])
+            ]
+        }
+
+    return addon_definition
+
+
+def get_addon_definition_with_cache(ocm_client, addon_name, ocm_env, addon_cache_dir, addon_cache_ttl):
+    """
+    Get addon definition, reuse definitions cached by previous runs.
+
+    Args:
+        ocm_client (DefaultApi): OCM API client
+        addon_name (str): addon name
+        ocm_env (str): OCM environment
+        addon_cache_dir (str): base cache directory
+        addon_cache_ttl (int): time in seconds to keep cached addon definitions
+
+    Returns:
+        dict: addon definition, see `get_addon_definition_from_ocm`
+    """
+    addon_cache_file = get_cache_file_path(
+        cache_dir=addon_cache_dir,
+        cache_name=OCM_ADDONS_CACHE_NAME,
+        key=get_cache_key(ocm_env, addon_name),
+    )
+
+    with cache_file_lock(cache_file=addon_cache_file):
+        cached_data = read_cache_file(cache_file=addon_cache_file)
+        if "definition" in cached_data and cached_data.get("cached-at", 0) + addon_cache_ttl > time.time():
+            LOGGER.info(f"Using cached addon {addon_name} definition")
+            return cached_data["definition"]
+
+        addon_definition = get_addon_definition_from_ocm(ocm_client=ocm_client, addon_name=addon_name)
+        write_cache_file(
+            cache_file=addon_cache_file,
+            data={"cached-at": time.time(), "definition": addon_definition},
+        )
+
+    return addon_definition
+
+
+def get_addon_definition(ocm_client, addon_name, ocm_env, addon_cache_dir=None, addon_cache_ttl=None):
+    """
+    Get addon definition: version and parameters definitions (type, required flag, default and allowed values)
+
+    Args:
+        ocm_client (DefaultApi): OCM API client
+        addon_name (str): addon name
+        ocm_env (str): OCM environment
+        addon_cache_dir (str, optional): base cache directory
+        addon_cache_ttl (int, optional): time in seconds to keep cached addon definitions; if not set, cache is not used
+
+    Returns:
+        dict: addon definition, see `get_addon_definition_from_ocm`
+    """
+    if addon_cache_dir and addon_cache_ttl:
+        return get_addon_definition_with_cache(
+            ocm_client=ocm_client,
+            addon_name=addon_name,
+            ocm_env=ocm_env,
+            addon_cache_dir=addon_cache_dir,
+            addon_cache_ttl=addon_cache_ttl,
+        )
+
+    return get_addon_definition_from_ocm(ocm_client=ocm_client, addon_name=addon_name)
@@ -1,21 +1,65 @@
+import hashlib
 import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import click
-import yaml
+from ocp_resources.cluster_service_version import ClusterServiceVersion
+from ocp_resources.installplan import InstallPlan
+from ocp_resources.namespace import Namespace
+from ocp_resources.operator import Operator
+from ocp_resources.operator_group import OperatorGroup
+from ocp_resources.subscription import Subscription
 from ocp_utilities.cluster_versions import get_cluster_version
 from ocp_utilities.infra import get_client
-from ocp_utilities.operators import install_operator, uninstall_operator
+from ocp_utilities.must_gather import collect_must_gather
+from ocp_utilities.operators import (
+    create_catalog_source_for_iib_install,
+    create_catalog_source_from_image,
+    install_operator,
+    uninstall_operator,
+    wait_for_operator_install,
+)
 from simple_logger.logger import get_logger
 
-from ocp_addons_operators_cli.constants import TIMEOUT_60MIN
+from ocp_addons_operators_cli.constants import OPERATOR_STR, PREPARE_PHASE
 from ocp_addons_operators_cli.utils.general import (
     get_operator_iib,
     get_operators_iibs_config_from_json,
-    tts,
+)
+from ocp_addons_operators_cli.utils.history import RUN_HISTORY, get_cluster_type
+from ocp_addons_operators_cli.utils.kubeconfig_utils import get_kubeconfig_server, load_kubeconfig
+from ocp_addons_operators_cli.utils.metrics import (
+    RUN_METRICS,
+    count_api_requests,
+    get_ocp_api_endpoint,
+    product_phase,
+    record_iib_cache_lookup,
+)
+from ocp_addons_operators_cli.utils.progress import (
+    PRODUCT_WAIT_POLL_INTERVAL_SECONDS,
+    ProgressTracker,
+    get_conditions_summary,
+)
+from ocp_addons_operators_cli.utils.tracing import (
+    CATALOG_SOURCE_SPAN,
+    CLIENT_BUILD_SPAN,
+    IIB_RESOLVE_SPAN,
+    trace_span,
 )
 
 LOGGER = get_logger(name=__name__)
 
+OPERATOR_MARKET_NAMESPACE = "openshift-marketplace"
+IIB_CATALOG_TYPE = "iib"
+SOURCE_IMAGE_CATALOG_TYPE = "source-image"
+OLM_OPERATOR_LABEL_PREFIX = "operators.coreos.com/"
+CSV_SUCCEEDED_PHASE = "Succeeded"
+CSV_FAILED_PHASE = "Failed"
+INSTALL_PLAN_FAILED_PHASE = "Failed"
+OPERATORS_CSVS_POLL_INTERVAL_SECONDS = 10
+
 
 def get_operators_from_user_input(**kwargs):
     LOGGER.info("Get operators data from user input.")
@@ -26,164 +70,722 @@ def get_operators_from_user_input(**kwargs):
         # Get kubeconfig from global config if not passed as operator config
         if not operator.get("kubeconfig"):
             operator["kubeconfig"] = kwargs.get("kubeconfig")
-        operator["brew-token"] = kwargs.get("brew_token")
 
     return operators
 
 
-def assert_missing_kubeconfig_from_user_input(operators):
-    LOGGER.info("Verify `kubeconfig` is not missing from user input.")
-    operators_missing_kubeconfig = [operator["name"] for operator in operators if operator["kubeconfig"] is None]
-    if operators_missing_kubeconfig:
+def get_kubeconfig_clusters_names(kubeconfig):
+    return [cluster["name"] for cluster in load_kubeconfig(kubeconfig=kubeconfig)["clusters"]]
+
+
+def get_cluster_name_from_kubeconfig(kubeconfig, operator_name):
+    LOGGER.info("Get cluster name from kubeconfig.")
+    kubeconfig_clusters_names = get_kubeconfig_clusters_names(kubeconfig=kubeconfig)
+    if len(kubeconfig_clusters_names) > 1:
         LOGGER.error(
-            "The following operators are missing `kubeconfig`:"
-            f" {operators_missing_kubeconfig}. Either add to operator config or"
-            " pass `--kubeconfig`"
+            f"Operator: {operator_name} kubeconfig file contains more than one cluster, "
+            "select the clusters with the operator `context`."
         )
         raise click.Abort()
 
+    return kubeconfig_clusters_names[0].split(":")[0]
 
-def assert_missing_kubeconfig_file(operators):
-    LOGGER.info("Verify `kubeconfig` file(s) exist.")
-    operator_non_existing_kubeconfig = [
-        operator["name"] for operator in operators if not os.path.exists(operator["kubeconfig"])
-    ]
 
-    if operator_non_existing_kubeconfig:
-        LOGGER.error("The following operators kubeconfig file does not exist: {operator_non_existing_kubeconfig}")
-        raise click.Abort()
+def get_operator_iib_from_iib_dict(iib_dict, operator_spec, ocp_client, job_name=None):
+    if iib := operator_spec.iib:
+        return iib
 
+    if not job_name:
+        return None
 
-def assert_missing_token_for_iib_installation(operators, brew_token):
-    LOGGER.info("Verify `brew token` is not missing from user input for operators IIB installation.")
-    operators_iib_missing_token = [operator["name"] for operator in operators if operator.get("iib") and not brew_token]
-    if operators_iib_missing_token:
-        LOGGER.error(
-            "The following operators will be installed using IIB:"
-            " {operators_iib_missing_token}.`--brew-token` must be provided for"
-            " operator installation using IIB."
-        )
-        raise click.Abort()
+    cluster_version = get_cluster_version(client=ocp_client)
+    cluster_version_major_minor = f"{cluster_version.major}.{cluster_version.minor}"
 
+    operator_iib = get_operator_iib(
+        iib_dict=iib_dict,
+        ocp_version=cluster_version_major_minor,
+        job_name=job_name,
+        operator_name=operator_spec.name,
+    )
+    record_iib_cache_lookup(hit=bool(operator_iib))
 
-def assert_operators_user_input(operators, brew_token):
-    if operators:
-        LOGGER.info("Verify operators data from user input.")
-        assert_missing_kubeconfig_from_user_input(operators=operators)
-        assert_missing_kubeconfig_file(operators=operators)
-        assert_missing_token_for_iib_installation(operators=operators, brew_token=brew_token)
+    return operator_iib
 
 
-def get_cluster_name_from_kubeconfig(kubeconfig, operator_name):
-    LOGGER.info("Get cluster name from kubeconfig.")
-    with open(kubeconfig) as fd:
-        kubeconfig = yaml.safe_load(fd)
+def get_ocp_client(kubeconfig, ocp_clients=None, span_args=None):
+    """
+    Get the OCP client of a kubeconfig, built once per kubeconfig.
 
-    kubeconfig_clusters = kubeconfig["clusters"]
-    if len(kubeconfig_clusters) > 1:
-        LOGGER.error(f"Operator: {operator_name} kubeconfig file contains more than one cluster.")
-        raise click.Abort()
+    Args:
+        kubeconfig (str): kubeconfig file path
+        ocp_clients (dict, optional): OCP clients already built, by kubeconfig; updated with the new client
 
-    return kubeconfig_clusters[0]["name"].split(":")[0]
+    Returns:
+        DynamicClient: OCP client
+    """
+    ocp_clients = {} if ocp_clients is None else ocp_clients
+    if kubeconfig not in ocp_clients:
+        with trace_span(name=CLIENT_BUILD_SPAN, category=OPERATOR_STR, args=span_args):
+            ocp_clients[kubeconfig] = get_client(config_file=kubeconfig)
+            if RUN_METRICS.enabled:
+                count_api_requests(
+                    api_client=ocp_clients[kubeconfig].client,
+                    api_name="ocp",
+                    get_endpoint=get_ocp_api_endpoint,
+                )
 
+    return ocp_clients[kubeconfig]
 
-def get_operator_iib_from_iib_dict(iib_dict, operator_dict, job_name=None):
-    if iib := operator_dict.get("iib"):
-        return iib
 
-    if not job_name:
-        return None
+def close_ocp_clients(ocp_clients):
+    """
+    Close OCP clients connections pools and drop them, with their cached API discovery data.
 
-    cluster_version = get_cluster_version(client=operator_dict["ocp-client"])
-    cluster_version_major_minor = f"{cluster_version.major}.{cluster_version.minor}"
+    Args:
+        ocp_clients (dict): OCP clients by kubeconfig, emptied
+    """
+    for ocp_client in ocp_clients.values():
+        ocp_client.client.close()
 
-    return get_operator_iib(
-        iib_dict=iib_dict,
-        ocp_version=cluster_version_major_minor,
-        job_name=job_name,
-        operator_name=operator_dict["name"],
+    ocp_clients.clear()
+
+
+def load_operators_iibs(user_kwargs_dict):
+    """
+    Load the operators latest IIBs data from the user S3 or local path.
+
+    Returns:
+        dict or None: operators iibs data, None if no path is set
+    """
+    s3_bucket_operators_latest_iib_path = user_kwargs_dict.get("s3_bucket_operators_latest_iib_path")
+    local_operators_latest_iib_path = user_kwargs_dict.get("local_operators_latest_iib_path")
+    if not (s3_bucket_operators_latest_iib_path or local_operators_latest_iib_path):
+        return None
+
+    return get_operators_iibs_config_from_json(
+        s3_bucket_operators_latest_iib_path=s3_bucket_operators_latest_iib_path,
+        aws_region=user_kwargs_dict.get("aws_region"),
+        local_operators_latest_iib_path=local_operators_latest_iib_path,
     )
 
 
-def prepare_operators(operators, install, user_kwargs_dict):
+def assert_planned_operator_cluster(operator_spec, planned_operator):
+    api_url = get_kubeconfig_server(kubeconfig=operator_spec.kubeconfig)
+    if api_url != planned_operator["api-url"]:
+        LOGGER.error(
+            f"Operator {operator_spec.name}: kubeconfig {operator_spec.user_kubeconfig} API server {api_url} is not "
+            f"the planned API server {planned_operator['api-url']}"
+        )
+        raise click.Abort()
+
+
+def prepare_operators(operators, install, user_kwargs_dict, ocp_clients=None, iib_dict=None, planned_operators=None):
     """
-    Update operator dict with additional data for install or uninstall
+    Get operators runtime data (OCP client, cluster name, IIB) for install or uninstall
+
+    OCP clients are built once per kubeconfig.
 
     Args:
-        operators (list): list of operators dicts
+        operators (list): list of OperatorSpec
         install (bool): install or uninstall action
         user_kwargs_dict (dict): dict with user kwargs
+        ocp_clients (dict, optional): OCP clients to reuse between runs, by kubeconfig; updated with new clients
+        iib_dict (dict, optional): operators iibs data already loaded, see `load_operators_iibs`; loaded from the
+            user kwargs paths if not set
+        planned_operators (dict, optional): operators plan entries of a previous run by (cluster name, operator name),
+            see `plan.py`; operators clusters must still be the planned API servers
 
     Returns:
-        list: updated list of operators dicts
+        list: list of operators dicts
 
     """
     LOGGER.info("Preparing operators dict")
 
-    iib_dict = None
     job_name = None
 
     if install:
-        s3_bucket_operators_latest_iib_path = user_kwargs_dict.get("s3_bucket_operators_latest_iib_path")
-        local_operators_latest_iib_path = user_kwargs_dict.get("local_operators_latest_iib_path")
-
-        if s3_bucket_operators_latest_iib_path or local_operators_latest_iib_path:
-            iib_dict = get_operators_iibs_config_from_json(
-                s3_bucket_operators_latest_iib_path=s3_bucket_operators_latest_iib_path,
-                aws_region=user_kwargs_dict.get("aws_region"),
-                local_operators_latest_iib_path=local_operators_latest_iib_path,
-            )
+        if iib_dict is None:
+            iib_dict = load_operators_iibs(user_kwargs_dict=user_kwargs_dict)
 
+        if iib_dict is not None:
             job_name = os.environ.get("PARENT_JOB_NAME", os.environ.get("JOB_NAME"))
 
+    prepared_operators = []
+    clusters_types = {}
+    ocp_clients = {} if ocp_clients is None else ocp_clients
+    for operator_spec in operators:
+        with product_phase(product_type=OPERATOR_STR, phase=PREPARE_PHASE), trace_span(
+            name=PREPARE_PHASE,
+            category=OPERATOR_STR,
+            args={"name": operator_spec.name},
+        ) as span_args:
+            kubeconfig = operator_spec.kubeconfig
+            ocp_client = get_ocp_client(kubeconfig=kubeconfig, ocp_clients=ocp_clients, span_args=span_args)
+            operator = {
+                "spec": operator_spec,
+                "name": operator_spec.name,
+                "cluster-name": get_cluster_name_from_kubeconfig(
+                    kubeconfig=kubeconfig,
+                    operator_name=operator_spec.name,
+                ),
+                "ocp-client": ocp_client,
+                "must_gather_output_dir": user_kwargs_dict.get("must_gather_output_dir"),
+            }
+            span_args["cluster-name"] = cluster_name = operator["cluster-name"]
+            if planned_operator := (planned_operators or {}).get((cluster_name, operator_spec.name)):
+                assert_planned_operator_cluster(operator_spec=operator_spec, planned_operator=planned_operator)
+                if planned_operator["cluster-type"]:
+                    clusters_types.setdefault(cluster_name, planned_operator["cluster-type"])
+
+            if RUN_HISTORY.enabled and cluster_name not in clusters_types:
+                clusters_types[cluster_name] = get_cluster_type(ocp_version=get_cluster_version(client=ocp_client))
+            operator["cluster-type"] = clusters_types.get(cluster_name)
+
+            if install:
+                with trace_span(name=IIB_RESOLVE_SPAN, category=OPERATOR_STR, args=span_args):
+                    operator["iib_index_image"] = get_operator_iib_from_iib_dict(
+                        iib_dict=iib_dict,
+                        job_name=job_name,
+                        operator_spec=operator_spec,
+                        ocp_client=ocp_client,
+                    )
+
+            prepared_operators.append(operator)
+
+    return prepared_operators
+
+
+def get_catalog_source_name(catalog_prefix, image):
+    # CatalogSource is shared by all operators installed from the same image, name it after the image
+    return f"{catalog_prefix}-{hashlib.sha256(image.encode()).hexdigest()[:10]}"
+
+
+def group_operators_by_catalog_image(operators):
+    """
+    Group operators installed from IIB or source image by cluster and catalog image.
+
+    Args:
+        operators (list): list of operators dicts
+
+    Returns:
+        dict: (cluster name, catalog type, image) as key, list of operators dicts as value
+    """
+    catalog_operators = defaultdict(list)
     for operator in operators:
-        kubeconfig = operator["kubeconfig"]
-        operator["ocp-client"] = get_client(config_file=kubeconfig)
-        operator["cluster-name"] = get_cluster_name_from_kubeconfig(
-            kubeconfig=kubeconfig,
-            operator_name=operator["name"],
+        if iib_index_image := operator.get("iib_index_image"):
+            catalog_operators[(operator["cluster-name"], IIB_CATALOG_TYPE, iib_index_image)].append(operator)
+        elif source_image := operator["spec"].source_image:
+            catalog_operators[(operator["cluster-name"], SOURCE_IMAGE_CATALOG_TYPE, source_image)].append(operator)
+
+    return catalog_operators
+
+
+def create_cluster_catalog_sources(cluster_catalogs):
+    """
+    Create cluster CatalogSources one by one, IIB CatalogSources share the cluster ICSP and pull-secret.
+
+    Args:
+        cluster_catalogs (dict): (catalog type, image) as key, list of operators dicts as value
+    """
+    for (catalog_type, image), catalog_operators in cluster_catalogs.items():
+        operator = catalog_operators[0]
+        operators_names = [_operator["name"] for _operator in catalog_operators]
+        with trace_span(
+            name=CATALOG_SOURCE_SPAN,
+            category=OPERATOR_STR,
+            args={"image": image, "operators": operators_names, "cluster-name": operator["cluster-name"]},
+        ):
+            if catalog_type == IIB_CATALOG_TYPE:
+                catalog_source_name = get_catalog_source_name(catalog_prefix="iib-catalog", image=image)
+                LOGGER.info(f"Creating IIB CatalogSource {catalog_source_name} for operators {operators_names}")
+                create_catalog_source_for_iib_install(
+                    name=catalog_source_name,
+                    iib_index_image=image,
+                    brew_token=operator["spec"].brew_token,
+                    operator_market_namespace=OPERATOR_MARKET_NAMESPACE,
+                    admin_client=operator["ocp-client"],
+                )
+            else:
+                catalog_source_name = get_catalog_source_name(catalog_prefix="catalog", image=image)
+                LOGGER.info(f"Creating CatalogSource {catalog_source_name} for operators {operators_names}")
+                create_catalog_source_from_image(
+                    name=catalog_source_name,
+                    namespace=OPERATOR_MARKET_NAMESPACE,
+                    image=image,
+                    admin_client=operator["ocp-client"],
+                )
+
+        for _operator in catalog_operators:
+            _operator["catalog-source"] = catalog_source_name
+
+
+def create_operators_catalog_sources(operators, parallel):
+    """
+    Create each CatalogSource needed by operators installed from IIB or source image once per cluster,
+    before the operators are installed.
+
+    Operators installed from the same image share the CatalogSource and are installed from it by name.
+    Clusters are handled in parallel if `parallel`.
+
+    Args:
+        operators (list): list of operators dicts
+        parallel (bool): create CatalogSources of different clusters in parallel
+    """
+    clusters_catalogs = defaultdict(dict)
+    for (cluster_name, catalog_type, image), catalog_operators in group_operators_by_catalog_image(
+        operators=operators
+    ).items():
+        clusters_catalogs[cluster_name][(catalog_type, image)] = catalog_operators
+
+    if not clusters_catalogs:
+        return
+
+    LOGGER.info(f"Creating operators CatalogSources on clusters {list(clusters_catalogs)}; parallel: {parallel}")
+    with ThreadPoolExecutor(max_workers=len(clusters_catalogs) if parallel else 1) as executor:
+        futures = {
+            executor.submit(create_cluster_catalog_sources, cluster_catalogs=cluster_catalogs): cluster_name
+            for cluster_name, cluster_catalogs in clusters_catalogs.items()
+        }
+        for future in as_completed(futures):
+            if exception := future.exception():
+                LOGGER.error(f"Failed to create operators CatalogSources on cluster {futures[future]}: {exception}")
+                raise click.Abort()
+
+
+def create_operator_subscription(operator):
+    """
+    Create operator namespaces, OperatorGroup and Subscription, without waiting for the operator installation.
+
+    Same resources as `ocp_utilities.operators.install_operator` creates; used when operators are waited on as a
+    group, see `install_cluster_operators`.
+
+    Args:
+        operator (dict): operator dict
+
+    Returns:
+        str: operator namespace
+    """
+    operator_spec = operator["spec"]
+    admin_client = operator["ocp-client"]
+    name = operator_spec.name
+    operator_namespace = operator_spec.namespace or name
+    for namespace in operator_spec.target_namespaces or [operator_namespace]:
+        ns = Namespace(client=admin_client, name=namespace)
+        if not ns.exists:
+            ns.deploy(wait=True)
+
+    operator_group = OperatorGroup(
+        client=admin_client,
+        name="global-operators" if operator_namespace == "openshift-operators" else name,
+        namespace=operator_namespace,
+        target_namespaces=operator_spec.target_namespaces,
+    )
+    if not operator_group.exists:
+        operator_group.deploy(wait=True)
+
+    subscription = Subscription(
+        client=admin_client,
+        name=name,
+        namespace=operator_namespace,
+        channel=operator_spec.channel,
+        source=operator.get("catalog-source") or operator_spec.source,
+        source_namespace=OPERATOR_MARKET_NAMESPACE,
+        install_plan_approval="Automatic",
+    )
+    # Subscription already exists when the installation is retried
+    if not subscription.exists:
+        subscription.deploy(wait=True)
+
+    return operator_namespace
+
+
+def get_namespace_csvs_phases(admin_client, namespace):
+    """
+    Get operators CSVs phases in a namespace with a single list call.
+
+    OLM labels CSVs with `operators.coreos.com/<operator name>.<namespace>`; CSVs copied to target namespaces
+    are ignored.
+
+    Returns:
+        dict: operator name as key, CSV phase as value
+    """
+    operators_csvs_phases = {}
+    for csv in ClusterServiceVersion.get(client=admin_client, namespace=namespace, raw=True):
+        csv_dict = csv.to_dict()
+        labels = csv_dict["metadata"].get("labels") or {}
+        if "olm.copiedFrom" in labels:
+            continue
+
+        for label in labels:
+            if label.startswith(OLM_OPERATOR_LABEL_PREFIX) and label.endswith(f".{namespace}"):
+                operator_name = label[len(OLM_OPERATOR_LABEL_PREFIX) : -len(f".{namespace}")]
+                operators_csvs_phases[operator_name] = csv_dict.get("status", {}).get("phase")
+
+    return operators_csvs_phases
+
+
+def wait_for_operators_csvs(admin_client, operators_namespaces, timeouts, stall_timeouts=None):
+    """
+    Wait for a group of operators CSVs to reach `Succeeded` phase.
+
+    Each interval, CSVs of all pending operators are checked with a single list call per namespace; each operator
+    is resolved as soon as its CSV succeeds, fails, its phase did not change for its stall timeout or its timeout
+    expires.
+
+    Args:
+        admin_client (DynamicClient): cluster client
+        operators_namespaces (dict): operator name as key, operator namespace as value
+        timeouts (dict): operator name as key, timeout in seconds as value
+        stall_timeouts (dict, optional): operator name as key, no-progress window in seconds as value
+
+    Returns:
+        list: names of operators which failed or timed out
+    """
+    progress_trackers = {
+        name: ProgressTracker(
+            name=f"Operator {name} CSV",
+            timeout=timeouts[name],
+            stall_timeout=(stall_timeouts or {}).get(name),
         )
-        operator["timeout"] = tts(ts=operator.get("timeout", TIMEOUT_60MIN))
-        operator["must_gather_output_dir"] = user_kwargs_dict.get("must_gather_output_dir")
+        for name in operators_namespaces
+    }
+    pending_operators = dict(operators_namespaces)
+    failed_operators = []
+    while True:
+        for namespace in set(pending_operators.values()):
+            csvs_phases = get_namespace_csvs_phases(admin_client=admin_client, namespace=namespace)
+            for name in [_name for _name, _namespace in pending_operators.items() if _namespace == namespace]:
+                csv_phase = csvs_phases.get(name)
+                if csv_phase == CSV_SUCCEEDED_PHASE:
+                    LOGGER.info(f"Operator {name} CSV succeeded")
+                    pending_operators.pop(name)
+                    continue
+
+                try:
+                    progress_trackers[name].update(status={"csv-phase": csv_phase})
+                    if csv_phase == CSV_FAILED_PHASE:
+                        progress_trackers[name].fail(reason="failed")
+                except RuntimeError as exc:
+                    LOGGER.error(exc)
+                    pending_operators.pop(name)
+                    failed_operators.append(name)
+
+        if not pending_operators:
+            return failed_operators
+
+        time.sleep(OPERATORS_CSVS_POLL_INTERVAL_SECONDS)
+
+
+def install_cluster_operators(operators, must_gather_output_dir=None):
+    """
+    Install operators of a single cluster and wait for them as a group, see `wait_for_operators_csvs`.
 
-        if install:
-            operator["channel"] = operator.get("channel", "stable")
-            operator["source"] = operator.get("source", "redhat-operators")
-            operator["iib_index_image"] = get_operator_iib_from_iib_dict(
-                iib_dict=iib_dict, job_name=job_name, operator_dict=operator
+    Args:
+        operators (list): list of operators dicts of the same cluster
+        must_gather_output_dir (str, optional): must-gather base output directory, collected on failure
+    """
+    operators_namespaces = {}
+    for operator in operators:
+        LOGGER.info(f"Creating operator {operator['name']} subscription")
+        operators_namespaces[operator["name"]] = create_operator_subscription(operator=operator)
+
+    failed_operators = wait_for_operators_csvs(
+        admin_client=operators[0]["ocp-client"],
+        operators_namespaces=operators_namespaces,
+        timeouts={operator["name"]: operator["spec"].timeout for operator in operators},
+        stall_timeouts={operator["name"]: operator["spec"].stall_timeout for operator in operators},
+    )
+    if failed_operators:
+        if must_gather_output_dir:
+            collect_must_gather(
+                must_gather_output_dir=must_gather_output_dir,
+                kubeconfig_path=operators[0]["spec"].kubeconfig,
+                cluster_name=operators[0]["cluster-name"],
+                product_name="-".join(failed_operators),
             )
+        raise RuntimeError(f"Operators {failed_operators} installation failed")
 
-    return operators
+
+def get_operator_install_status(admin_client, subscription):
+    """
+    Get operator installation status: Subscription state, InstallPlan phase and CSV phase, with their conditions.
+
+    Args:
+        admin_client (DynamicClient): cluster client
+        subscription (Subscription): operator Subscription
+
+    Returns:
+        dict: operator installation status
+    """
+    subscription_status = subscription.instance.to_dict().get("status", {})
+    status = {
+        "subscription-state": subscription_status.get("state"),
+        "subscription-conditions": get_conditions_summary(conditions=subscription_status.get("conditions")),
+    }
+    if install_plan_ref := subscription_status.get("installplan"):
+        install_plan = InstallPlan(client=admin_client, name=install_plan_ref["name"], namespace=subscription.namespace)
+        install_plan_status = install_plan.instance.to_dict().get("status", {})
+        status["install-plan-phase"] = install_plan_status.get("phase")
+        status["install-plan-conditions"] = get_conditions_summary(conditions=install_plan_status.get("conditions"))
+
+    if csv_name := subscription_status.get("currentCSV"):
+        csv = ClusterServiceVersion(client=admin_client, namespace=subscription.namespace, name=csv_name)
+        if csv_instance := csv.exists:
+            csv_status = csv_instance.to_dict().get("status", {})
+            status["csv-phase"] = csv_status.get("phase")
+            status["csv-reason"] = csv_status.get("reason")
+            status["csv-message"] = csv_status.get("message")
+
+    return status
+
+
+def wait_for_operator_install_progress(admin_client, subscription, timeout, stall_timeout):
+    """
+    Wait for operator installation, fail early if its InstallPlan or CSV failed or its installation status
+    did not change for `stall_timeout` seconds.
+
+    Args:
+        admin_client (DynamicClient): cluster client
+        subscription (Subscription): operator Subscription
+        timeout (int): timeout in seconds to wait for the operator installation
+        stall_timeout (int): no-progress window in seconds
+    """
+    progress_tracker = ProgressTracker(
+        name=f"Operator {subscription.name} installation",
+        timeout=timeout,
+        stall_timeout=stall_timeout,
+    )
+    while True:
+        status = get_operator_install_status(admin_client=admin_client, subscription=subscription)
+        if status.get("csv-phase") == CSV_SUCCEEDED_PHASE:
+            LOGGER.info(f"Operator {subscription.name} CSV succeeded")
+            return
+
+        progress_tracker.update(status=status)
+        if status.get("install-plan-phase") == INSTALL_PLAN_FAILED_PHASE:
+            progress_tracker.fail(reason="InstallPlan failed")
+
+        if status.get("csv-phase") == CSV_FAILED_PHASE:
+            progress_tracker.fail(reason="CSV failed")
+
+        time.sleep(PRODUCT_WAIT_POLL_INTERVAL_SECONDS)
 
 
-def prepare_operators_action(operators, install):
+def install_operator_with_stall_detection(operator, stall_timeout):
+    """
+    Install operator (unless its Subscription was already created) and wait for it with stall detection,
+    see `wait_for_operator_install_progress`.
+
+    Args:
+        operator (dict): operator dict
+        stall_timeout (int): no-progress window in seconds
+    """
+    operator_spec = operator["spec"]
+    admin_client = operator["ocp-client"]
+    subscription = Subscription(
+        client=admin_client,
+        name=operator_spec.name,
+        namespace=create_operator_subscription(operator=operator),
+    )
+    try:
+        wait_for_operator_install_progress(
+            admin_client=admin_client,
+            subscription=subscription,
+            timeout=operator_spec.timeout,
+            stall_timeout=stall_timeout,
+        )
+    except RuntimeError as exc:
+        LOGGER.error(f"{operator_spec.name} Install Failed. \n{exc}")
+        if must_gather_output_dir := operator.get("must_gather_output_dir"):
+            collect_must_gather(
+                must_gather_output_dir=must_gather_output_dir,
+                kubeconfig_path=operator_spec.kubeconfig,
+                cluster_name=operator["cluster-name"],
+                product_name=operator_spec.name,
+            )
+        raise
+
+
+def resume_operator_install(admin_client, name, timeout, operator_namespace=None, **kwargs):
+    """
+    Retry operator installation in place: wait for the operator if its Subscription was already created,
+    else install it.
+
+    Args:
+        admin_client (DynamicClient): cluster client
+        name (str): operator name
+        timeout (int): timeout in seconds to wait for the operator installation
+        operator_namespace (str, optional): operator namespace, operator name is used if not provided
+        kwargs (dict): `ocp_utilities.operators.install_operator` kwargs
+    """
+    subscription = Subscription(client=admin_client, name=name, namespace=operator_namespace or name)
+    if not subscription.exists:
+        return install_operator(
+            admin_client=admin_client,
+            name=name,
+            timeout=timeout,
+            operator_namespace=operator_namespace,
+            **kwargs,
+        )
+
+    LOGGER.info(f"Operator {name} Subscription already exists, waiting for its installation")
+    try:
+        wait_for_operator_install(admin_client=admin_client, subscription=subscription, timeout=timeout)
+    except Exception:
+        if must_gather_output_dir := kwargs.get("must_gather_output_dir"):
+            collect_must_gather(
+                must_gather_output_dir=must_gather_output_dir,
+                kubeconfig_path=kwargs.get("kubeconfig"),
+                cluster_name=kwargs.get("cluster_name"),
+                product_name=name,
+            )
+        raise
+
+
+def get_resource_pending_deletion(resource):
+    return {
+        "resource": f"{resource.kind} {resource.name}",
+        "exists": lambda: resource.exists,
+        "namespace": resource.kind == Namespace.kind,
+    }
+
+
+def delete_operator(admin_client, name, operator_namespace=None, clean_up_namespace=True):
+    """
+    Delete operator resources without waiting for their deletion.
+
+    Same resources as `ocp_utilities.operators.uninstall_operator` deletes; deletion is verified by the caller,
+    see `cli_utils.wait_for_products_deletion`.
+
+    Args:
+        admin_client (DynamicClient): cluster client
+        name (str): operator name
+        operator_namespace (str, optional): operator namespace, operator name is used if not provided
+        clean_up_namespace (bool, optional): delete operator namespace
+
+    Returns:
+        list: resources pending deletion dicts
+    """
+    operator_namespace = operator_namespace or name
+    pending_deletions = []
+    csv = None
+    subscription = Subscription(client=admin_client, name=name, namespace=operator_namespace)
+    if subscription.exists:
+        if csv_name := subscription.instance.status.installedCSV:
+            csv = ClusterServiceVersion(client=admin_client, namespace=operator_namespace, name=csv_name)
+            pending_deletions.append(get_resource_pending_deletion(resource=csv))
+        subscription.clean_up(wait=False)
+        pending_deletions.append(get_resource_pending_deletion(resource=subscription))
+
+    OperatorGroup(client=admin_client, name=name, namespace=operator_namespace).clean_up(wait=False)
+
+    if clean_up_namespace and any(
+        _operator.name.startswith(name) for _operator in Operator.get(dyn_client=admin_client)
+    ):
+        namespace = Namespace(client=admin_client, name=operator_namespace)
+        if namespace.exists:
+            namespace.clean_up(wait=False)
+            pending_deletions.append(get_resource_pending_deletion(resource=namespace))
+
+    elif csv:
+        csv.clean_up(wait=False)
+
+    return pending_deletions
+
+
+def prepare_cluster_operators_group_action(operators):
+    operators_by_cluster = defaultdict(list)
+    for operator in operators:
+        operators_by_cluster[operator["cluster-name"]].append(operator)
+
     operators_action_list = []
-    operator_func = install_operator if install else uninstall_operator
+    for cluster_name, cluster_operators in operators_by_cluster.items():
+        names = [operator["name"] for operator in cluster_operators]
+        LOGGER.info(f"Preparing operators: {names}, func: {install_cluster_operators.__name__}")
+        operators_action_list.append({
+            "func": install_cluster_operators,
+            "kwargs": {
+                "operators": cluster_operators,
+                "must_gather_output_dir": cluster_operators[0].get("must_gather_output_dir"),
+            },
+            "product-type": OPERATOR_STR,
+            "name": ",".join(names),
+            "cluster-name": cluster_name,
+            "cluster-type": cluster_operators[0]["cluster-type"],
+            "timeout": max(operator["spec"].timeout for operator in cluster_operators),
+            "retries": max(operator["spec"].retries for operator in cluster_operators),
+            "retry-backoff": max(operator["spec"].retry_backoff for operator in cluster_operators),
+        })
+
+    return operators_action_list
+
+
+def prepare_operators_action(operators, install, group_wait=False, fast_uninstall=False):
+    if install and group_wait:
+        return prepare_cluster_operators_group_action(operators=operators)
+
+    operators_action_list = []
+    if install:
+        operator_func = install_operator
+    else:
+        operator_func = delete_operator if fast_uninstall else uninstall_operator
 
     for operator in operators:
         name = operator["name"]
+        operator_spec = operator["spec"]
+        operator_action = {
+            "product-type": OPERATOR_STR,
+            "name": name,
+            "cluster-name": operator["cluster-name"],
+            "cluster-type": operator["cluster-type"],
+            "timeout": operator_spec.timeout,
+            "retries": operator_spec.retries,
+            "retry-backoff": operator_spec.retry_backoff,
+        }
+        if install and operator_spec.stall_timeout:
+            LOGGER.info(f"Preparing operator: {name}, func: {install_operator_with_stall_detection.__name__}")
+            # Installation is idempotent, retries run the same function
+            operators_action_list.append({
+                **operator_action,
+                "func": install_operator_with_stall_detection,
+                "kwargs": {"operator": operator, "stall_timeout": operator_spec.stall_timeout},
+            })
+            continue
+
         LOGGER.info(f"Preparing operator: {name}, func: {operator_func.__name__}")
         action_kwargs = {
             "admin_client": operator["ocp-client"],
             "name": name,
-            "timeout": operator["timeout"],
-            "operator_namespace": operator.get("namespace"),
+            "operator_namespace": operator_spec.namespace,
         }
+        if operator_func is not delete_operator:
+            action_kwargs["timeout"] = operator_spec.timeout
+
+        if not install and not operator_spec.clean_up_namespace:
+            action_kwargs["clean_up_namespace"] = False
 
         if install:
-            brew_token = operator.get("brew-token")
-            if brew_token:
+            if brew_token := operator_spec.brew_token:
                 action_kwargs["brew_token"] = brew_token
-            action_kwargs["channel"] = operator["channel"]
-            action_kwargs["source"] = operator["source"]
-            action_kwargs["iib_index_image"] = operator.get("iib_index_image")
-            action_kwargs["source_image"] = operator.get("source-image")
-            action_kwargs["target_namespaces"] = operator.get("target-namespaces")
+            action_kwargs["channel"] = operator_spec.channel
+            if catalog_source := operator.get("catalog-source"):
+                # CatalogSource was already created, see `create_operators_catalog_sources`
+                action_kwargs["source"] = catalog_source
+            else:
+                action_kwargs["source"] = operator_spec.source
+                action_kwargs["iib_index_image"] = operator.get("iib_index_image")
+                action_kwargs["source_image"] = operator_spec.source_image
+            action_kwargs["target_namespaces"] = operator_spec.target_namespaces
             if must_gather_output_dir := operator.get("must_gather_output_dir"):
                 action_kwargs["must_gather_output_dir"] = must_gather_output_dir
-                action_kwargs["kubeconfig"] = operator["kubeconfig"]
+                action_kwargs["kubeconfig"] = operator_spec.kubeconfig
                 action_kwargs["cluster_name"] = operator["cluster-name"]
 
-        operators_action_list.append((operator_func, action_kwargs))
+        operator_action["func"] = operator_func
+        operator_action["kwargs"] = action_kwargs
+        if install:
+            operator_action["retry-func"] = resume_operator_install
+
+        operators_action_list.append(operator_action)
 
     return operators_action_list
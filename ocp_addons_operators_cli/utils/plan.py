@@ -0,0 +1,216 @@
+import json
+import threading
+import time
+
+import click
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.constants import ADDON_STR, OPERATOR_STR
+from ocp_addons_operators_cli.utils.general import write_file_atomically
+from ocp_addons_operators_cli.utils.kubeconfig_utils import get_kubeconfig_server
+from ocp_addons_operators_cli.utils.products_specs import is_name_pattern
+
+LOGGER = get_logger(name=__name__)
+
+PLAN_VERSION = 1
+
+
+class RunPlan:
+    """
+    Products resolved by an install run (clusters ids and API URLs, namespaces, channels, IIBs, durations), written
+    as JSON with `--plan-out` and reused by the matching uninstall with `--plan-in`, so the uninstall skips the
+    clusters lookups and removes exactly the planned products.
+
+    Plan files reference the addons clusters kubeconfig files and are readable only by the current user.
+    """
+
+    def __init__(self):
+        self.addons = []
+        self.operators = []
+        self._lock = threading.Lock()
+
+    def add_products(self, addons, operators):
+        """
+        Add prepared products to the plan.
+
+        Args:
+            addons (list): addons dicts, see `prepare_addons`
+            operators (list): operators dicts, see `prepare_operators`
+        """
+        addons_entries = [
+            {
+                "name": addon["name"],
+                "cluster-name": addon["cluster-name"],
+                "ocm-env": addon["spec"].ocm_env,
+                "rosa": addon["spec"].rosa,
+                "timeout": addon["spec"].timeout,
+                "cluster-id": addon["cluster-id"],
+                "api-url": addon["api-url"],
+                "ocp-version": addon["ocp-version"],
+                "kubeconfig": addon["kubeconfig"],
+                "addon-definition": addon["addon-definition"],
+            }
+            for addon in addons
+        ]
+        operators_entries = [
+            {
+                "name": operator["name"],
+                "cluster-name": operator["cluster-name"],
+                "kubeconfig": operator["spec"].user_kubeconfig,
+                "context": operator["spec"].context,
+                "timeout": operator["spec"].timeout,
+                "api-url": get_kubeconfig_server(kubeconfig=operator["spec"].kubeconfig),
+                "cluster-type": operator["cluster-type"],
+                "namespace": operator["spec"].namespace or operator["name"],
+                "target-namespaces": operator["spec"].target_namespaces,
+                "channel": operator["spec"].channel,
+                "source": operator.get("catalog-source") or operator["spec"].source,
+                "iib-index-image": operator.get("iib_index_image"),
+            }
+            for operator in operators
+        ]
+        with self._lock:
+            self.addons.extend(addons_entries)
+            self.operators.extend(operators_entries)
+
+    def render(self, products=None):
+        """
+        Render the plan, with each product outcome and duration from `products` results.
+
+        Args:
+            products (list, optional): products results dicts, see `RunReport.record`
+        """
+        products_results = {}
+        for product in products or []:
+            # Operators installed as a group (`--operators-group-wait`) share a single result
+            for name in product["name"].split(","):
+                products_results[(product["product-type"], product["cluster-name"], name)] = product
+
+        def _with_result(product_type, entry):
+            result = products_results.get((product_type, entry["cluster-name"], entry["name"]), {})
+            return {**entry, "outcome": result.get("outcome"), "duration-seconds": result.get("duration-seconds")}
+
+        with self._lock:
+            return json.dumps(
+                {
+                    "plan-version": PLAN_VERSION,
+                    "created-at": time.time(),
+                    "addons": [_with_result(product_type=ADDON_STR, entry=entry) for entry in self.addons],
+                    "operators": [_with_result(product_type=OPERATOR_STR, entry=entry) for entry in self.operators],
+                },
+                indent=2,
+            )
+
+
+def write_plan_file(plan_file, plan, products=None):
+    """
+    Write a run plan to a JSON file.
+
+    Args:
+        plan_file (str): plan file path
+        plan (RunPlan): run plan
+        products (list, optional): products results dicts, see `RunPlan.render`
+    """
+    LOGGER.info(f"Writing run plan to {plan_file}")
+    write_file_atomically(file_path=plan_file, content=plan.render(products=products))
+
+
+def read_plan_file(plan_file):
+    """
+    Read a run plan JSON file written by `write_plan_file`.
+
+    Returns:
+        dict: plan, with `addons` and `operators` entries
+    """
+    try:
+        with open(plan_file) as fd:
+            plan = json.load(fd)
+    except (OSError, ValueError) as exc:
+        LOGGER.error(f"Failed to read plan file {plan_file}: {exc}")
+        raise click.Abort()
+
+    if plan.get("plan-version") != PLAN_VERSION:
+        LOGGER.error(f"Plan file {plan_file} version {plan.get('plan-version')} is not supported: {PLAN_VERSION}")
+        raise click.Abort()
+
+    LOGGER.info(
+        f"Using plan {plan_file}: {len(plan['addons'])} addons, {len(plan['operators'])} operators, "
+        f"created at {time.ctime(plan['created-at'])}"
+    )
+    return plan
+
+
+def get_plan_products(plan, addons, operators):
+    """
+    Get the products of a plan as products user input; products user input, if any, must be in the plan.
+
+    Planned products get their user input options (e.g. `timeout`, `retries`) and their planned resolved `context`
+    and `namespace`; names patterns in user input are ignored, the plan holds the exact products.
+
+    Args:
+        plan (dict): plan, see `read_plan_file`
+        addons (list): addons user input dicts
+        operators (list): operators user input dicts
+
+    Returns:
+        tuple: addons user input dicts, operators user input dicts
+    """
+    user_addons = {
+        (addon.get("cluster-name"), addon.get("name")): addon
+        for addon in addons
+        if not is_name_pattern(name=addon.get("name"))
+    }
+    user_operators = {
+        (operator.get("kubeconfig"), operator.get("name")): operator
+        for operator in operators
+        if not is_name_pattern(name=operator.get("name"))
+    }
+    planned_addons_keys = {(entry["cluster-name"], entry["name"]) for entry in plan["addons"]}
+    planned_operators_keys = {(entry["kubeconfig"], entry["name"]) for entry in plan["operators"]}
+    if not_planned := [
+        *(f"addon {name} on cluster {cluster_name}" for cluster_name, name in user_addons.keys() - planned_addons_keys),
+        *(f"operator {name} ({kubeconfig})" for kubeconfig, name in user_operators.keys() - planned_operators_keys),
+    ]:
+        LOGGER.error(f"Products are not in the plan: {sorted(not_planned)}")
+        raise click.Abort()
+
+    plan_addons = [
+        {
+            "ocm-env": entry["ocm-env"],
+            "rosa": entry["rosa"],
+            "timeout": entry["timeout"],
+            **user_addons.get((entry["cluster-name"], entry["name"]), {}),
+            "name": entry["name"],
+            "cluster-name": entry["cluster-name"],
+        }
+        for entry in plan["addons"]
+    ]
+    plan_operators = []
+    for entry in plan["operators"]:
+        operator = {
+            "timeout": entry["timeout"],
+            **user_operators.get((entry["kubeconfig"], entry["name"]), {}),
+            "name": entry["name"],
+            "kubeconfig": entry["kubeconfig"],
+            "namespace": entry["namespace"],
+        }
+        operator.pop("context", None)
+        if entry["context"]:
+            operator["context"] = entry["context"]
+
+        plan_operators.append(operator)
+
+    return plan_addons, plan_operators
+
+
+def get_planned_products(plan):
+    """
+    Get plan entries by product, to reuse their resolved data when preparing products.
+
+    Returns:
+        tuple: addons entries and operators entries dicts, by (cluster name, product name)
+    """
+    return (
+        {(entry["cluster-name"], entry["name"]): entry for entry in plan["addons"]},
+        {(entry["cluster-name"], entry["name"]): entry for entry in plan["operators"]},
+    )
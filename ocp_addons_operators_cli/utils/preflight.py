@@ -0,0 +1,228 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import urllib3
+from kubernetes import client as kubernetes_client
+from kubernetes import config as kubernetes_config
+from kubernetes.client.exceptions import ApiException
+from kubernetes.config.config_exception import ConfigException
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.constants import ADDON_STR, INSTALL_STR, OPERATOR_STR, UNINSTALL_STR
+from ocp_addons_operators_cli.utils.operators_utils import get_cluster_name_from_kubeconfig
+from ocp_addons_operators_cli.utils.report import record_product_report
+
+LOGGER = get_logger(name=__name__)
+
+FAIL_CLUSTER_PREFLIGHT = "fail"
+EXCLUDE_CLUSTER_PREFLIGHT = "exclude"
+CLUSTER_PREFLIGHT_MODES = (FAIL_CLUSTER_PREFLIGHT, EXCLUDE_CLUSTER_PREFLIGHT)
+OLM_CLUSTER_OPERATOR_NAME = "operator-lifecycle-manager"
+UNAUTHORIZED_STATUSES = (401, 403)
+CONNECTION_ERRORS = (ConfigException, OSError, urllib3.exceptions.HTTPError)
+
+
+def get_preflight_api_client(kubeconfig):
+    """
+    Get a cluster API client without retries, so an unreachable API server fails on the first request timeout.
+    """
+    configuration = kubernetes_client.Configuration()
+    kubernetes_config.load_kube_config(
+        config_file=kubeconfig,
+        client_configuration=configuration,
+        persist_config=False,
+    )
+    configuration.retries = False
+    return kubernetes_client.ApiClient(configuration=configuration)
+
+
+def get_not_ready_nodes(nodes):
+    return [
+        node.metadata.name
+        for node in nodes.items
+        if not any(
+            condition.type == "Ready" and condition.status == "True" for condition in node.status.conditions or []
+        )
+    ]
+
+
+def get_olm_errors(cluster_operator):
+    conditions = {
+        condition["type"]: condition for condition in cluster_operator.get("status", {}).get("conditions", [])
+    }
+    errors = []
+    if conditions.get("Available", {}).get("status") != "True":
+        errors.append(f"OLM is not available: {conditions.get('Available', {}).get('message')}")
+
+    if conditions.get("Degraded", {}).get("status") == "True":
+        errors.append(f"OLM is degraded: {conditions['Degraded'].get('message')}")
+
+    return errors
+
+
+def get_cluster_health_errors(kubeconfig, request_timeout):
+    """
+    Check a cluster health: API server reachability, authentication, nodes readiness and OLM health.
+
+    Every request fails after `request_timeout` seconds; the checks stop at the first failing stage.
+
+    Args:
+        kubeconfig (str): cluster kubeconfig file path
+        request_timeout (int): time in seconds to wait for each API request
+
+    Returns:
+        list: health errors, empty if the cluster is healthy
+    """
+    try:
+        api_client = get_preflight_api_client(kubeconfig=kubeconfig)
+    except CONNECTION_ERRORS as exc:
+        return [f"Failed to load kubeconfig {kubeconfig}: {exc}"]
+
+    with api_client:
+        try:
+            kubernetes_client.VersionApi(api_client=api_client).get_code(_request_timeout=request_timeout)
+        except (ApiException, *CONNECTION_ERRORS) as exc:
+            return [f"API server is not reachable: {exc}"]
+
+        try:
+            nodes = kubernetes_client.CoreV1Api(api_client=api_client).list_node(_request_timeout=request_timeout)
+            cluster_operator = kubernetes_client.CustomObjectsApi(api_client=api_client).get_cluster_custom_object(
+                group="config.openshift.io",
+                version="v1",
+                plural="clusteroperators",
+                name=OLM_CLUSTER_OPERATOR_NAME,
+                _request_timeout=request_timeout,
+            )
+        except ApiException as exc:
+            if exc.status in UNAUTHORIZED_STATUSES:
+                return [f"Authentication failed: {exc.status} {exc.reason}"]
+
+            return [f"API request failed: {exc.status} {exc.reason}"]
+        except CONNECTION_ERRORS as exc:
+            return [f"API server is not reachable: {exc}"]
+
+    errors = []
+    if not_ready_nodes := get_not_ready_nodes(nodes=nodes):
+        errors.append(f"Nodes are not ready: {not_ready_nodes}")
+
+    errors.extend(get_olm_errors(cluster_operator=cluster_operator))
+    return errors
+
+
+def get_unhealthy_clusters(clusters_kubeconfigs, request_timeout):
+    """
+    Check clusters health concurrently, see `get_cluster_health_errors`.
+
+    Args:
+        clusters_kubeconfigs (dict): cluster name as key, kubeconfig file path as value
+        request_timeout (int): time in seconds to wait for each API request
+
+    Returns:
+        dict: unhealthy clusters, cluster name as key, health errors as value
+    """
+    LOGGER.info(f"Checking clusters health: {sorted(clusters_kubeconfigs)}")
+    with ThreadPoolExecutor() as executor:
+        clusters_errors = dict(
+            zip(
+                clusters_kubeconfigs,
+                executor.map(
+                    lambda kubeconfig: get_cluster_health_errors(
+                        kubeconfig=kubeconfig,
+                        request_timeout=request_timeout,
+                    ),
+                    clusters_kubeconfigs.values(),
+                ),
+            )
+        )
+
+    return {cluster_name: errors for cluster_name, errors in clusters_errors.items() if errors}
+
+
+def run_clusters_preflight(addons, operators_specs, mode, request_timeout, install, report=None):
+    """
+    Check the health of all products clusters, before the operators clients are built.
+
+    Products on unhealthy clusters fail the run, or with `exclude` mode, are excluded from the run and recorded as
+    failed in the run report.
+
+    Args:
+        addons (list): addons dicts, see `prepare_addons`
+        operators_specs (list): list of OperatorSpec
+        mode (str): `fail` or `exclude`
+        request_timeout (int): time in seconds to wait for each API request
+        install (bool): True if products are installed
+        report (RunReport, optional): report to record excluded products in, in addition to the run report
+
+    Returns:
+        tuple: addons dicts, list of OperatorSpec on healthy clusters
+    """
+    operators_specs_clusters = [
+        (
+            operator_spec,
+            get_cluster_name_from_kubeconfig(kubeconfig=operator_spec.kubeconfig, operator_name=operator_spec.name),
+        )
+        for operator_spec in operators_specs
+    ]
+    clusters_kubeconfigs = {addon["cluster-name"]: addon["kubeconfig"] for addon in addons}
+    clusters_kubeconfigs.update({
+        cluster_name: operator_spec.kubeconfig for operator_spec, cluster_name in operators_specs_clusters
+    })
+
+    unhealthy_clusters = get_unhealthy_clusters(
+        clusters_kubeconfigs=clusters_kubeconfigs,
+        request_timeout=request_timeout,
+    )
+    if not unhealthy_clusters:
+        LOGGER.info("All clusters are healthy")
+        return addons, operators_specs
+
+    for cluster_name, errors in unhealthy_clusters.items():
+        LOGGER.error(f"Cluster {cluster_name} is not healthy: {errors}")
+
+    if mode == FAIL_CLUSTER_PREFLIGHT:
+        raise click.Abort()
+
+    action = INSTALL_STR if install else UNINSTALL_STR
+    healthy_addons = []
+    for addon in addons:
+        if addon["cluster-name"] in unhealthy_clusters:
+            record_excluded_product(
+                product_type=ADDON_STR,
+                name=addon["name"],
+                cluster_name=addon["cluster-name"],
+                action=action,
+                report=report,
+            )
+        else:
+            healthy_addons.append(addon)
+
+    healthy_operators_specs = []
+    for operator_spec, cluster_name in operators_specs_clusters:
+        if cluster_name in unhealthy_clusters:
+            record_excluded_product(
+                product_type=OPERATOR_STR,
+                name=operator_spec.name,
+                cluster_name=cluster_name,
+                action=action,
+                report=report,
+            )
+        else:
+            healthy_operators_specs.append(operator_spec)
+
+    if not (healthy_addons or healthy_operators_specs):
+        LOGGER.error("All products clusters are unhealthy")
+        raise click.Abort()
+
+    LOGGER.warning(f"Excluding products on unhealthy clusters {sorted(unhealthy_clusters)}")
+    return healthy_addons, healthy_operators_specs
+
+
+def record_excluded_product(product_type, name, cluster_name, action, report=None):
+    record_product_report(
+        product_action={"product-type": product_type, "name": name, "cluster-name": cluster_name},
+        action=action,
+        success=False,
+        duration=0,
+        error="Excluded, cluster is not healthy",
+        report=report,
+    )
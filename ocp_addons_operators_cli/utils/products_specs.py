@@ -0,0 +1,494 @@
+import os
+
+import click
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.constants import PRODUCTION_STR, STAGE_STR, TIMEOUT_30MIN, TIMEOUT_60MIN
+from ocp_addons_operators_cli.utils.general import tts
+from ocp_addons_operators_cli.utils.kubeconfig_utils import get_kubeconfig_contexts, write_context_kubeconfig
+
+LOGGER = get_logger(name=__name__)
+
+SUPPORTED_OCM_ENVS = (STAGE_STR, PRODUCTION_STR)
+MANAGED_ODH_ADDON_NAME = "managed-odh"
+# Addon user input keys which are not addon parameters
+ADDON_SPEC_KEYS = ("name", "cluster-name", "ocm-env", "timeout", "rosa", "retries", "retry-backoff", "stall-timeout")
+DEFAULT_RETRY_BACKOFF = "30s"
+GLOB_PATTERN_CHARS = ("*", "?", "[")
+
+
+class AddonSpec:
+    """
+    Addon user input, validated; runtime data (clients, cluster data) is kept in the prepared addon dict.
+    """
+
+    __slots__ = (
+        "name",
+        "cluster_name",
+        "ocm_env",
+        "timeout",
+        "rosa",
+        "brew_token",
+        "parameters",
+        "retries",
+        "retry_backoff",
+        "stall_timeout",
+    )
+
+    def __init__(
+        self,
+        name,
+        cluster_name,
+        ocm_env,
+        timeout,
+        rosa,
+        brew_token,
+        parameters,
+        retries=0,
+        retry_backoff=30,
+        stall_timeout=None,
+    ):
+        self.name = name
+        self.cluster_name = cluster_name
+        self.ocm_env = ocm_env
+        self.timeout = timeout
+        self.rosa = rosa
+        self.brew_token = brew_token
+        self.parameters = parameters
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.stall_timeout = stall_timeout
+
+    def __repr__(self):
+        return f"AddonSpec(name={self.name}, cluster_name={self.cluster_name}, ocm_env={self.ocm_env})"
+
+
+class OperatorSpec:
+    """
+    Operator user input, validated; runtime data (clients, IIB) is kept in the prepared operator dict.
+    """
+
+    __slots__ = (
+        "name",
+        "kubeconfig",
+        "user_kubeconfig",
+        "context",
+        "namespace",
+        "channel",
+        "source",
+        "iib",
+        "source_image",
+        "target_namespaces",
+        "timeout",
+        "brew_token",
+        "retries",
+        "retry_backoff",
+        "stall_timeout",
+        "label_selector",
+        "clean_up_namespace",
+        "uninstall_after",
+    )
+
+    def __init__(
+        self,
+        name,
+        kubeconfig,
+        timeout,
+        namespace=None,
+        channel="stable",
+        source="redhat-operators",
+        iib=None,
+        source_image=None,
+        target_namespaces=None,
+        brew_token=None,
+        retries=0,
+        retry_backoff=30,
+        stall_timeout=None,
+        context=None,
+        label_selector=None,
+        clean_up_namespace=True,
+        uninstall_after=(),
+        user_kubeconfig=None,
+    ):
+        self.name = name
+        self.kubeconfig = kubeconfig
+        # Kubeconfig file from user input; with `context`, `kubeconfig` holds only the context
+        self.user_kubeconfig = user_kubeconfig or kubeconfig
+        self.context = context
+        self.timeout = timeout
+        self.namespace = namespace
+        self.channel = channel
+        self.source = source
+        self.iib = iib
+        self.source_image = source_image
+        self.target_namespaces = target_namespaces
+        self.brew_token = brew_token
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.stall_timeout = stall_timeout
+        self.label_selector = label_selector
+        self.clean_up_namespace = clean_up_namespace
+        # Names of operators on the same cluster which must be uninstalled before this one (OLM dependents)
+        self.uninstall_after = uninstall_after
+
+    def __repr__(self):
+        return f"OperatorSpec(name={self.name}, kubeconfig={self.kubeconfig}, context={self.context})"
+
+
+def is_name_pattern(name):
+    """
+    Check if a product name is a glob pattern, e.g. `*`, selecting the installed products to uninstall.
+    """
+    return isinstance(name, str) and any(char in name for char in GLOB_PATTERN_CHARS)
+
+
+def path_exists(path, paths_exist):
+    """
+    Check if a path exists, once per validation pass; many products usually share the same kubeconfig file.
+
+    Args:
+        path (str): file path
+        paths_exist (dict): paths checks results of the current validation pass, by path
+    """
+    if path not in paths_exist:
+        paths_exist[path] = os.path.exists(path)
+
+    return paths_exist[path]
+
+
+def get_timeout_seconds(product_dict, default_timeout, errors, product_str):
+    timeout = product_dict.get("timeout", default_timeout)
+    try:
+        timeout_seconds = tts(ts=timeout)
+    except ValueError:
+        timeout_seconds = None
+
+    if not timeout_seconds or timeout_seconds < 0:
+        errors.append(f"{product_str}: invalid `timeout` {timeout}; format examples: `1h`, `30m`, `3600s`")
+
+    return timeout_seconds
+
+
+def get_retry_policy(product_dict, default_retries, default_retry_backoff, errors, product_str):
+    """
+    Get product retry policy; product `retries` and `retry-backoff` override the global settings.
+
+    Returns:
+        tuple: number of retries, initial retry backoff in seconds
+    """
+    retries = product_dict.get("retries", default_retries)
+    try:
+        retries = int(retries)
+    except (TypeError, ValueError):
+        retries = -1
+
+    if retries < 0:
+        errors.append(f"{product_str}: invalid `retries` {product_dict.get('retries', default_retries)}")
+
+    retry_backoff = product_dict.get("retry-backoff", default_retry_backoff)
+    try:
+        retry_backoff_seconds = tts(ts=retry_backoff)
+    except ValueError:
+        retry_backoff_seconds = None
+
+    if retry_backoff_seconds is None or retry_backoff_seconds < 0:
+        errors.append(f"{product_str}: invalid `retry-backoff` {retry_backoff}; format examples: `30s`, `1m`")
+
+    return retries, retry_backoff_seconds
+
+
+def get_stall_timeout(product_dict, default_stall_timeout, errors, product_str):
+    """
+    Get product no-progress window; product `stall-timeout` overrides the global setting.
+
+    Returns:
+        int or None: stall timeout in seconds, None if stall detection is disabled
+    """
+    stall_timeout = product_dict.get("stall-timeout", default_stall_timeout)
+    if not stall_timeout:
+        return None
+
+    try:
+        stall_timeout_seconds = tts(ts=stall_timeout)
+    except ValueError:
+        stall_timeout_seconds = None
+
+    if not stall_timeout_seconds or stall_timeout_seconds < 0:
+        errors.append(f"{product_str}: invalid `stall-timeout` {stall_timeout}; format examples: `10m`, `600s`")
+
+    return stall_timeout_seconds
+
+
+def get_addon_spec(
+    addon_dict,
+    brew_token,
+    errors,
+    retries=0,
+    retry_backoff=DEFAULT_RETRY_BACKOFF,
+    stall_timeout=None,
+):
+    """
+    Build addon spec from addon user input, add validation errors to `errors`.
+
+    Args:
+        addon_dict (dict): addon user input
+        brew_token (str): brew token
+        errors (list): validation errors
+        retries (int): global number of retries of transient errors
+        retry_backoff (str): global initial retry backoff
+        stall_timeout (str): global no-progress window
+
+    Returns:
+        AddonSpec: addon spec
+    """
+    name = addon_dict.get("name")
+    addon_str = f"Addon {name}"
+    if not name:
+        errors.append(f"Addon {addon_dict} is missing `name`")
+
+    cluster_name = addon_dict.get("cluster-name")
+    if not cluster_name:
+        errors.append(f"{addon_str}: `cluster-name` is missing. Either add to addon config or pass `--cluster-name`")
+
+    ocm_env = addon_dict.get("ocm-env", STAGE_STR)
+    if ocm_env not in SUPPORTED_OCM_ENVS:
+        errors.append(f"{addon_str}: wrong OCM environment {ocm_env}. Supported envs: {list(SUPPORTED_OCM_ENVS)}")
+
+    if name == MANAGED_ODH_ADDON_NAME and ocm_env == STAGE_STR and not brew_token:
+        errors.append(
+            f"{addon_str}: {MANAGED_ODH_ADDON_NAME} addon on {STAGE_STR} requires brew token. Pass `--brew-token`"
+        )
+
+    addon_retries, addon_retry_backoff = get_retry_policy(
+        product_dict=addon_dict,
+        default_retries=retries,
+        default_retry_backoff=retry_backoff,
+        errors=errors,
+        product_str=addon_str,
+    )
+
+    return AddonSpec(
+        name=name,
+        cluster_name=cluster_name,
+        ocm_env=ocm_env,
+        timeout=get_timeout_seconds(
+            product_dict=addon_dict,
+            default_timeout=TIMEOUT_30MIN,
+            errors=errors,
+            product_str=addon_str,
+        ),
+        rosa=bool(addon_dict.get("rosa")),
+        brew_token=brew_token,
+        parameters=[{"id": key, "value": value} for key, value in addon_dict.items() if key not in ADDON_SPEC_KEYS],
+        retries=addon_retries,
+        retry_backoff=addon_retry_backoff,
+        stall_timeout=get_stall_timeout(
+            product_dict=addon_dict,
+            default_stall_timeout=stall_timeout,
+            errors=errors,
+            product_str=addon_str,
+        ),
+    )
+
+
+def get_operator_specs(
+    operator_dict,
+    brew_token,
+    errors,
+    retries=0,
+    retry_backoff=DEFAULT_RETRY_BACKOFF,
+    stall_timeout=None,
+    paths_exist=None,
+    kubeconfigs=None,
+    context_kubeconfigs=None,
+):
+    """
+    Build operator specs from operator user input, add validation errors to `errors`.
+
+    An operator with `context` (a kubeconfig context name, glob pattern or list of them) gets one spec per matching
+    kubeconfig context, each with a kubeconfig file holding only its context.
+
+    Args:
+        operator_dict (dict): operator user input
+        brew_token (str): brew token
+        errors (list): validation errors
+        retries (int): global number of retries of transient errors
+        retry_backoff (str): global initial retry backoff
+        stall_timeout (str): global no-progress window
+        paths_exist (dict, optional): paths checks results of the current validation pass, see `path_exists`
+        kubeconfigs (dict, optional): kubeconfigs loaded by the current validation pass, see `load_kubeconfig`
+        context_kubeconfigs (dict, optional): context kubeconfig files, see `write_context_kubeconfig`
+
+    Returns:
+        list: list of OperatorSpec
+    """
+    name = operator_dict.get("name")
+    operator_str = f"Operator {name}"
+    if not name:
+        errors.append(f"Operator {operator_dict} is missing `name`")
+
+    kubeconfig = operator_dict.get("kubeconfig")
+    if not kubeconfig:
+        errors.append(f"{operator_str}: `kubeconfig` is missing. Either add to operator config or pass `--kubeconfig`")
+    elif not path_exists(path=kubeconfig, paths_exist={} if paths_exist is None else paths_exist):
+        errors.append(f"{operator_str}: kubeconfig file {kubeconfig} does not exist")
+        kubeconfig = None
+
+    contexts = get_operator_contexts(
+        operator_dict=operator_dict,
+        kubeconfig=kubeconfig,
+        errors=errors,
+        operator_str=operator_str,
+        kubeconfigs=kubeconfigs,
+    )
+    if context_kubeconfigs is None:
+        context_kubeconfigs = {}
+
+    iib = operator_dict.get("iib")
+    if iib and not brew_token:
+        errors.append(f"{operator_str}: `--brew-token` must be provided for operator installation using IIB")
+
+    operator_retries, operator_retry_backoff = get_retry_policy(
+        product_dict=operator_dict,
+        default_retries=retries,
+        default_retry_backoff=retry_backoff,
+        errors=errors,
+        product_str=operator_str,
+    )
+
+    timeout = get_timeout_seconds(
+        product_dict=operator_dict,
+        default_timeout=TIMEOUT_60MIN,
+        errors=errors,
+        product_str=operator_str,
+    )
+    operator_stall_timeout = get_stall_timeout(
+        product_dict=operator_dict,
+        default_stall_timeout=stall_timeout,
+        errors=errors,
+        product_str=operator_str,
+    )
+    return [
+        OperatorSpec(
+            name=name,
+            kubeconfig=(
+                write_context_kubeconfig(
+                    kubeconfig=kubeconfig,
+                    context=context,
+                    context_kubeconfigs=context_kubeconfigs,
+                    kubeconfigs=kubeconfigs,
+                )
+                if context
+                else kubeconfig
+            ),
+            user_kubeconfig=kubeconfig,
+            context=context,
+            timeout=timeout,
+            namespace=operator_dict.get("namespace"),
+            channel=operator_dict.get("channel", "stable"),
+            source=operator_dict.get("source", "redhat-operators"),
+            iib=iib,
+            source_image=operator_dict.get("source-image"),
+            target_namespaces=operator_dict.get("target-namespaces"),
+            brew_token=brew_token,
+            retries=operator_retries,
+            retry_backoff=operator_retry_backoff,
+            stall_timeout=operator_stall_timeout,
+            label_selector=operator_dict.get("label-selector"),
+        )
+        for context in contexts
+    ]
+
+
+def get_operator_contexts(operator_dict, kubeconfig, errors, operator_str, kubeconfigs=None):
+    """
+    Get the kubeconfig contexts selected by the operator `context`, add validation errors to `errors`.
+
+    Returns:
+        list: contexts names, `[None]` if the operator has no `context` (kubeconfig current context)
+    """
+    contexts_patterns = operator_dict.get("context")
+    if not contexts_patterns:
+        return [None]
+
+    if not kubeconfig:
+        return []
+
+    if isinstance(contexts_patterns, str):
+        contexts_patterns = [contexts_patterns]
+
+    contexts = get_kubeconfig_contexts(
+        kubeconfig=kubeconfig,
+        contexts_patterns=contexts_patterns,
+        kubeconfigs=kubeconfigs,
+    )
+    if not contexts:
+        errors.append(f"{operator_str}: no context in kubeconfig {kubeconfig} matches `context` {contexts_patterns}")
+
+    return contexts
+
+
+def get_products_specs(
+    addons,
+    operators,
+    brew_token,
+    retries=0,
+    retry_backoff=DEFAULT_RETRY_BACKOFF,
+    stall_timeout=None,
+    context_kubeconfigs=None,
+):
+    """
+    Validate products user input in a single pass and build products specs.
+
+    All validation errors are reported at once before aborting.
+
+    Args:
+        addons (list): addons user input dicts
+        operators (list): operators user input dicts
+        brew_token (str): brew token
+        retries (int): global number of retries of transient errors, products `retries` override it
+        retry_backoff (str): global initial retry backoff, products `retry-backoff` override it
+        stall_timeout (str): global no-progress window, products `stall-timeout` override it
+        context_kubeconfigs (dict, optional): operators context kubeconfig files, written once per kubeconfig and
+            context and removed by the caller, see `write_context_kubeconfig`
+
+    Returns:
+        tuple: list of AddonSpec, list of OperatorSpec
+    """
+    LOGGER.info("Verify products data from user input.")
+    errors = []
+    paths_exist = {}
+    kubeconfigs = {}
+    addons_specs = [
+        get_addon_spec(
+            addon_dict=addon,
+            brew_token=brew_token,
+            errors=errors,
+            retries=retries,
+            retry_backoff=retry_backoff,
+            stall_timeout=stall_timeout,
+        )
+        for addon in addons
+    ]
+    operators_specs = [
+        operator_spec
+        for operator in operators
+        for operator_spec in get_operator_specs(
+            operator_dict=operator,
+            brew_token=brew_token,
+            errors=errors,
+            retries=retries,
+            retry_backoff=retry_backoff,
+            stall_timeout=stall_timeout,
+            paths_exist=paths_exist,
+            kubeconfigs=kubeconfigs,
+            context_kubeconfigs=context_kubeconfigs,
+        )
+    ]
+
+    if errors:
+        errors_str = "\n".join(errors)
+        LOGGER.error(f"Invalid products user input:\n{errors_str}")
+        raise click.Abort()
+
+    return addons_specs, operators_specs
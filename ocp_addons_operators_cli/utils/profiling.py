@@ -0,0 +1,154 @@
+import contextlib
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+
+from simple_logger.logger import get_logger
+
+LOGGER = get_logger(name=__name__)
+
+MAIN_PROFILE_NAME = "main"
+MERGED_PROFILE_NAME = "merged"
+PSTATS_SUFFIX = ".pstats"
+COLLAPSED_STACKS_SUFFIX = ".folded"
+# Sampling interval for collapsed stacks; products phases take seconds to minutes
+STACK_SAMPLING_INTERVAL_SECONDS = 0.01
+
+
+def get_profile_file_name(name):
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+class StackSampler(threading.Thread):
+    """
+    Sample the stacks of all threads and count them in collapsed stacks format (`frame;frame;frame count`),
+    usable by flamegraph tools (flamegraph.pl, speedscope, inferno).
+    """
+
+    def __init__(self, interval=STACK_SAMPLING_INTERVAL_SECONDS):
+        super().__init__(name="profile-stack-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = defaultdict(Counter)
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _collapse_stack(frame):
+        stack = []
+        while frame:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+
+        return ";".join(reversed(stack))
+
+    def run(self):
+        while not self._stop_event.wait(timeout=self.interval):
+            threads_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+
+                self.stacks[threads_names.get(thread_id, str(thread_id))][self._collapse_stack(frame=frame)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RunProfiler:
+    """
+    Profile the main thread and products worker threads with cProfile, sample all threads stacks.
+
+    Per-thread and merged outputs are written to the profile directory:
+        - `<name>.pstats`: cProfile stats, readable with `python -m pstats` or snakeviz
+        - `<thread>.folded`: collapsed stacks, for flamegraphs
+    """
+
+    def __init__(self):
+        self.profile_dir = None
+        self._main_profile = None
+        self._stack_sampler = None
+        self._pstats_files = []
+
+    @property
+    def enabled(self):
+        return self.profile_dir is not None
+
+    def start(self, profile_dir):
+        LOGGER.info(f"Profiling run, output directory: {profile_dir}")
+        self.profile_dir = profile_dir
+        self._pstats_files = []
+        os.makedirs(profile_dir, exist_ok=True)
+        self._stack_sampler = StackSampler()
+        self._stack_sampler.start()
+        self._main_profile = cProfile.Profile()
+        self._main_profile.enable()
+
+    def _dump_profile(self, profile, name):
+        pstats_file = os.path.join(self.profile_dir, f"{get_profile_file_name(name=name)}{PSTATS_SUFFIX}")
+        profile.dump_stats(pstats_file)
+        self._pstats_files.append(pstats_file)
+
+    @contextlib.contextmanager
+    def profile_thread(self, name):
+        """
+        Profile a worker thread, no-op if profiling is disabled or when called from the main thread
+        (already profiled by the run profile).
+
+        Args:
+            name (str): profile name, the thread name is added to it
+        """
+        if not self.enabled or threading.current_thread() is threading.main_thread():
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as exc:
+            # Python >= 3.12 allows a single active cProfile profiler; worker calls are included in the main profile
+            LOGGER.warning(f"Failed to profile thread {name}: {exc}")
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._dump_profile(profile=profile, name=f"{threading.current_thread().name}-{name}")
+
+    def _write_collapsed_stacks(self, name, stacks):
+        file_path = os.path.join(self.profile_dir, f"{get_profile_file_name(name=name)}{COLLAPSED_STACKS_SUFFIX}")
+        with open(file_path, "w") as fd:
+            fd.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def stop(self):
+        """
+        Stop profiling and write per-thread and merged profiles.
+        """
+        if not self.enabled:
+            return
+
+        self._main_profile.disable()
+        self._dump_profile(profile=self._main_profile, name=MAIN_PROFILE_NAME)
+        self._stack_sampler.stop()
+
+        merged_stacks = Counter()
+        for thread_name, stacks in self._stack_sampler.stacks.items():
+            self._write_collapsed_stacks(name=thread_name, stacks=stacks)
+            merged_stacks.update(stacks)
+        self._write_collapsed_stacks(name=MERGED_PROFILE_NAME, stacks=merged_stacks)
+
+        pstats.Stats(*self._pstats_files).dump_stats(
+            os.path.join(self.profile_dir, f"{MERGED_PROFILE_NAME}{PSTATS_SUFFIX}")
+        )
+
+        LOGGER.info(f"Profile written to {self.profile_dir}")
+        self.profile_dir = None
+
+
+RUN_PROFILER = RunProfiler()
@@ -0,0 +1,71 @@
+import time
+
+from simple_logger.logger import get_logger
+
+LOGGER = get_logger(name=__name__)
+
+PRODUCT_WAIT_POLL_INTERVAL_SECONDS = 10
+
+
+class ProgressTracker:
+    """
+    Track a product wait progress: any change of the observed status is progress.
+
+    The wait fails when the status did not change for `stall_timeout` seconds, or when `timeout` expires.
+    """
+
+    def __init__(self, name, timeout, stall_timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.last_status = None
+        self._start_time = self._last_progress_time = time.monotonic()
+
+    def update(self, status):
+        """
+        Update the observed status.
+
+        Args:
+            status (dict): observed status
+
+        Raises:
+            RuntimeError: if the wait timed out or did not progress for `stall_timeout` seconds
+        """
+        now = time.monotonic()
+        if status != self.last_status:
+            LOGGER.info(f"{self.name} status: {status}")
+            self.last_status = status
+            self._last_progress_time = now
+
+        if now - self._start_time > self.timeout:
+            raise RuntimeError(f"{self.name} timed out after {self.timeout} seconds, last status: {status}")
+
+        if self.stall_timeout and now - self._last_progress_time > self.stall_timeout:
+            raise RuntimeError(
+                f"{self.name} did not progress for {self.stall_timeout} seconds, last status: {status}"
+            )
+
+    def fail(self, reason):
+        raise RuntimeError(f"{self.name} {reason}, last status: {self.last_status}")
+
+
+def get_conditions_summary(conditions):
+    """
+    Summarize resource status conditions, ignoring timestamps so only actual changes are seen as progress.
+
+    Args:
+        conditions (list): resource status conditions dicts
+
+    Returns:
+        list: `<type>=<status>` conditions, with reason and message if set
+    """
+    summary = []
+    for condition in conditions or []:
+        condition_str = f"{condition.get('type')}={condition.get('status')}"
+        if reason := condition.get("reason"):
+            condition_str += f" ({reason})"
+        if message := condition.get("message"):
+            condition_str += f": {message}"
+        summary.append(condition_str)
+
+    return summary
@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.utils.general import get_peak_memory_bytes, write_file_atomically
+
+LOGGER = get_logger(name=__name__)
+
+
+class RunReport:
+    """
+    Thread-safe report of the products processed by a run, written as JSON when the run ends.
+
+    Reports of several runs (e.g. shards) are merged by concatenating their `products` lists.
+    External commands (`rosa` cli) timings are reported in the `commands` list and the process peak resident
+    memory in `peak-memory-bytes`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.products = []
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def record(self, product_action, action, success, duration, error=None):
+        product = {
+            "product-type": product_action["product-type"],
+            "name": product_action["name"],
+            "cluster-name": product_action["cluster-name"],
+            "action": action,
+            "outcome": "success" if success else "failure",
+            "duration-seconds": round(duration, 3),
+            "error": str(error) if error else None,
+        }
+        with self._lock:
+            self.products.append(product)
+
+    def record_command(self, command, success, duration, wait_duration=0):
+        command = {
+            "command": command,
+            "outcome": "success" if success else "failure",
+            "duration-seconds": round(duration, 3),
+            "wait-seconds": round(wait_duration, 3),
+        }
+        with self._lock:
+            self.commands.append(command)
+
+    def render(self, shard_index=None, shard_count=None):
+        with self._lock:
+            return json.dumps(
+                {
+                    "shard-index": shard_index,
+                    "shard-count": shard_count,
+                    "products": self.products,
+                    "commands": self.commands,
+                    "peak-memory-bytes": get_peak_memory_bytes(),
+                },
+                indent=2,
+            )
+
+
+RUN_REPORT = RunReport()
+
+
+def enable_report():
+    RUN_REPORT.enabled = True
+
+
+def record_product_report(product_action, action, success, duration, error=None, report=None):
+    """
+    Record a processed product in the run report if enabled, and in `report` if set.
+
+    Args:
+        report (RunReport, optional): report of a single install/uninstall, see `ProductsSession`
+    """
+    reports = [RUN_REPORT] if RUN_REPORT.enabled else []
+    if report:
+        reports.append(report)
+
+    for _report in reports:
+        _report.record(product_action=product_action, action=action, success=success, duration=duration, error=error)
+
+
+def get_shard_report_file(report_file, shard_index, shard_count):
+    """
+    Get the report file of a shard, `<report>-shard-<index>-of-<count><ext>`, so shards sharing a directory
+    do not overwrite each other reports.
+    """
+    if shard_count is None:
+        return report_file
+
+    report_file_base, report_file_ext = os.path.splitext(report_file)
+    return f"{report_file_base}-shard-{shard_index}-of-{shard_count}{report_file_ext}"
+
+
+def write_report_file(report_file, shard_index=None, shard_count=None):
+    """
+    Write run report to a JSON file.
+
+    Args:
+        report_file (str): report file path; a shard suffix is added when the run is sharded
+        shard_index (int, optional): shard index
+        shard_count (int, optional): number of shards
+    """
+    report_file = get_shard_report_file(report_file=report_file, shard_index=shard_index, shard_count=shard_count)
+    LOGGER.info(f"Writing run report to {report_file}")
+    write_file_atomically(
+        file_path=report_file,
+        content=RUN_REPORT.render(shard_index=shard_index, shard_count=shard_count),
+        mode=0o644,
+    )
@@ -0,0 +1,90 @@
+import itertools
+import time
+
+from kubernetes.dynamic.exceptions import (
+    InternalServerError,
+    ServerTimeoutError,
+    ServiceUnavailableError,
+    TooManyRequestsError,
+)
+from ocm_python_client.exceptions import ApiException
+from simple_logger.logger import get_logger
+from timeout_sampler import TimeoutExpiredError
+from urllib3.exceptions import MaxRetryError, ProtocolError
+from urllib3.exceptions import TimeoutError as Urllib3TimeoutError
+
+from ocp_addons_operators_cli.utils.metrics import api_requests_retry, record_product_retry
+
+LOGGER = get_logger(name=__name__)
+
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    ProtocolError,
+    MaxRetryError,
+    Urllib3TimeoutError,
+    InternalServerError,
+    ServerTimeoutError,
+    ServiceUnavailableError,
+    TooManyRequestsError,
+)
+TOO_MANY_REQUESTS_STATUS = 429
+
+
+def is_transient_error(exc):
+    """
+    Classify an error as transient (the failed step can be retried) or fatal.
+
+    Transient errors are connection errors, API server timeouts and OCP API 5xx/429 responses, OCM API 5xx/429
+    responses and wait timeouts whose last sampled error was transient.
+
+    Args:
+        exc (Exception): error
+
+    Returns:
+        bool: True if the error is transient
+    """
+    if isinstance(exc, TRANSIENT_ERRORS):
+        return True
+
+    if isinstance(exc, ApiException):
+        return exc.status is not None and (exc.status >= 500 or exc.status == TOO_MANY_REQUESTS_STATUS)
+
+    if isinstance(exc, TimeoutExpiredError):
+        return exc.last_exp is not None and is_transient_error(exc=exc.last_exp)
+
+    return False
+
+
+def run_product_action_with_retries(product_action, action):
+    """
+    Run product action function, retry transient errors in place with exponential backoff.
+
+    Retries call the action `retry-func` if set, which resumes the action (e.g. only waits if the product
+    was already submitted), else the action `func`.
+
+    Args:
+        product_action (dict): product action, see `prepare_addons_action` and `prepare_operators_action`
+        action (str): install or uninstall
+
+    Returns:
+        Any: product function result
+    """
+    retries = product_action.get("retries", 0)
+    for attempt in itertools.count():
+        func = product_action.get("retry-func", product_action["func"]) if attempt else product_action["func"]
+        try:
+            with api_requests_retry(retry=attempt > 0):
+                return func(**product_action["kwargs"])
+        except Exception as exc:
+            if attempt >= retries or not is_transient_error(exc=exc):
+                raise
+
+            backoff = product_action["retry-backoff"] * 2**attempt
+            LOGGER.warning(
+                f"{product_action['product-type']} {product_action['name']} on cluster "
+                f"{product_action['cluster-name']} {action} failed with a transient error, retry "
+                f"{attempt + 1}/{retries} in {backoff} seconds: {exc}"
+            )
+            record_product_retry(product_type=product_action["product-type"], action=action)
+            time.sleep(backoff)
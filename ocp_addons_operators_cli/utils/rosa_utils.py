@@ -0,0 +1,232 @@
+import contextlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import ocm_python_wrapper.cluster
+import rosa.cli as rosa_cli
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.constants import ADDON_STR
+from ocp_addons_operators_cli.utils.report import RUN_REPORT
+from ocp_addons_operators_cli.utils.tracing import ROSA_COMMAND_SPAN, trace_span
+
+LOGGER = get_logger(name=__name__)
+
+DEFAULT_ROSA_MAX_CONCURRENCY = 4
+# `rosa` reads and writes its login session in the file set by `OCM_CONFIG`
+ROSA_CONFIG_ENV = "OCM_CONFIG"
+ROSA_CONFIG_FILE_NAME = "ocm.json"
+
+
+def get_rosa_command_name(command):
+    """
+    Get a ROSA command name without its flags, e.g. `install addon my-addon`; flags may hold tokens or parameters.
+    """
+    return command.split(" --")[0].strip()
+
+
+class RosaCli:
+    """
+    Amortized `rosa` cli execution, a drop-in replacement of `rosa.cli` for the OCM wrapper addons.
+
+    `rosa.cli.execute` logs in and out for every command; here each (OCM environment, token) is logged in once, in
+    its own `rosa` config file, and all the commands of the run reuse that login. At most `max_concurrency` `rosa`
+    processes run at the same time; commands durations are recorded in the run report.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_ROSA_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(value=max_concurrency)
+        self._lock = threading.Lock()
+        self._logins = {}
+        self._started = False
+
+    def __getattr__(self, name):
+        # Everything but `execute` is served by `rosa.cli`
+        return getattr(rosa_cli, name)
+
+    def _run(self, command, config_file, aws_region=None, allowed_commands=None):
+        full_command = rosa_cli.build_command(
+            command=command,
+            allowed_commands=allowed_commands or rosa_cli.parse_help(),
+            aws_region=aws_region,
+        )
+        command_name = get_rosa_command_name(command=command)
+        queued_time = time.perf_counter()
+        with self._semaphore:
+            start_time = time.perf_counter()
+            success = False
+            try:
+                with trace_span(name=ROSA_COMMAND_SPAN, category=ADDON_STR, args={"command": command_name}):
+                    res = subprocess.run(
+                        full_command,
+                        capture_output=True,
+                        text=True,
+                        env={**os.environ, ROSA_CONFIG_ENV: config_file},
+                    )
+                if res.returncode != 0:
+                    raise rosa_cli.CommandExecuteError(f"Failed to execute: {res.stderr}")
+
+                success = True
+                return rosa_cli.parse_json_response(response=res)
+            finally:
+                duration = time.perf_counter() - start_time
+                LOGGER.info(f"ROSA command `{command_name}` took {duration:.3f} seconds, success: {success}")
+                if RUN_REPORT.enabled:
+                    RUN_REPORT.record_command(
+                        command=f"rosa {command_name}",
+                        success=success,
+                        duration=duration,
+                        wait_duration=start_time - queued_time,
+                    )
+
+    def _get_login_config_file(self, ocm_env, token, aws_region, allowed_commands=None):
+        with self._lock:
+            if (ocm_env, token) not in self._logins:
+                config_dir = tempfile.mkdtemp(prefix="rosa-login-")
+                config_file = os.path.join(config_dir, ROSA_CONFIG_FILE_NAME)
+                LOGGER.info(f"Logging in to ROSA, OCM environment: {ocm_env}")
+                try:
+                    self._run(
+                        command=f"login --region {aws_region} {f'--env={ocm_env}' if ocm_env else ''} --token={token}",
+                        config_file=config_file,
+                        allowed_commands=allowed_commands,
+                    )
+                except Exception:
+                    shutil.rmtree(config_dir, ignore_errors=True)
+                    raise
+
+                self._logins[(ocm_env, token)] = config_file
+
+            return self._logins[(ocm_env, token)]
+
+    def execute(
+        self,
+        command,
+        allowed_commands=None,
+        ocm_env="production",
+        token=None,
+        ocm_client=None,
+        aws_region=None,
+    ):
+        """
+        Execute a ROSA cli command, see `rosa.cli.execute`.
+
+        Without `token` nor `ocm_client`, the command runs with the user `rosa` login.
+        """
+        if not (token or ocm_client):
+            return rosa_cli.execute(command=command, allowed_commands=allowed_commands, aws_region=aws_region)
+
+        if ocm_client:
+            ocm_env = ocm_client.api_client.configuration.host
+            token = ocm_client.api_client.token
+
+        return self._run(
+            command=command,
+            config_file=self._get_login_config_file(
+                ocm_env=ocm_env,
+                token=token,
+                aws_region=aws_region,
+                allowed_commands=allowed_commands,
+            ),
+            aws_region=aws_region,
+            allowed_commands=allowed_commands,
+        )
+
+    def start(self):
+        """
+        Install the OCM wrapper `rosa` cli dispatcher; commands of threads routed to this instance run through it,
+        see `RosaCliDispatcher`.
+        """
+        if not self._started:
+            ROSA_CLI_DISPATCHER.start()
+            self._started = True
+
+    def stop(self):
+        """
+        Release the OCM wrapper `rosa` cli dispatcher, log out and remove the login sessions.
+        """
+        if self._started:
+            ROSA_CLI_DISPATCHER.stop()
+            self._started = False
+
+        with self._lock:
+            logins, self._logins = self._logins, {}
+
+        for config_file in logins.values():
+            try:
+                self._run(command="logout", config_file=config_file)
+            except rosa_cli.CommandExecuteError as exc:
+                LOGGER.warning(f"Failed to log out from ROSA: {exc}")
+            finally:
+                shutil.rmtree(os.path.dirname(config_file), ignore_errors=True)
+
+
+class RosaCliDispatcher:
+    """
+    Process-wide OCM wrapper `rosa` cli, routing each command to the `RosaCli` of the calling thread.
+
+    Installed while at least one `RosaCli` is started (reference counted), so sessions running at the same time
+    keep their own logins and concurrency limits; threads not routed to a `RosaCli` use `rosa.cli`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = 0
+        self._original_rosa_cli = None
+        self._thread_rosa_cli = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self.get_rosa_cli(), name)
+
+    def get_rosa_cli(self):
+        """
+        Get the `RosaCli` of the calling thread, `rosa.cli` if the thread is not routed to a `RosaCli`.
+        """
+        return getattr(self._thread_rosa_cli, "rosa_cli", None) or rosa_cli
+
+    def set_thread_rosa_cli(self, rosa_cli):
+        """
+        Route the calling thread commands to `rosa_cli`; used as executors `initializer`.
+
+        Args:
+            rosa_cli (RosaCli): session `rosa` cli
+        """
+        self._thread_rosa_cli.rosa_cli = rosa_cli
+
+    @contextlib.contextmanager
+    def route(self, rosa_cli):
+        """
+        Route the calling thread commands to `rosa_cli` within the context.
+
+        Args:
+            rosa_cli (RosaCli): session `rosa` cli
+        """
+        previous_rosa_cli = getattr(self._thread_rosa_cli, "rosa_cli", None)
+        self._thread_rosa_cli.rosa_cli = rosa_cli
+        try:
+            yield
+        finally:
+            self._thread_rosa_cli.rosa_cli = previous_rosa_cli
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                self._original_rosa_cli = ocm_python_wrapper.cluster.rosa_cli
+                ocm_python_wrapper.cluster.rosa_cli = self
+
+            self._started += 1
+
+    def stop(self):
+        with self._lock:
+            self._started -= 1
+            if not self._started:
+                ocm_python_wrapper.cluster.rosa_cli = self._original_rosa_cli
+                self._original_rosa_cli = None
+
+
+ROSA_CLI_DISPATCHER = RosaCliDispatcher()
@@ -0,0 +1,78 @@
+import hashlib
+
+import click
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.utils.operators_utils import get_cluster_name_from_kubeconfig
+
+LOGGER = get_logger(name=__name__)
+
+
+def assert_shard(shard_index, shard_count):
+    if shard_index is None and shard_count is None:
+        return
+
+    LOGGER.info("Verify `shard_index` and `shard_count` from user input")
+    if shard_index is None or shard_count is None:
+        LOGGER.error("`--shard-index` and `--shard-count` must be provided together")
+        raise click.Abort()
+
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        LOGGER.error(
+            f"Invalid shard {shard_index} of {shard_count}, `--shard-index` must be between 0 and `--shard-count` - 1"
+        )
+        raise click.Abort()
+
+
+def get_cluster_shard(cluster_name, shard_count):
+    """
+    Get the shard which owns a cluster; stable across runs and hosts.
+
+    Args:
+        cluster_name (str): cluster name
+        shard_count (int): number of shards
+
+    Returns:
+        int: shard index
+    """
+    return int(hashlib.sha256(cluster_name.encode()).hexdigest(), 16) % shard_count
+
+
+def get_shard_products_specs(addons_specs, operators_specs, shard_index, shard_count):
+    """
+    Get the products specs owned by a shard.
+
+    Products are sharded by their cluster, so a single shard owns all the products of a cluster.
+
+    Args:
+        addons_specs (list): list of AddonSpec
+        operators_specs (list): list of OperatorSpec
+        shard_index (int): shard index
+        shard_count (int): number of shards
+
+    Returns:
+        tuple: list of AddonSpec, list of OperatorSpec owned by the shard
+    """
+    shard_addons_specs = [
+        addon_spec
+        for addon_spec in addons_specs
+        if get_cluster_shard(cluster_name=addon_spec.cluster_name, shard_count=shard_count) == shard_index
+    ]
+    shard_operators_specs = [
+        operator_spec
+        for operator_spec in operators_specs
+        if get_cluster_shard(
+            cluster_name=get_cluster_name_from_kubeconfig(
+                kubeconfig=operator_spec.kubeconfig,
+                operator_name=operator_spec.name,
+            ),
+            shard_count=shard_count,
+        )
+        == shard_index
+    ]
+    LOGGER.info(
+        f"Shard {shard_index} of {shard_count}: addons: {[addon_spec.name for addon_spec in shard_addons_specs]}, "
+        f"operators: {[operator_spec.name for operator_spec in shard_operators_specs]}"
+    )
+
+    return shard_addons_specs, shard_operators_specs
@@ -0,0 +1,80 @@
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.constants import ADDON_STR, OPERATOR_STR
+from ocp_addons_operators_cli.utils.operators_utils import get_cluster_name_from_kubeconfig
+from ocp_addons_operators_cli.utils.report import record_product_report
+
+LOGGER = get_logger(name=__name__)
+
+DEFAULT_STREAMING_MAX_CLUSTERS = 4
+
+
+def get_clusters_products_specs(addons_specs, operators_specs):
+    """
+    Group products specs by cluster, addons clusters first, for streaming runs where each cluster's clients are
+    created just before its first product and released after its last product.
+
+    Args:
+        addons_specs (list): list of AddonSpec
+        operators_specs (list): list of OperatorSpec
+
+    Returns:
+        dict: cluster name as key, (list of AddonSpec, list of OperatorSpec) tuple as value
+    """
+    clusters_products_specs = {}
+    for addon_spec in addons_specs:
+        clusters_products_specs.setdefault(addon_spec.cluster_name, ([], []))[0].append(addon_spec)
+
+    for operator_spec in operators_specs:
+        cluster_name = get_cluster_name_from_kubeconfig(
+            kubeconfig=operator_spec.kubeconfig,
+            operator_name=operator_spec.name,
+        )
+        clusters_products_specs.setdefault(cluster_name, ([], []))[1].append(operator_spec)
+
+    LOGGER.info(f"Streaming products of {len(clusters_products_specs)} clusters")
+    return clusters_products_specs
+
+
+def record_cluster_products_failure(
+    cluster_name,
+    addons_specs,
+    operators_specs,
+    action,
+    error,
+    duration,
+    report,
+):
+    """
+    Record the products of a failed cluster which were not processed (e.g. its products preparation failed) as
+    failures, so the run results hold all the cluster products.
+
+    Args:
+        cluster_name (str): cluster name
+        addons_specs (list): cluster list of AddonSpec
+        operators_specs (list): cluster list of OperatorSpec
+        action (str): `install` or `uninstall`
+        error (Exception): cluster failure
+        duration (float): cluster run duration in seconds
+        report (RunReport): run report
+    """
+    # Operators installed as a group (`--operators-group-wait`) share a single result
+    processed_products = {
+        (product["product-type"], product["cluster-name"], name)
+        for product in report.products
+        if product["action"] == action
+        for name in product["name"].split(",")
+    }
+    for product_type, products_specs in ((ADDON_STR, addons_specs), (OPERATOR_STR, operators_specs)):
+        for product_spec in products_specs:
+            if (product_type, cluster_name, product_spec.name) in processed_products:
+                continue
+
+            record_product_report(
+                product_action={"product-type": product_type, "name": product_spec.name, "cluster-name": cluster_name},
+                action=action,
+                success=False,
+                duration=duration,
+                error=f"Cluster {cluster_name} failed: {error!r}",
+                report=report,
+            )
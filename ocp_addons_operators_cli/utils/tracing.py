@@ -0,0 +1,141 @@
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+
+from simple_logger.logger import get_logger
+
+from ocp_addons_operators_cli.utils.general import write_file_atomically
+
+LOGGER = get_logger(name=__name__)
+
+# Spans names
+CATALOG_SOURCE_SPAN = "catalog-source"
+CLIENT_BUILD_SPAN = "client-build"
+CLUSTER_DATA_SPAN = "cluster-data"
+IIB_RESOLVE_SPAN = "iib-resolve"
+QUEUED_SPAN = "queued"
+ROSA_COMMAND_SPAN = "rosa-command"
+
+
+class RunTrace:
+    """
+    Thread-safe in-memory trace of a single run, exported in Chrome trace event format (viewable in Perfetto).
+
+    Spans are placed on the track of the thread which ran them (main thread or executor worker).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._lock = threading.Lock()
+        self._threads_tracks = {}
+        self._async_ids = itertools.count(start=1)
+        self._start_time = time.perf_counter()
+
+    def _timestamp(self, perf_counter_time=None):
+        # Chrome trace timestamps are in microseconds
+        return ((perf_counter_time or time.perf_counter()) - self._start_time) * 1_000_000
+
+    def _track_id(self):
+        thread = threading.current_thread()
+        with self._lock:
+            if thread.ident not in self._threads_tracks:
+                self._threads_tracks[thread.ident] = len(self._threads_tracks) + 1
+                self.events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": self._threads_tracks[thread.ident],
+                    "args": {"name": thread.name},
+                })
+
+            return self._threads_tracks[thread.ident]
+
+    def add_span(self, name, category, start_time, end_time, args=None):
+        """
+        Add a complete span on the current thread track.
+
+        Args:
+            name (str): span name
+            category (str): span category, addon or operator
+            start_time (float): span start, `time.perf_counter()`
+            end_time (float): span end, `time.perf_counter()`
+            args (dict, optional): span args, shown in the span details
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self._timestamp(perf_counter_time=start_time),
+            "dur": (end_time - start_time) * 1_000_000,
+            "pid": os.getpid(),
+            "tid": self._track_id(),
+            "args": args or {},
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def add_async_span(self, name, category, start_time, end_time, args=None):
+        """
+        Add an async span, shown on its own track; used for spans which are not bound to a thread (queued products).
+        """
+        async_id = next(self._async_ids)
+        base_event = {"name": name, "cat": category, "id": async_id, "pid": os.getpid(), "tid": 0}
+        with self._lock:
+            self.events.extend([
+                {**base_event, "ph": "b", "ts": self._timestamp(perf_counter_time=start_time), "args": args or {}},
+                {**base_event, "ph": "e", "ts": self._timestamp(perf_counter_time=end_time)},
+            ])
+
+    def render(self):
+        with self._lock:
+            return json.dumps({"traceEvents": self.events, "displayTimeUnit": "ms"})
+
+
+RUN_TRACE = RunTrace()
+
+
+def enable_tracing():
+    RUN_TRACE.enabled = True
+
+
+@contextlib.contextmanager
+def trace_span(name, category, args=None):
+    """
+    Trace a span on the current thread track, no-op if tracing is disabled.
+
+    Args:
+        name (str): span name
+        category (str): span category, addon or operator
+        args (dict, optional): span args; the yielded dict can be updated inside the span
+
+    Yields:
+        dict: span args
+    """
+    span_args = args or {}
+    start_time = time.perf_counter()
+    try:
+        yield span_args
+    finally:
+        if RUN_TRACE.enabled:
+            RUN_TRACE.add_span(
+                name=name,
+                category=category,
+                start_time=start_time,
+                end_time=time.perf_counter(),
+                args=span_args,
+            )
+
+
+def write_trace_file(trace_file):
+    """
+    Write run trace to a file in Chrome trace event format.
+
+    Args:
+        trace_file (str): trace file path
+    """
+    LOGGER.info(f"Writing run trace to {trace_file}")
+    write_file_atomically(file_path=trace_file, content=RUN_TRACE.render(), mode=0o644)